@@ -156,14 +156,120 @@ AZURE_STORAGE_CONNECTION_STRING = os.environ.get('AZURE_STORAGE_CONNECTION_STRIN
 AZURE_STORAGE_CONTAINER_NAME = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'certificados')
 AZURE_STORAGE_MEDIA_CONTAINER = os.environ.get('AZURE_STORAGE_MEDIA_CONTAINER', 'media')
 
+# Pool de conexiones HTTP compartido por proceso para Azure Storage
+AZURE_STORAGE_POOL_MAXSIZE = int(os.environ.get('AZURE_STORAGE_POOL_MAXSIZE', 20))
+AZURE_STORAGE_TCP_KEEPALIVE = os.environ.get('AZURE_STORAGE_TCP_KEEPALIVE', '1') == '1'
+AZURE_STORAGE_CONNECTION_TIMEOUT = int(os.environ.get('AZURE_STORAGE_CONNECTION_TIMEOUT', 20))
+AZURE_STORAGE_READ_TIMEOUT = int(os.environ.get('AZURE_STORAGE_READ_TIMEOUT', 60))
+
+# Subidas por bloques: tamaño de cada bloque (bytes) y bloques subidos en paralelo
+AZURE_STORAGE_BLOCK_SIZE = int(os.environ.get('AZURE_STORAGE_BLOCK_SIZE', 4 * 1024 * 1024))
+AZURE_STORAGE_MAX_CONCURRENCY = int(os.environ.get('AZURE_STORAGE_MAX_CONCURRENCY', 4))
+
+# Lecturas por rangos: ventana inicial y máxima de lectura anticipada (bytes)
+AZURE_STORAGE_READ_AHEAD = int(os.environ.get('AZURE_STORAGE_READ_AHEAD', 256 * 1024))
+AZURE_STORAGE_READ_AHEAD_MAX = int(os.environ.get('AZURE_STORAGE_READ_AHEAD_MAX', 8 * 1024 * 1024))
+
+# Elementos por página al listar blobs (listdir, listdir_pagina, iterar_blobs)
+AZURE_STORAGE_LIST_PAGE_SIZE = int(os.environ.get('AZURE_STORAGE_LIST_PAGE_SIZE', 1000))
+
+# Blobs por petición al eliminar en lote (el servicio acepta como mucho 256)
+AZURE_STORAGE_DELETE_BATCH_SIZE = int(os.environ.get('AZURE_STORAGE_DELETE_BATCH_SIZE', 256))
+
+# URLs firmadas (SAS) para contenedores privados: validez del token en segundos y margen
+# antes de la expiración en el que se firma uno nuevo
+AZURE_STORAGE_USE_SAS = os.environ.get('AZURE_STORAGE_USE_SAS', '') == '1'
+AZURE_STORAGE_SAS_TTL = int(os.environ.get('AZURE_STORAGE_SAS_TTL', 3600))
+AZURE_STORAGE_SAS_REFRESH_MARGIN = int(os.environ.get('AZURE_STORAGE_SAS_REFRESH_MARGIN', 300))
+AZURE_STORAGE_SAS_CACHE_MAX_ENTRIES = int(os.environ.get('AZURE_STORAGE_SAS_CACHE_MAX_ENTRIES', 10000))
+
+# Caché de metadatos de blobs (exists/size): TTL en segundos, TTL de blobs inexistentes,
+# máximo de entradas por proceso y alias opcional de CACHES compartido entre workers
+AZURE_STORAGE_METADATA_CACHE_TTL = int(os.environ.get('AZURE_STORAGE_METADATA_CACHE_TTL', 300))
+AZURE_STORAGE_METADATA_CACHE_NEGATIVE_TTL = int(os.environ.get('AZURE_STORAGE_METADATA_CACHE_NEGATIVE_TTL', 5))
+AZURE_STORAGE_METADATA_CACHE_MAX_ENTRIES = int(os.environ.get('AZURE_STORAGE_METADATA_CACHE_MAX_ENTRIES', 10000))
+AZURE_STORAGE_METADATA_CACHE_ALIAS = os.environ.get('AZURE_STORAGE_METADATA_CACHE_ALIAS', '')
+
+# Resiliencia de las llamadas a Azure Storage: timeouts (segundos) por tipo de operación,
+# reintentos con backoff exponencial y jitter, y circuit breaker (fallos seguidos para abrirlo
+# y segundos abierto antes de probar de nuevo)
+AZURE_STORAGE_TIMEOUTS = {
+    'metadatos': int(os.environ.get('AZURE_STORAGE_TIMEOUT_METADATOS', 5)),
+    'lectura': int(os.environ.get('AZURE_STORAGE_TIMEOUT_LECTURA', 30)),
+    'escritura': int(os.environ.get('AZURE_STORAGE_TIMEOUT_ESCRITURA', 60)),
+    'listado': int(os.environ.get('AZURE_STORAGE_TIMEOUT_LISTADO', 30)),
+    'eliminacion': int(os.environ.get('AZURE_STORAGE_TIMEOUT_ELIMINACION', 10)),
+}
+AZURE_STORAGE_RETRY_TOTAL = int(os.environ.get('AZURE_STORAGE_RETRY_TOTAL', 3))
+AZURE_STORAGE_RETRY_BACKOFF = float(os.environ.get('AZURE_STORAGE_RETRY_BACKOFF', 0.5))
+AZURE_STORAGE_RETRY_BACKOFF_MAX = float(os.environ.get('AZURE_STORAGE_RETRY_BACKOFF_MAX', 8))
+AZURE_STORAGE_CIRCUIT_FAILURES = int(os.environ.get('AZURE_STORAGE_CIRCUIT_FAILURES', 5))
+AZURE_STORAGE_CIRCUIT_RESET = int(os.environ.get('AZURE_STORAGE_CIRCUIT_RESET', 30))
+
+# Sustituto local de Azure Storage para pruebas y benchmarks sin conexión:
+# los blobs se guardan en AZURE_STORAGE_FAKE_ROOT con latencia (ms por petición),
+# ancho de banda (KB/s, 0 = sin límite) y fracción de peticiones fallidas simulados
+AZURE_STORAGE_FAKE_ROOT = os.environ.get('AZURE_STORAGE_FAKE_ROOT', '')
+AZURE_STORAGE_FAKE_LATENCY_MS = float(os.environ.get('AZURE_STORAGE_FAKE_LATENCY_MS', 0))
+AZURE_STORAGE_FAKE_BANDWIDTH_KBPS = float(os.environ.get('AZURE_STORAGE_FAKE_BANDWIDTH_KBPS', 0))
+AZURE_STORAGE_FAKE_ERROR_RATE = float(os.environ.get('AZURE_STORAGE_FAKE_ERROR_RATE', 0))
+AZURE_STORAGE_FAKE_URL_PREFIX = '/azure-local/'
+if AZURE_STORAGE_FAKE_ROOT and not AZURE_STORAGE_CONNECTION_STRING:
+    AZURE_STORAGE_CONNECTION_STRING = (
+        f'AccountName=local;AccountKey=bG9jYWw=;BlobEndpoint={AZURE_STORAGE_FAKE_URL_PREFIX}'
+    )
+
 # Usar Azure Storage para archivos de medios en producción
-if not DEBUG and AZURE_STORAGE_CONNECTION_STRING:
+if AZURE_STORAGE_FAKE_ROOT:
+    DEFAULT_FILE_STORAGE = 'tasks.azure_blob_storage.AzureBlobStorage'
+elif not DEBUG and AZURE_STORAGE_CONNECTION_STRING:
     DEFAULT_FILE_STORAGE = 'tasks.azure_blob_storage.AzureBlobStorage'
     MEDIA_URL = f'https://{os.environ.get("AZURE_STORAGE_ACCOUNT_NAME", "")}.blob.core.windows.net/{AZURE_STORAGE_MEDIA_CONTAINER}/'
 else:
     # En desarrollo, usar almacenamiento local
     DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Guardar certificados y fotos de perfil por hash de contenido (un archivo por contenido
+# distinto, con conteo de referencias) bajo el prefijo CV_CAS_PREFIX
+CV_DEDUPLICAR_ARCHIVOS = os.environ.get('CV_DEDUPLICAR_ARCHIVOS', '1') == '1'
+CV_CAS_PREFIX = os.environ.get('CV_CAS_PREFIX', 'contenido')
+
+# Copiar además los certificados al contenedor AZURE_STORAGE_CONTAINER_NAME.
+# Las copias las sube el comando procesar_replicas, con reintentos y backoff (segundos)
+CV_CERTIFICADOS_REPLICA = os.environ.get('CV_CERTIFICADOS_REPLICA', '') == '1'
+CV_REPLICAS_MAX_INTENTOS = int(os.environ.get('CV_REPLICAS_MAX_INTENTOS', 5))
+CV_REPLICAS_BACKOFF = int(os.environ.get('CV_REPLICAS_BACKOFF', 30))
+CV_REPLICAS_BACKOFF_MAX = int(os.environ.get('CV_REPLICAS_BACKOFF_MAX', 3600))
+
+# Caché de PDFs de hojas de vida
+# 'local' guarda en CV_PDF_CACHE_DIR, 'storage' usa DEFAULT_FILE_STORAGE, 'none' desactiva la caché
+CV_PDF_CACHE_BACKEND = os.environ.get('CV_PDF_CACHE_BACKEND', 'local')
+CV_PDF_CACHE_DIR = os.environ.get('CV_PDF_CACHE_DIR', os.path.join(BASE_DIR, 'cv_pdf_cache'))
+CV_PDF_CACHE_MAX_BYTES = int(os.environ.get('CV_PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Tamaño máximo (bytes) que un PDF en construcción se mantiene en memoria antes de pasar a disco
+CV_PDF_SPOOL_MAX_MEMORY = int(os.environ.get('CV_PDF_SPOOL_MAX_MEMORY', 5 * 1024 * 1024))
+
+# Número máximo de descargas simultáneas (foto y certificados) por render de PDF
+CV_PDF_DESCARGAS_PARALELAS = int(os.environ.get('CV_PDF_DESCARGAS_PARALELAS', 4))
+
+# Tamaño máximo (bytes) que un archivo descargado para el PDF se mantiene en memoria antes de pasar a disco
+CV_PDF_DESCARGA_MAX_MEMORY = int(os.environ.get('CV_PDF_DESCARGA_MAX_MEMORY', 10 * 1024 * 1024))
+# Total (bytes) que las descargas de un mismo render pueden retener en memoria; el resto va a disco
+CV_PDF_DESCARGA_MAX_MEMORY_TOTAL = int(os.environ.get('CV_PDF_DESCARGA_MAX_MEMORY_TOTAL', 32 * 1024 * 1024))
+
+# Resoluciones de nombres de archivos antiguos que cada proceso recuerda (LRU)
+CV_RESOLUCIONES_MAX_ENTRADAS = int(os.environ.get('CV_RESOLUCIONES_MAX_ENTRADAS', 10000))
+# Segundos que se recuerda que un nombre no tiene resolución registrada
+CV_RESOLUCIONES_TTL_NEGATIVO = float(os.environ.get('CV_RESOLUCIONES_TTL_NEGATIVO', 60))
+
+# Generación de PDFs en segundo plano (opcional)
+# Si el render estimado supera el presupuesto (segundos), las vistas responden 202 con una URL de consulta.
+# Los trabajos se procesan con: python manage.py procesar_trabajos_pdf
+CV_PDF_ASYNC_ENABLED = os.environ.get('CV_PDF_ASYNC_ENABLED', '') == '1'
+CV_PDF_ASYNC_LATENCY_BUDGET = float(os.environ.get('CV_PDF_ASYNC_LATENCY_BUDGET', 2.0))
+CV_PDF_ASYNC_SEGUNDOS_POR_CERTIFICADO = float(os.environ.get('CV_PDF_ASYNC_SEGUNDOS_POR_CERTIFICADO', 0.5))
+
 LOGIN_URL = "/signin"
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
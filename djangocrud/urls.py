@@ -71,14 +71,22 @@ urlpatterns = [
     # URLs para PDF
     path('hoja-vida/descargar-cv/', views_cv.descargar_cv_pdf, name='descargar_cv_pdf'),
     path('hoja-vida/visualizar-cv/', views_cv.visualizar_cv_pdf, name='visualizar_cv_pdf'),
+    path('hoja-vida/encolar-cv/', views_cv.encolar_cv_pdf, name='encolar_cv_pdf'),
+    path('hoja-vida/trabajo-pdf/<int:trabajo_id>/', views_cv.estado_trabajo_pdf, name='estado_trabajo_pdf'),
+    path('hoja-vida/trabajo-pdf/<int:trabajo_id>/descargar/', views_cv.descargar_trabajo_pdf, name='descargar_trabajo_pdf'),
     
     # URLs Administrativas
     path('admin-panel/hojas-vida/', views_cv.admin_hojas_vida, name='admin_hojas_vida'),
+    path('admin-panel/hojas-vida/descargar-zip/', views_cv.admin_descargar_cvs_zip, name='admin_descargar_cvs_zip'),
     path('admin-panel/hoja-vida/<int:user_id>/', views_cv.admin_ver_hoja_vida, name='admin_ver_hoja_vida'),
     path('admin-panel/hoja-vida/<int:user_id>/editar/', views_cv.admin_editar_hoja_vida, name='admin_editar_hoja_vida'),
     path('admin-panel/hoja-vida/<int:user_id>/descargar-cv/', views_cv.admin_descargar_cv_pdf, name='admin_descargar_cv_pdf'),
+    path('admin-panel/hoja-vida/<int:user_id>/encolar-cv/', views_cv.admin_encolar_cv_pdf, name='admin_encolar_cv_pdf'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    if settings.AZURE_STORAGE_FAKE_ROOT:
+        # Servir los blobs del sustituto local de Azure (ver tasks/azure_fake.py)
+        urlpatterns += static(settings.AZURE_STORAGE_FAKE_URL_PREFIX, document_root=settings.AZURE_STORAGE_FAKE_ROOT)
 
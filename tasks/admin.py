@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Task, DatosPersonales, ExperienciaLaboral, Reconocimiento,
-    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage
+    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage, TrabajoPDF, ReplicaPendiente
 )
 
 
@@ -58,6 +58,18 @@ class VentaGarageAdmin(admin.ModelAdmin):
     list_filter = ("estadoproducto", "activo")
 
 
+class TrabajoPDFAdmin(admin.ModelAdmin):
+    readonly_fields = ("fechacreacion", "fechainicio", "fechafin", "duracion", "huella")
+    list_display = ("datospersonales", "solicitante", "estado", "duracion", "fechacreacion")
+    list_filter = ("estado",)
+
+
+class ReplicaPendienteAdmin(admin.ModelAdmin):
+    readonly_fields = ("clave", "fechacreacion", "fechainicio", "fechafin", "intentos", "url")
+    list_display = ("modelo", "objetoid", "estado", "intentos", "fechaproximointento", "fechacreacion")
+    list_filter = ("estado", "modelo")
+
+
 admin.site.register(Task, TaskAdmin)
 admin.site.register(DatosPersonales, DatosPersonalesAdmin)
 admin.site.register(ExperienciaLaboral, ExperienciaLaboralAdmin)
@@ -66,4 +78,5 @@ admin.site.register(CursoRealizado, CursoRealizadoAdmin)
 admin.site.register(ProductoAcademico, ProductoAcademicoAdmin)
 admin.site.register(ProductoLaboral, ProductoLaboralAdmin)
 admin.site.register(VentaGarage, VentaGarageAdmin)
-
+admin.site.register(TrabajoPDF, TrabajoPDFAdmin)
+admin.site.register(ReplicaPendiente, ReplicaPendienteAdmin)
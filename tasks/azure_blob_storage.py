@@ -5,10 +5,161 @@ Esto permite guardar TODOS los archivos de medios (fotos, certificados, etc.) en
 
 from django.conf import settings
 from django.core.files.storage import Storage
-from io import BytesIO
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-from datetime import datetime, timedelta
+import io
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from collections import OrderedDict
+from datetime import datetime, timezone
 import os
+import threading
+import time
+
+from urllib.parse import quote
+from azure.core.exceptions import ResourceNotFoundError
+
+from .azure_client import (
+    asegurar_contenedor, eliminar_blobs, get_blob_service_client, parsear_connection_string, subir_blob,
+    url_base_blobs
+)
+from .azure_metadata_cache import metadatos_blobs
+from .storage_resilience import politica_almacenamiento
+
+
+class AzureBlobFile(io.RawIOBase):
+    """
+    Archivo de solo lectura respaldado por lecturas por rangos HTTP de un blob.
+    Solo se descargan los rangos que se leen, con un buffer de lectura anticipada:
+    la ventana empieza en AZURE_STORAGE_READ_AHEAD bytes y se duplica mientras la lectura
+    sea secuencial (hasta AZURE_STORAGE_READ_AHEAD_MAX), y vuelve al mínimo tras un seek.
+    """
+    
+    def __init__(self, blob_client, size=None):
+        super().__init__()
+        self._blob_client = blob_client
+        self.name = blob_client.blob_name
+        # Obtener el tamaño también verifica que el blob exista
+        self.size = size if size is not None else politica_almacenamiento.ejecutar(
+            'metadatos', blob_client.get_blob_properties
+        ).size
+        self._posicion = 0
+        self._buffer = b''
+        self._buffer_inicio = 0
+        self._ventana_min = getattr(settings, 'AZURE_STORAGE_READ_AHEAD', 256 * 1024)
+        self._ventana_max = getattr(settings, 'AZURE_STORAGE_READ_AHEAD_MAX', 8 * 1024 * 1024)
+        self._ventana = self._ventana_min
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def tell(self):
+        return self._posicion
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            posicion = offset
+        elif whence == io.SEEK_CUR:
+            posicion = self._posicion + offset
+        elif whence == io.SEEK_END:
+            posicion = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        if posicion < 0:
+            raise ValueError("Posición negativa")
+        self._posicion = posicion
+        return posicion
+    
+    def _descargar_rango(self, inicio, longitud):
+        """Descarga un rango de bytes del blob"""
+        # El reintento incluye la lectura del cuerpo, no solo la petición inicial
+        return politica_almacenamiento.ejecutar(
+            'lectura',
+            lambda **opciones: self._blob_client.download_blob(offset=inicio, length=longitud, **opciones).readall(),
+        )
+    
+    def readinto(self, destino):
+        """Llena destino desde la posición actual (menos bytes solo al llegar al final)"""
+        total = 0
+        vista = memoryview(destino).cast('B')
+        while total < len(vista) and self._posicion < self.size:
+            buffer_fin = self._buffer_inicio + len(self._buffer)
+            if not (self._buffer_inicio <= self._posicion < buffer_fin):
+                # Lectura secuencial: ampliar la ventana; acceso aleatorio: volver al mínimo
+                if self._posicion == buffer_fin and self._buffer:
+                    self._ventana = min(self._ventana * 2, self._ventana_max)
+                else:
+                    self._ventana = self._ventana_min
+                faltante = len(vista) - total
+                longitud = min(max(faltante, self._ventana), self.size - self._posicion)
+                self._buffer = self._descargar_rango(self._posicion, longitud)
+                self._buffer_inicio = self._posicion
+                if not self._buffer:
+                    break
+            
+            desplazamiento = self._posicion - self._buffer_inicio
+            data = self._buffer[desplazamiento:desplazamiento + len(vista) - total]
+            vista[total:total + len(data)] = data
+            total += len(data)
+            self._posicion += len(data)
+        return total
+    
+    def readall(self):
+        """Lee hasta el final con una sola petición para lo que no esté en el buffer"""
+        partes = []
+        buffer_fin = self._buffer_inicio + len(self._buffer)
+        if self._buffer_inicio <= self._posicion < buffer_fin:
+            partes.append(self._buffer[self._posicion - self._buffer_inicio:])
+            self._posicion = buffer_fin
+        if self._posicion < self.size:
+            partes.append(self._descargar_rango(self._posicion, self.size - self._posicion))
+            self._posicion = self.size
+        return b''.join(partes)
+
+
+class CacheTokensSAS:
+    """
+    Caché LRU de tokens SAS de lectura por blob.
+    Un token se reutiliza hasta que le queda menos de AZURE_STORAGE_SAS_REFRESH_MARGIN
+    segundos de validez; entonces se firma uno nuevo (la firma es local, sin red).
+    """
+    
+    def __init__(self, ttl=None, margen=None, max_entradas=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'AZURE_STORAGE_SAS_TTL', 3600)
+        self.margen = margen if margen is not None else getattr(settings, 'AZURE_STORAGE_SAS_REFRESH_MARGIN', 300)
+        self.max_entradas = max_entradas if max_entradas is not None else getattr(
+            settings, 'AZURE_STORAGE_SAS_CACHE_MAX_ENTRIES', 10000
+        )
+        self._tokens = OrderedDict()  # nombre -> (expira, token), del menos al más reciente
+        self._lock = threading.Lock()
+    
+    def obtener(self, nombre, firmar):
+        """
+        Retorna el token SAS en caché del blob o firma uno nuevo
+        
+        Args:
+            nombre: Nombre del blob
+            firmar: Función que recibe la fecha de expiración y retorna el token
+        """
+        ahora = time.time()
+        with self._lock:
+            entrada = self._tokens.get(nombre)
+            if entrada is not None and entrada[0] - ahora > self.margen:
+                self._tokens.move_to_end(nombre)
+                return entrada[1]
+        
+        expira = ahora + self.ttl
+        token = firmar(datetime.fromtimestamp(expira, tz=timezone.utc))
+        with self._lock:
+            self._tokens[nombre] = (expira, token)
+            self._tokens.move_to_end(nombre)
+            while len(self._tokens) > self.max_entradas:
+                self._tokens.popitem(last=False)
+        return token
+    
+    def invalidar(self, nombre):
+        with self._lock:
+            self._tokens.pop(nombre, None)
 
 
 class AzureBlobStorage(Storage):
@@ -21,28 +172,22 @@ class AzureBlobStorage(Storage):
         self.connection_string = getattr(settings, 'AZURE_STORAGE_CONNECTION_STRING', '')
         self.container_name = getattr(settings, 'AZURE_STORAGE_MEDIA_CONTAINER', 'media')
         self.account_name = self._get_account_name()
+        # URL base del contenedor, calculada una vez: url() no necesita red ni cliente
+        self.container_url = f"{url_base_blobs(self.connection_string)}/{self.container_name}"
+        self.account_key = self._get_account_key()
+        self.tokens_sas = CacheTokensSAS()
         
     def _get_account_name(self):
         """Extrae el nombre de la cuenta del connection string"""
-        try:
-            for part in self.connection_string.split(';'):
-                if part.startswith('AccountName='):
-                    return part.split('=')[1]
-        except:
-            pass
-        return ''
+        return parsear_connection_string(self.connection_string).get('AccountName', '')
+    
+    def _asegurar_contenedor(self):
+        """Crea el contenedor si no existe (una sola vez por proceso)"""
+        asegurar_contenedor(get_blob_service_client(self.connection_string), self.container_name)
     
     def _get_blob_client(self, name):
-        """Obtiene un cliente de blob"""
-        blob_service_client = BlobServiceClient.from_connection_string(
-            self.connection_string
-        )
-        
-        # Crear contenedor si no existe
-        try:
-            blob_service_client.get_container_client(self.container_name).get_container_properties()
-        except:
-            blob_service_client.create_container(self.container_name)
+        """Obtiene un cliente de blob (no hace peticiones de red)"""
+        blob_service_client = get_blob_service_client(self.connection_string)
         
         blob_client = blob_service_client.get_blob_client(
             container=self.container_name,
@@ -53,16 +198,19 @@ class AzureBlobStorage(Storage):
     def _save(self, name, content):
         """Guarda un archivo en Azure"""
         try:
+            self._asegurar_contenedor()
             blob_client = self._get_blob_client(name)
             
-            # Leer el contenido si es un objeto archivo
-            if hasattr(content, 'read'):
-                content_data = content.read()
+            # Subir el blob por bloques, sin leer el archivo completo en memoria
+            resultado = subir_blob(blob_client, content)
+            size = getattr(content, 'size', None)
+            if size is None:
+                metadatos_blobs.invalidar(self.container_name, name)
             else:
-                content_data = content
-            
-            # Subir el blob
-            blob_client.upload_blob(content_data, overwrite=True)
+                metadatos_blobs.guardar(
+                    self.container_name, name, size,
+                    etag=resultado.get('etag'), last_modified=resultado.get('last_modified'),
+                )
             return name
             
         except Exception as e:
@@ -72,77 +220,185 @@ class AzureBlobStorage(Storage):
     def _open(self, name, mode='rb'):
         """Abre un archivo desde Azure"""
         try:
-            blob_client = self._get_blob_client(name)
-            download_stream = blob_client.download_blob()
-            file_content = download_stream.readall()
-            return BytesIO(file_content)
+            # Solo se descargan los rangos que el llamador lea
+            return AzureBlobFile(self._get_blob_client(name))
         except Exception as e:
             print(f"Error abriendo archivo en Azure: {e}")
             raise
     
     def delete(self, name):
-        """Elimina un archivo de Azure"""
+        """Elimina un archivo de Azure (no falla si ya no existe)"""
         try:
             blob_client = self._get_blob_client(name)
-            blob_client.delete_blob()
+            politica_almacenamiento.ejecutar('eliminacion', blob_client.delete_blob)
+        except ResourceNotFoundError:
+            pass
         except Exception as e:
+            metadatos_blobs.invalidar(self.container_name, name)
             print(f"Error eliminando archivo de Azure: {e}")
+            raise
+        metadatos_blobs.marcar_inexistente(self.container_name, name)
+        self.tokens_sas.invalidar(name)
     
-    def exists(self, name):
-        """Verifica si un archivo existe en Azure"""
-        try:
-            blob_client = self._get_blob_client(name)
-            blob_client.get_blob_properties()
-            return True
-        except:
-            return False
+    def delete_many(self, names):
+        """
+        Elimina varios archivos con la API de lotes de Azure (ver azure_client.eliminar_blobs)
+        
+        Returns:
+            dict: nombre -> True si se eliminó o ya no existía, o el mensaje de error
+        """
+        resultados = {}
+        for name, estado in eliminar_blobs(self._get_container_client(), names).items():
+            if estado in (202, 404):
+                metadatos_blobs.marcar_inexistente(self.container_name, name)
+                self.tokens_sas.invalidar(name)
+                resultados[name] = True
+            else:
+                metadatos_blobs.invalidar(self.container_name, name)
+                resultados[name] = f"HTTP {estado}" if isinstance(estado, int) else estado
+        return resultados
     
-    def listdir(self, path):
-        """Lista archivos en un directorio de Azure"""
+    def _metadatos(self, name):
+        """
+        Retorna los metadatos del blob (existe, size, etag, last_modified),
+        usando la caché de metadatos y consultando a Azure solo si no están en ella
+        """
+        metadatos = metadatos_blobs.obtener(self.container_name, name)
+        if metadatos is not None:
+            return metadatos
+        
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(
-                self.connection_string
+            properties = politica_almacenamiento.ejecutar(
+                'metadatos', self._get_blob_client(name).get_blob_properties
             )
-            container_client = blob_service_client.get_container_client(self.container_name)
-            
-            directories = []
-            files = []
-            
-            for blob in container_client.list_blobs(name_starts_with=path):
-                files.append(blob.name)
+        except ResourceNotFoundError:
+            return metadatos_blobs.marcar_inexistente(self.container_name, name)
+        return metadatos_blobs.guardar(
+            self.container_name, name, properties.size,
+            etag=properties.etag, last_modified=properties.last_modified,
+        )
+    
+    def exists(self, name):
+        """
+        Verifica si un archivo existe en Azure.
+        Si Azure no responde se propaga el error: asumir que no existe haría que
+        get_available_name reutilice el nombre y se sobrescriba un archivo.
+        """
+        return self._metadatos(name)['existe']
+    
+    def _get_container_client(self):
+        """Obtiene el cliente del contenedor (no hace peticiones de red)"""
+        return get_blob_service_client(self.connection_string).get_container_client(self.container_name)
+    
+    @staticmethod
+    def _prefijo_directorio(path):
+        """'certificados' o 'certificados/' -> 'certificados/'; la raíz es ''"""
+        path = (path or '').strip('/')
+        return f"{path}/" if path else ''
+    
+    @staticmethod
+    def _separar(elementos, prefijo):
+        """Separa un nivel del listado jerárquico en subdirectorios y archivos (nombres relativos)"""
+        directories = []
+        files = []
+        for elemento in elementos:
+            nombre = elemento.name[len(prefijo):]
+            # Los prefijos (BlobPrefix) terminan en el delimitador
+            if nombre.endswith('/'):
+                directories.append(nombre.rstrip('/'))
+            else:
+                files.append(nombre)
+        return directories, files
+    
+    def listdir(self, path):
+        """Lista los subdirectorios y archivos inmediatos de un directorio de Azure"""
+        prefijo = self._prefijo_directorio(path)
+        return politica_almacenamiento.ejecutar(
+            'listado',
+            lambda **opciones: self._separar(self._get_container_client().walk_blobs(
+                name_starts_with=prefijo or None,
+                delimiter='/',
+                results_per_page=getattr(settings, 'AZURE_STORAGE_LIST_PAGE_SIZE', 1000),
+                **opciones
+            ), prefijo),
+        )
+    
+    def _pagina(self, metodo, prefijo, continuation_token, tamano_pagina, **opciones):
+        """Pide una sola página de list_blobs / walk_blobs; retorna (elementos, siguiente token)"""
+        paginas = getattr(self._get_container_client(), metodo)(
+            name_starts_with=prefijo or None,
+            results_per_page=tamano_pagina or getattr(settings, 'AZURE_STORAGE_LIST_PAGE_SIZE', 1000),
+            **opciones
+        ).by_page(continuation_token=continuation_token)
+        return list(next(paginas, [])), paginas.continuation_token
+    
+    def listdir_pagina(self, path, continuation_token=None, tamano_pagina=None):
+        """
+        Lista una página de los subdirectorios y archivos inmediatos de un directorio.
+        Permite recorrer directorios muy grandes sin cargarlos completos en memoria.
+        
+        Args:
+            path: Directorio a listar
+            continuation_token: Token retornado por la página anterior (None para la primera)
+            tamano_pagina: Elementos por página (por defecto AZURE_STORAGE_LIST_PAGE_SIZE)
             
-            return directories, files
-        except Exception as e:
-            print(f"Error listando archivos: {e}")
-            return [], []
+        Returns:
+            tuple: (directorios, archivos, continuation_token); el token es None en la última página
+        """
+        prefijo = self._prefijo_directorio(path)
+        elementos, token = politica_almacenamiento.ejecutar(
+            'listado', self._pagina, 'walk_blobs', prefijo, continuation_token, tamano_pagina, delimiter='/'
+        )
+        directories, files = self._separar(elementos, prefijo)
+        return directories, files, token
+    
+    def iterar_blobs(self, prefijo=''):
+        """
+        Recorre todos los blobs bajo un prefijo (incluyendo subdirectorios).
+        Las páginas se piden a medida que se consumen: la memoria usada es la de una página.
+        Si falla una página se reintenta desde su continuation token.
+        
+        Yields:
+            BlobProperties (name, size, etag, last_modified, ...)
+        """
+        token = None
+        while True:
+            elementos, token = politica_almacenamiento.ejecutar(
+                'listado', self._pagina, 'list_blobs', prefijo, token, None
+            )
+            yield from elementos
+            if not token:
+                break
     
     def size(self, name):
-        """Obtiene el tamaño de un archivo"""
-        try:
-            blob_client = self._get_blob_client(name)
-            properties = blob_client.get_blob_properties()
-            return properties.size
-        except:
-            return 0
+        """Obtiene el tamaño de un archivo (0 si no existe)"""
+        return self._metadatos(name).get('size', 0)
+    
+    def get_modified_time(self, name):
+        """Fecha de última modificación del blob"""
+        metadatos = self._metadatos(name)
+        if not metadatos['existe']:
+            raise FileNotFoundError(name)
+        return metadatos['last_modified']
     
     def url(self, name):
-        """Obtiene la URL pública de un archivo"""
+        """Obtiene la URL pública de un archivo (se calcula localmente, sin peticiones de red)"""
         try:
-            blob_client = self._get_blob_client(name)
+            blob_url = f"{self.container_url}/{quote(name, safe='~/')}"
             
-            # Generar SAS URL si se configura privado
+            # Generar SAS URL si se configura privado (token reutilizado mientras siga vigente)
             if getattr(settings, 'AZURE_STORAGE_USE_SAS', False):
-                sas_token = generate_blob_sas(
+                sas_token = self.tokens_sas.obtener(name, lambda expiry: generate_blob_sas(
                     account_name=self.account_name,
                     container_name=self.container_name,
                     blob_name=name,
-                    account_key=self._get_account_key(),
+                    account_key=self.account_key,
                     permission=BlobSasPermissions(read=True),
-                    expiry=datetime.utcnow() + timedelta(days=365)
-                )
-                return f"{blob_client.url}?{sas_token}"
+                    expiry=expiry,
+                ))
+                return f"{blob_url}?{sas_token}"
             else:
-                return blob_client.url
+                return blob_url
                 
         except Exception as e:
             print(f"Error obteniendo URL: {e}")
@@ -150,10 +406,4 @@ class AzureBlobStorage(Storage):
     
     def _get_account_key(self):
         """Extrae la clave de la cuenta del connection string"""
-        try:
-            for part in self.connection_string.split(';'):
-                if part.startswith('AccountKey='):
-                    return part.split('=')[1]
-        except:
-            pass
-        return ''
+        return parsear_connection_string(self.connection_string).get('AccountKey', '')
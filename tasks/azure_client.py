@@ -0,0 +1,308 @@
+"""
+Cliente compartido de Azure Blob Storage
+Un solo BlobServiceClient por proceso y connection string, con un pool de conexiones HTTP
+reutilizable (keep-alive), para no repetir el handshake TLS en cada operación.
+Incluye la subida por bloques en paralelo usada por ambos gestores de almacenamiento
+"""
+
+import base64
+import mimetypes
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobBlock, BlobServiceClient, ContentSettings
+from django.conf import settings
+
+from .storage_resilience import politica_almacenamiento
+
+
+# Máximo de subpeticiones por lote que acepta el servicio (Blob Batch)
+MAX_LOTE_ELIMINACION = 256
+
+_clientes = {}  # connection string -> BlobServiceClient
+_contenedores_asegurados = set()  # (url de la cuenta, contenedor) ya verificados en este proceso
+_lock = threading.Lock()
+
+
+def _reiniciar_despues_de_fork():
+    """
+    En el proceso hijo (p. ej. workers de gunicorn) no se reutilizan los sockets del padre:
+    se descartan los clientes y se crea un lock nuevo por si el padre lo tenía tomado
+    """
+    global _lock
+    _clientes.clear()
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_despues_de_fork)
+
+
+class _PoolHTTPAdapter(HTTPAdapter):
+    """Adaptador HTTP con tamaño de pool configurable y TCP keep-alive opcional"""
+
+    def __init__(self, tcp_keepalive=True, **kwargs):
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _crear_transporte():
+    """Crea el transporte HTTP del SDK con una sesión de requests propia y un pool de conexiones"""
+    tamano_pool = getattr(settings, 'AZURE_STORAGE_POOL_MAXSIZE', 20)
+    adapter = _PoolHTTPAdapter(
+        tcp_keepalive=getattr(settings, 'AZURE_STORAGE_TCP_KEEPALIVE', True),
+        pool_connections=tamano_pool,
+        pool_maxsize=tamano_pool,
+        # Los reintentos los maneja el SDK, no urllib3
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=getattr(settings, 'AZURE_STORAGE_CONNECTION_TIMEOUT', 20),
+        read_timeout=getattr(settings, 'AZURE_STORAGE_READ_TIMEOUT', 60),
+    )
+
+
+def get_blob_service_client(connection_string=None):
+    """
+    Retorna el BlobServiceClient compartido del proceso para un connection string.
+    El cliente es seguro para usarse desde varios hilos.
+    Si AZURE_STORAGE_FAKE_ROOT está definido se usa el sustituto local de azure_fake.
+
+    Args:
+        connection_string: Connection string de Azure (por defecto AZURE_STORAGE_CONNECTION_STRING)
+
+    Returns:
+        BlobServiceClient
+    """
+    connection_string = connection_string or getattr(settings, 'AZURE_STORAGE_CONNECTION_STRING', '')
+    cliente = _clientes.get(connection_string)
+    if cliente is not None:
+        return cliente
+
+    with _lock:
+        cliente = _clientes.get(connection_string)
+        if cliente is None:
+            if getattr(settings, 'AZURE_STORAGE_FAKE_ROOT', ''):
+                cliente = _crear_cliente_local(connection_string)
+            else:
+                cliente = BlobServiceClient.from_connection_string(
+                    connection_string,
+                    transport=_crear_transporte(),
+                    # Los reintentos los hace politica_almacenamiento (con backoff, jitter y circuit breaker)
+                    retry_total=0,
+                )
+            _clientes[connection_string] = cliente
+    return cliente
+
+
+def _crear_cliente_local(connection_string):
+    """Crea el sustituto local del servicio de blobs (AZURE_STORAGE_FAKE_ROOT), sin red"""
+    from .azure_fake import FakeBlobServiceClient
+
+    return FakeBlobServiceClient(
+        settings.AZURE_STORAGE_FAKE_ROOT,
+        latencia_ms=getattr(settings, 'AZURE_STORAGE_FAKE_LATENCY_MS', 0),
+        ancho_banda_kbps=getattr(settings, 'AZURE_STORAGE_FAKE_BANDWIDTH_KBPS', 0),
+        tasa_errores=getattr(settings, 'AZURE_STORAGE_FAKE_ERROR_RATE', 0),
+        account_name=parsear_connection_string(connection_string).get('AccountName', 'local'),
+        url=f"{url_base_blobs(connection_string)}/",
+    )
+
+
+def reiniciar_clientes():
+    """Descarta los clientes compartidos (p. ej. al cambiar la configuración en pruebas)"""
+    with _lock:
+        _clientes.clear()
+        _contenedores_asegurados.clear()
+
+
+@lru_cache(maxsize=8)
+def parsear_connection_string(connection_string):
+    """
+    Convierte un connection string de Azure en un diccionario (AccountName, AccountKey, ...)
+    Los valores pueden contener '=' (p. ej. la clave en base64), por eso se separa solo en el primero.
+    """
+    partes = {}
+    for parte in (connection_string or '').split(';'):
+        if '=' in parte:
+            clave, valor = parte.split('=', 1)
+            partes[clave.strip()] = valor.strip()
+    return partes
+
+
+def url_base_blobs(connection_string):
+    """Retorna la URL base del servicio de blobs (sin barra final) a partir del connection string"""
+    config = parsear_connection_string(connection_string)
+    if config.get('BlobEndpoint'):
+        return config['BlobEndpoint'].rstrip('/')
+    protocolo = config.get('DefaultEndpointsProtocol', 'https')
+    sufijo = config.get('EndpointSuffix', 'core.windows.net')
+    return f"{protocolo}://{config.get('AccountName', '')}.blob.{sufijo}"
+
+
+def asegurar_contenedor(blob_service_client, container_name):
+    """
+    Crea el contenedor si no existe. Se ejecuta una sola vez por proceso y contenedor;
+    las llamadas siguientes no hacen ninguna petición de red.
+    Primero consulta el contenedor y solo lo crea si no existe. Con credenciales que no
+    pueden consultarlo ni crearlo (403, p. ej. un SAS de solo blobs) se asume que existe:
+    si no fuera así, las operaciones sobre los blobs fallarán con su propio error
+    """
+    clave = (blob_service_client.url, container_name)
+    if clave in _contenedores_asegurados:
+        return
+    container_client = blob_service_client.get_container_client(container_name)
+    try:
+        try:
+            politica_almacenamiento.ejecutar('metadatos', container_client.get_container_properties)
+        except ResourceNotFoundError:
+            try:
+                politica_almacenamiento.ejecutar('escritura', blob_service_client.create_container, container_name)
+            except ResourceExistsError:
+                pass
+    except HttpResponseError as e:
+        if e.status_code != 403:
+            raise
+        print(f"Sin permisos para verificar el contenedor {container_name}, se asume que existe: {e}")
+    _contenedores_asegurados.add(clave)
+
+
+def _iterar_bloques(archivo, tamano_bloque):
+    """Lee un archivo (File de Django, objeto con read() o bytes) en bloques de tamaño fijo"""
+    if isinstance(archivo, (bytes, bytearray)):
+        for inicio in range(0, len(archivo), tamano_bloque):
+            yield bytes(archivo[inicio:inicio + tamano_bloque])
+        return
+
+    if hasattr(archivo, 'seek'):
+        try:
+            archivo.seek(0)
+        except Exception:
+            pass
+    while True:
+        bloque = archivo.read(tamano_bloque)
+        if not bloque:
+            break
+        yield bloque
+
+
+def subir_blob(blob_client, archivo, content_type=None):
+    """
+    Sube un archivo a un blob leyéndolo por bloques.
+
+    Los archivos de un solo bloque se suben con una petición. Los demás se suben como
+    bloques en paralelo (stage_block) y al final se confirma la lista de bloques.
+    Como mucho hay AZURE_STORAGE_MAX_CONCURRENCY bloques en memoria a la vez,
+    así que la memoria usada no depende del tamaño del archivo.
+    Cada petición se reintenta por separado según politica_almacenamiento.
+
+    Args:
+        blob_client: BlobClient de destino
+        archivo: File de Django, objeto con read() o bytes
+        content_type: Tipo MIME (por defecto se deduce del nombre del blob)
+
+    Returns:
+        dict: Propiedades del blob subido (etag, last_modified)
+    """
+    tamano_bloque = getattr(settings, 'AZURE_STORAGE_BLOCK_SIZE', 4 * 1024 * 1024)
+    concurrencia = max(1, getattr(settings, 'AZURE_STORAGE_MAX_CONCURRENCY', 4))
+    content_settings = ContentSettings(
+        content_type=content_type or mimetypes.guess_type(blob_client.blob_name)[0] or 'application/octet-stream'
+    )
+
+    bloques = _iterar_bloques(archivo, tamano_bloque)
+    primero = next(bloques, b'')
+    segundo = next(bloques, None)
+    if segundo is None:
+        return politica_almacenamiento.ejecutar(
+            'escritura', blob_client.upload_blob, primero, overwrite=True, content_settings=content_settings
+        )
+
+    def todos_los_bloques():
+        yield primero
+        yield segundo
+        yield from bloques
+
+    lista_bloques = []
+    pendientes = set()
+    with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='azure-bloques') as executor:
+        try:
+            for indice, data in enumerate(todos_los_bloques()):
+                block_id = base64.b64encode(f"{indice:08d}".encode()).decode()
+                lista_bloques.append(BlobBlock(block_id=block_id))
+                pendientes.add(executor.submit(
+                    politica_almacenamiento.ejecutar, 'escritura', blob_client.stage_block, block_id, data
+                ))
+                # Limitar los bloques en memoria: esperar a que termine alguno antes de leer más
+                if len(pendientes) >= concurrencia:
+                    terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in terminados:
+                        futuro.result()
+            for futuro in pendientes:
+                futuro.result()
+        except Exception:
+            for futuro in pendientes:
+                futuro.cancel()
+            raise
+
+    return politica_almacenamiento.ejecutar(
+        'escritura', blob_client.commit_block_list, lista_bloques, content_settings=content_settings
+    )
+
+
+def eliminar_blobs(container_client, nombres, tamano_lote=None):
+    """
+    Elimina varios blobs con la API de lotes: una petición por cada `tamano_lote` nombres
+    (como mucho MAX_LOTE_ELIMINACION) en lugar de una por blob.
+    Cada lote se reintenta completo según politica_almacenamiento; si aun así falla,
+    sus blobs quedan con el mensaje de error y se sigue con el lote siguiente.
+
+    Args:
+        container_client: ContainerClient del contenedor
+        nombres: Nombres de los blobs a eliminar
+        tamano_lote: Blobs por petición (por defecto AZURE_STORAGE_DELETE_BATCH_SIZE)
+
+    Returns:
+        dict: nombre -> código HTTP de su subpetición (202 eliminado, 404 no existía, ...)
+              o el mensaje de error si falló el lote completo
+    """
+    tamano_lote = tamano_lote or getattr(settings, 'AZURE_STORAGE_DELETE_BATCH_SIZE', MAX_LOTE_ELIMINACION)
+    tamano_lote = max(1, min(tamano_lote, MAX_LOTE_ELIMINACION))
+    nombres = list(dict.fromkeys(nombres))  # un mismo blob repetido en un lote hace fallar la petición
+
+    def enviar(lote, **opciones):
+        # Se consume la respuesta aquí para que los errores al leerla también se reintenten
+        return list(container_client.delete_blobs(*lote, raise_on_any_failure=False, **opciones))
+
+    resultados = {}
+    for inicio in range(0, len(nombres), tamano_lote):
+        lote = nombres[inicio:inicio + tamano_lote]
+        try:
+            respuestas = politica_almacenamiento.ejecutar('eliminacion', enviar, lote)
+        except Exception as e:
+            print(f"Error eliminando lote de {len(lote)} blobs en Azure: {e}")
+            resultados.update((nombre, str(e)) for nombre in lote)
+            continue
+        resultados.update((nombre, respuesta.status_code) for nombre, respuesta in zip(lote, respuestas))
+    return resultados
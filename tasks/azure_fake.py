@@ -0,0 +1,280 @@
+"""
+Sustituto local de Azure Blob Storage para pruebas y benchmarks sin conexión
+Implementa la parte del SDK (BlobServiceClient, ContainerClient, BlobClient) que usan
+AzureBlobStorage y AzureStorageManager, guardando los blobs en un directorio local.
+Permite simular latencia por petición, ancho de banda limitado y fallos transitorios.
+
+Se activa con AZURE_STORAGE_FAKE_ROOT (ver azure_client.get_blob_service_client)
+"""
+
+import hashlib
+import mimetypes
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError, ServiceResponseError
+from azure.storage.blob import PartialBatchErrorException
+
+
+class _Red:
+    """
+    Simula el costo de red: latencia fija por petición, transferencia a ancho de banda limitado
+    y una fracción de peticiones que fallan con un error transitorio
+    """
+
+    def __init__(self, latencia_ms=0, ancho_banda_kbps=0, tasa_errores=0):
+        self.latencia = latencia_ms / 1000
+        self.bytes_por_segundo = ancho_banda_kbps * 1024 if ancho_banda_kbps else 0
+        self.tasa_errores = tasa_errores
+        self.peticiones = Counter()
+        self.bytes_transferidos = 0
+        self._lock = threading.Lock()
+
+    def peticion(self, operacion, num_bytes=0, timeout=None):
+        with self._lock:
+            self.peticiones[operacion] += 1
+            self.bytes_transferidos += num_bytes
+        if self.tasa_errores and random.random() < self.tasa_errores:
+            raise ServiceResponseError(f"Fallo simulado en {operacion}")
+        espera = self.latencia
+        if self.bytes_por_segundo:
+            espera += num_bytes / self.bytes_por_segundo
+        if timeout and espera > timeout:
+            time.sleep(timeout)
+            raise ServiceResponseError(f"Read timed out ({operacion}, simulado)")
+        if espera:
+            time.sleep(espera)
+
+
+class _PaginasFake:
+    """Iterador de páginas como el de ItemPaged.by_page(); cada página es una petición"""
+
+    def __init__(self, servicio, operacion, elementos, tamano_pagina, continuation_token=None, timeout=None):
+        self._servicio = servicio
+        self._operacion = operacion
+        self._timeout = timeout
+        self._elementos = elementos
+        self._tamano_pagina = tamano_pagina or 5000
+        self._inicio = int(continuation_token or 0)
+        self._terminado = False
+        self.continuation_token = continuation_token
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._terminado:
+            raise StopIteration
+        self._servicio.red.peticion(self._operacion, timeout=self._timeout)
+        fin = self._inicio + self._tamano_pagina
+        pagina = self._elementos[self._inicio:fin]
+        self._inicio = fin
+        self._terminado = fin >= len(self._elementos)
+        self.continuation_token = None if self._terminado else str(fin)
+        return iter(pagina)
+
+
+class _PaginadoFake:
+    """Equivalente de ItemPaged: iterable por elementos o por páginas"""
+
+    def __init__(self, servicio, operacion, elementos, tamano_pagina=None, timeout=None):
+        self._servicio = servicio
+        self._operacion = operacion
+        self._elementos = elementos
+        self._tamano_pagina = tamano_pagina
+        self._timeout = timeout
+
+    def by_page(self, continuation_token=None):
+        return _PaginasFake(
+            self._servicio, self._operacion, self._elementos, self._tamano_pagina, continuation_token,
+            self._timeout,
+        )
+
+    def __iter__(self):
+        for pagina in self.by_page():
+            yield from pagina
+
+
+class FakeBlobServiceClient:
+    """Equivalente local de BlobServiceClient"""
+
+    def __init__(self, raiz, latencia_ms=0, ancho_banda_kbps=0, account_name='local', url=None, tasa_errores=0):
+        self.raiz = raiz
+        self.account_name = account_name
+        self.url = url or f"http://fake-azure/{account_name}/"
+        self.red = _Red(latencia_ms, ancho_banda_kbps, tasa_errores)
+        self._bloques = {}  # (contenedor, blob) -> {block_id: bytes}
+        self._lock = threading.Lock()
+        os.makedirs(raiz, exist_ok=True)
+
+    def create_container(self, container_name, **kwargs):
+        self.red.peticion('create_container', timeout=kwargs.get('read_timeout'))
+        ruta = os.path.join(self.raiz, container_name)
+        if os.path.isdir(ruta):
+            raise ResourceExistsError("The specified container already exists.")
+        os.makedirs(ruta)
+        return self.get_container_client(container_name)
+
+    def get_container_client(self, container):
+        return FakeContainerClient(self, container)
+
+    def get_blob_client(self, container, blob):
+        return FakeBlobClient(self, container, blob)
+
+
+class FakeContainerClient:
+    """Equivalente local de ContainerClient"""
+
+    def __init__(self, servicio, container_name):
+        self._servicio = servicio
+        self.container_name = container_name
+        self.ruta = os.path.join(servicio.raiz, container_name)
+
+    def get_container_properties(self, **kwargs):
+        self._servicio.red.peticion('get_container_properties', timeout=kwargs.get('read_timeout'))
+        if not os.path.isdir(self.ruta):
+            raise ResourceNotFoundError("The specified container does not exist.")
+        return SimpleNamespace(name=self.container_name)
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self._servicio, self.container_name, blob)
+
+    def _nombres(self, prefijo=''):
+        """Nombres de todos los blobs del contenedor con el prefijo, en orden"""
+        nombres = []
+        for directorio, _, archivos in os.walk(self.ruta):
+            for archivo in archivos:
+                nombre = os.path.relpath(os.path.join(directorio, archivo), self.ruta).replace(os.sep, '/')
+                if nombre.startswith(prefijo or ''):
+                    nombres.append(nombre)
+        return sorted(nombres)
+
+    def list_blobs(self, name_starts_with=None, results_per_page=None, **kwargs):
+        elementos = [self.get_blob_client(nombre)._propiedades() for nombre in self._nombres(name_starts_with)]
+        return _PaginadoFake(self._servicio, 'list_blobs', elementos, results_per_page, kwargs.get('read_timeout'))
+
+    def walk_blobs(self, name_starts_with=None, delimiter='/', results_per_page=None, **kwargs):
+        """Lista un nivel de la jerarquía: blobs directos y prefijos (terminados en el delimitador)"""
+        prefijo = name_starts_with or ''
+        elementos = []
+        prefijos_vistos = set()
+        for nombre in self._nombres(prefijo):
+            resto = nombre[len(prefijo):]
+            if delimiter in resto:
+                subprefijo = prefijo + resto.split(delimiter, 1)[0] + delimiter
+                if subprefijo not in prefijos_vistos:
+                    prefijos_vistos.add(subprefijo)
+                    elementos.append(SimpleNamespace(name=subprefijo, prefix=subprefijo))
+            else:
+                elementos.append(self.get_blob_client(nombre)._propiedades())
+        return _PaginadoFake(self._servicio, 'walk_blobs', elementos, results_per_page, kwargs.get('read_timeout'))
+
+    def delete_blobs(self, *blobs, raise_on_any_failure=True, **kwargs):
+        """Eliminación por lotes (Blob Batch): una sola petición, una respuesta por blob en orden"""
+        if not blobs:
+            return iter([])
+        if len(blobs) > 256:
+            raise HttpResponseError("The batch operation exceeds the maximum of 256 subrequests.")
+        self._servicio.red.peticion('delete_blobs', timeout=kwargs.get('read_timeout'))
+        respuestas = []
+        for blob in blobs:
+            nombre = blob if isinstance(blob, str) else getattr(blob, 'name', None) or blob['name']
+            try:
+                os.remove(self.get_blob_client(nombre).ruta)
+                respuestas.append(SimpleNamespace(status_code=202, reason='Accepted'))
+            except FileNotFoundError:
+                respuestas.append(SimpleNamespace(status_code=404, reason='The specified blob does not exist.'))
+        if raise_on_any_failure and any(not 200 <= r.status_code < 300 for r in respuestas):
+            raise PartialBatchErrorException("There is a partial failure in the batch operation.", None, respuestas)
+        return iter(respuestas)
+
+
+class FakeBlobClient:
+    """Equivalente local de BlobClient"""
+
+    def __init__(self, servicio, container_name, blob_name):
+        self._servicio = servicio
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.url = f"{servicio.url}{container_name}/{blob_name}"
+        self.ruta = os.path.join(servicio.raiz, container_name, *blob_name.split('/'))
+
+    def _propiedades(self):
+        try:
+            stat = os.stat(self.ruta)
+        except FileNotFoundError:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        etag = hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest()
+        return SimpleNamespace(
+            name=self.blob_name,
+            container=self.container_name,
+            size=stat.st_size,
+            etag=f'"{etag}"',
+            last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            content_settings=SimpleNamespace(content_type=mimetypes.guess_type(self.blob_name)[0]),
+        )
+
+    def _escribir(self, data):
+        if not os.path.isdir(os.path.join(self._servicio.raiz, self.container_name)):
+            raise ResourceNotFoundError("The specified container does not exist.")
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.ruta))
+        with os.fdopen(fd, 'wb') as destino:
+            destino.write(data)
+        os.replace(temp_path, self.ruta)
+        propiedades = self._propiedades()
+        return {'etag': propiedades.etag, 'last_modified': propiedades.last_modified}
+
+    def upload_blob(self, data, overwrite=False, content_settings=None, **kwargs):
+        if hasattr(data, 'read'):
+            data = data.read()
+        if isinstance(data, str):
+            data = data.encode()
+        self._servicio.red.peticion('upload_blob', len(data), kwargs.get('read_timeout'))
+        if not overwrite and os.path.exists(self.ruta):
+            raise ResourceExistsError("The specified blob already exists.")
+        return self._escribir(data)
+
+    def stage_block(self, block_id, data, **kwargs):
+        self._servicio.red.peticion('stage_block', len(data), kwargs.get('read_timeout'))
+        with self._servicio._lock:
+            bloques = self._servicio._bloques.setdefault((self.container_name, self.blob_name), {})
+            bloques[block_id] = bytes(data)
+
+    def commit_block_list(self, block_list, content_settings=None, **kwargs):
+        self._servicio.red.peticion('commit_block_list', timeout=kwargs.get('read_timeout'))
+        with self._servicio._lock:
+            bloques = self._servicio._bloques.pop((self.container_name, self.blob_name), {})
+        try:
+            data = b''.join(bloques[bloque.id] for bloque in block_list)
+        except KeyError:
+            raise ResourceNotFoundError("The specified block list is invalid.")
+        return self._escribir(data)
+
+    def get_blob_properties(self, **kwargs):
+        self._servicio.red.peticion('get_blob_properties', timeout=kwargs.get('read_timeout'))
+        return self._propiedades()
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        try:
+            with open(self.ruta, 'rb') as archivo:
+                archivo.seek(offset or 0)
+                data = archivo.read() if length is None else archivo.read(length)
+        except FileNotFoundError:
+            self._servicio.red.peticion('download_blob', timeout=kwargs.get('read_timeout'))
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        self._servicio.red.peticion('download_blob', len(data), kwargs.get('read_timeout'))
+        return SimpleNamespace(readall=lambda: data, chunks=lambda: iter([data]), size=len(data))
+
+    def delete_blob(self, **kwargs):
+        self._servicio.red.peticion('delete_blob', timeout=kwargs.get('read_timeout'))
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            raise ResourceNotFoundError("The specified blob does not exist.")
@@ -0,0 +1,132 @@
+"""
+Caché de metadatos de blobs de Azure (existencia, tamaño, etag y fecha de modificación)
+Evita una petición get_blob_properties en cada exists() / size() de AzureBlobStorage.
+Guarda las entradas en memoria del proceso y, opcionalmente, en una caché de Django
+compartida por todos los workers (AZURE_STORAGE_METADATA_CACHE_ALIAS)
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+
+# Valor guardado para los blobs que se sabe que no existen
+_INEXISTENTE = {'existe': False}
+
+
+class CacheMetadatosBlob:
+    """
+    Caché LRU limitada por número de entradas y con expiración (TTL).
+    Las entradas negativas (blob inexistente) usan un TTL más corto, porque otro
+    worker puede crear el blob sin que este proceso se entere.
+    """
+
+    def __init__(self, ttl=None, ttl_negativo=None, max_entradas=None, alias=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'AZURE_STORAGE_METADATA_CACHE_TTL', 300)
+        self.ttl_negativo = ttl_negativo if ttl_negativo is not None else getattr(
+            settings, 'AZURE_STORAGE_METADATA_CACHE_NEGATIVE_TTL', 5
+        )
+        self.max_entradas = max_entradas if max_entradas is not None else getattr(
+            settings, 'AZURE_STORAGE_METADATA_CACHE_MAX_ENTRIES', 10000
+        )
+        self.alias = alias if alias is not None else getattr(settings, 'AZURE_STORAGE_METADATA_CACHE_ALIAS', '')
+        self.hits = 0
+        self.misses = 0
+        self._entradas = OrderedDict()  # clave -> (expira, metadatos), del menos al más reciente
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(contenedor, nombre):
+        # Los nombres de blob pueden tener espacios o superar el largo permitido por memcached
+        return 'azure_meta:' + hashlib.sha1(f"{contenedor}/{nombre}".encode()).hexdigest()
+
+    def _compartida(self):
+        return caches[self.alias] if self.alias else None
+
+    def _guardar_local(self, clave, metadatos, ttl):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + ttl, metadatos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, contenedor, nombre):
+        """
+        Busca los metadatos de un blob
+
+        Returns:
+            dict con 'existe' (y 'size', 'etag', 'last_modified' si existe) o None si no está en caché
+        """
+        clave = self._clave(contenedor, nombre)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                expira, metadatos = entrada
+                if expira > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.hits += 1
+                    return metadatos
+                del self._entradas[clave]
+
+        compartida = self._compartida()
+        if compartida is not None:
+            metadatos = compartida.get(clave)
+            if metadatos is not None:
+                # La caché compartida no informa cuánto le queda; se usa el TTL completo localmente
+                self._guardar_local(clave, metadatos, self.ttl if metadatos['existe'] else self.ttl_negativo)
+                with self._lock:
+                    self.hits += 1
+                return metadatos
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def guardar(self, contenedor, nombre, size, etag=None, last_modified=None):
+        """Registra un blob existente con sus metadatos y los retorna"""
+        metadatos = {'existe': True, 'size': size, 'etag': etag, 'last_modified': last_modified}
+        clave = self._clave(contenedor, nombre)
+        self._guardar_local(clave, metadatos, self.ttl)
+        compartida = self._compartida()
+        if compartida is not None:
+            compartida.set(clave, metadatos, self.ttl)
+        return metadatos
+
+    def marcar_inexistente(self, contenedor, nombre):
+        """Registra que el blob no existe (p. ej. tras eliminarlo)"""
+        clave = self._clave(contenedor, nombre)
+        self._guardar_local(clave, _INEXISTENTE, self.ttl_negativo)
+        compartida = self._compartida()
+        if compartida is not None:
+            compartida.set(clave, _INEXISTENTE, self.ttl_negativo)
+        return _INEXISTENTE
+
+    def invalidar(self, contenedor, nombre):
+        clave = self._clave(contenedor, nombre)
+        with self._lock:
+            self._entradas.pop(clave, None)
+        compartida = self._compartida()
+        if compartida is not None:
+            compartida.delete(clave)
+
+    def limpiar(self):
+        """Vacía la caché en memoria del proceso"""
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Retorna los contadores de la caché"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+            }
+
+
+# Instancia global de la caché
+metadatos_blobs = CacheMetadatosBlob()
@@ -3,10 +3,16 @@ Configuración e integración con Azure Storage Blob Service
 para almacenar documentos (PDFs) de certificados
 """
 
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
 import os
 from django.conf import settings
 
+from .azure_client import (
+    MAX_LOTE_ELIMINACION, asegurar_contenedor, eliminar_blobs, get_blob_service_client, subir_blob
+)
+from .storage_resilience import politica_almacenamiento
+
 
 class AzureStorageManager:
     """Gestor para subir y descargar archivos a Azure Storage"""
@@ -27,16 +33,10 @@ class AzureStorageManager:
             URL pública del archivo subido o None si falla
         """
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(
-                self.connection_string
-            )
+            blob_service_client = get_blob_service_client(self.connection_string)
             
-            # Crear contenedor si no existe
-            container_client = blob_service_client.get_container_client(self.container_name)
-            try:
-                container_client.get_container_properties()
-            except:
-                container_client = blob_service_client.create_container(self.container_name)
+            # Crear contenedor si no existe (se verifica una sola vez por proceso)
+            asegurar_contenedor(blob_service_client, self.container_name)
             
             # Subir el blob
             blob_client = blob_service_client.get_blob_client(
@@ -44,7 +44,7 @@ class AzureStorageManager:
                 blob=blob_name
             )
             
-            blob_client.upload_blob(file_obj, overwrite=True)
+            subir_blob(blob_client, file_obj)
             
             # Retornar la URL del blob
             return blob_client.url
@@ -64,16 +64,15 @@ class AzureStorageManager:
             Contenido del archivo o None si falla
         """
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(
-                self.connection_string
-            )
+            blob_service_client = get_blob_service_client(self.connection_string)
             blob_client = blob_service_client.get_blob_client(
                 container=self.container_name,
                 blob=blob_name
             )
             
-            download_stream = blob_client.download_blob()
-            return download_stream.readall()
+            return politica_almacenamiento.ejecutar(
+                'lectura', lambda **opciones: blob_client.download_blob(**opciones).readall()
+            )
             
         except Exception as e:
             print(f"Error descargando archivo de Azure: {str(e)}")
@@ -90,20 +89,102 @@ class AzureStorageManager:
             True si se eliminó correctamente, False en caso contrario
         """
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(
-                self.connection_string
-            )
+            blob_service_client = get_blob_service_client(self.connection_string)
             blob_client = blob_service_client.get_blob_client(
                 container=self.container_name,
                 blob=blob_name
             )
             
-            blob_client.delete_blob()
+            politica_almacenamiento.ejecutar('eliminacion', blob_client.delete_blob)
             return True
             
         except Exception as e:
             print(f"Error eliminando archivo de Azure: {str(e)}")
             return False
+    
+    def document_exists(self, blob_name):
+        """
+        Indica si existe un archivo en Azure Storage
+        
+        Returns:
+            True si existe, False si no existe o no se pudo consultar
+        """
+        try:
+            blob_client = get_blob_service_client(self.connection_string).get_blob_client(
+                container=self.container_name,
+                blob=blob_name
+            )
+            politica_almacenamiento.ejecutar('metadatos', blob_client.get_blob_properties)
+            return True
+            
+        except Exception as e:
+            if not isinstance(e, ResourceNotFoundError):
+                print(f"Error consultando archivo en Azure: {str(e)}")
+            return False
+    
+    def delete_documents(self, blob_names):
+        """
+        Elimina varios archivos de Azure Storage en lotes (una petición cada 256 blobs)
+        
+        Args:
+            blob_names: Nombres de los blobs a eliminar
+            
+        Returns:
+            dict: nombre -> True si se eliminó o ya no existía, False en caso contrario
+        """
+        container_client = get_blob_service_client(self.connection_string).get_container_client(
+            self.container_name
+        )
+        resultados = {}
+        for nombre, estado in eliminar_blobs(container_client, blob_names).items():
+            resultados[nombre] = estado in (202, 404)
+            if not resultados[nombre]:
+                print(f"Error eliminando archivo de Azure {nombre}: {estado}")
+        return resultados
+    
+    def delete_prefix(self, prefijo):
+        """
+        Elimina todos los archivos bajo un prefijo (ej: 'cursos/ana/')
+        
+        Returns:
+            dict: nombre -> True/False como delete_documents
+        """
+        resultados = {}
+        lote = []
+        for blob in self.iterar_documentos(prefijo):
+            lote.append(blob.name)
+            if len(lote) >= MAX_LOTE_ELIMINACION:
+                resultados.update(self.delete_documents(lote))
+                lote = []
+        if lote:
+            resultados.update(self.delete_documents(lote))
+        return resultados
+    
+    def iterar_documentos(self, prefijo=''):
+        """
+        Recorre los blobs del contenedor bajo un prefijo, una página a la vez
+        
+        Yields:
+            BlobProperties (name, size, last_modified, ...)
+        """
+        container_client = get_blob_service_client(self.connection_string).get_container_client(
+            self.container_name
+        )
+        
+        def pagina(token, **opciones):
+            paginas = container_client.list_blobs(
+                name_starts_with=prefijo or None,
+                results_per_page=getattr(settings, 'AZURE_STORAGE_LIST_PAGE_SIZE', 1000),
+                **opciones
+            ).by_page(continuation_token=token)
+            return list(next(paginas, [])), paginas.continuation_token
+        
+        token = None
+        while True:
+            blobs, token = politica_almacenamiento.ejecutar('listado', pagina, token)
+            yield from blobs
+            if not token:
+                break
 
 
 # Instancia global del gestor
@@ -0,0 +1,193 @@
+"""
+Réplica opcional de los certificados en el contenedor de documentos de Azure
+El certificado se guarda una sola vez, en el campo `certificado` (DEFAULT_FILE_STORAGE):
+esa es la copia canónica. Si CV_CERTIFICADOS_REPLICA está activo, se copia además al
+contenedor AZURE_STORAGE_CONTAINER_NAME y la URL de la copia queda en `certificadoreplica`.
+
+Las copias pasan por una bandeja de salida en la base de datos (ReplicaPendiente) que
+procesa el comando `procesar_replicas`, así el formulario no espera a Azure
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import os
+import random
+
+from .azure_storage import azure_storage
+from .models import ReplicaPendiente
+
+
+# Carpeta de la réplica por modelo
+CARPETAS_REPLICA = {
+    'ExperienciaLaboral': 'experiencia',
+    'Reconocimiento': 'reconocimientos',
+    'CursoRealizado': 'cursos',
+}
+
+
+def replica_activa():
+    """Indica si está activada la réplica de certificados"""
+    return getattr(settings, 'CV_CERTIFICADOS_REPLICA', False)
+
+
+def nombre_replica(instancia):
+    """Nombre del blob de la réplica (ej: 'cursos/ana/12_certificado.pdf')"""
+    carpeta = CARPETAS_REPLICA[type(instancia).__name__]
+    username = instancia.datospersonales.user.username
+    return f"{carpeta}/{username}/{instancia.pk}_{os.path.basename(instancia.certificado.name)}"
+
+
+def eliminar_replicas_usuario(username):
+    """
+    Elimina todas las réplicas de un usuario (p. ej. al borrar su cuenta).
+    Se listan las carpetas del usuario y se borran en lotes, no un blob por petición.
+
+    Returns:
+        dict: nombre -> True/False, como AzureStorageManager.delete_documents
+    """
+    resultados = {}
+    for carpeta in CARPETAS_REPLICA.values():
+        try:
+            resultados.update(azure_storage.delete_prefix(f"{carpeta}/{username}/"))
+        except Exception as e:
+            print(f"Error eliminando réplicas de {username} en {carpeta}: {e}")
+    return resultados
+
+
+def clave_replica(modelo, pk, certificado):
+    """Clave de idempotencia: la misma fila con el mismo archivo se replica una sola vez"""
+    return hashlib.sha256(f"{modelo}:{pk}:{certificado}".encode()).hexdigest()
+
+
+def programar_replica(instancia):
+    """
+    Llamar después de guardar una fila cuyo certificado es nuevo o cambió,
+    idealmente dentro de la misma transacción.
+    Borra la URL de la réplica anterior y, si la réplica está activa, deja la copia
+    en la bandeja de salida.
+    """
+    modelo = type(instancia)
+    with transaction.atomic():
+        if not replica_activa() or not instancia.certificado:
+            if instancia.certificadoreplica or instancia.estadoreplica:
+                modelo.objects.filter(pk=instancia.pk).update(certificadoreplica=None, estadoreplica=None)
+                instancia.certificadoreplica = instancia.estadoreplica = None
+            return None
+
+        certificado = instancia.certificado.name
+        replica, _ = ReplicaPendiente.objects.get_or_create(
+            clave=clave_replica(modelo.__name__, instancia.pk, certificado),
+            defaults={'modelo': modelo.__name__, 'objetoid': instancia.pk, 'certificado': certificado},
+        )
+        # Con nombres por contenido, volver a subir un archivo anterior reutiliza su entrada y se
+        # vuelve a encolar. Si ya se había completado, el worker comprueba si la copia sigue
+        # existiendo (limpiar_huerfanos --replicas o eliminar_replicas_usuario pudieron borrarla);
+        # aquí no se consulta Azure para no bloquear la transacción de la vista
+        if replica.estado in ('descartado', 'error', 'completado'):
+            replica = reencolar_replica(replica)
+        modelo.objects.filter(pk=instancia.pk).update(certificadoreplica=None, estadoreplica='pendiente')
+        instancia.certificadoreplica, instancia.estadoreplica = None, 'pendiente'
+    return replica
+
+
+def reencolar_replica(replica):
+    """
+    Devuelve una entrada de la bandeja de salida a 'pendiente' para procesarla de nuevo.
+    Una entrada completada conserva su URL: así el worker sabe que la copia ya se subió una vez
+    """
+    ReplicaPendiente.objects.filter(pk=replica.pk).update(
+        estado='pendiente',
+        intentos=0,
+        url=replica.url if replica.estado == 'completado' else None,
+        mensajeerror=None,
+        fechaproximointento=timezone.now(),
+        fechainicio=None,
+        fechafin=None,
+    )
+    replica.refresh_from_db()
+    return replica
+
+
+def reservar_siguiente_replica():
+    """
+    Marca como 'procesando' la réplica pendiente más antigua cuyo reintento ya venció.
+    La reserva es una actualización condicional, así varios workers no toman la misma réplica.
+
+    Returns:
+        ReplicaPendiente o None si no hay réplicas pendientes
+    """
+    ahora = timezone.now()
+    candidatas = ReplicaPendiente.objects.filter(
+        estado='pendiente', fechaproximointento__lte=ahora
+    ).values_list('id', flat=True)[:10]
+    for replica_id in candidatas:
+        reservado = ReplicaPendiente.objects.filter(id=replica_id, estado='pendiente').update(
+            estado='procesando',
+            fechainicio=ahora,
+        )
+        if reservado:
+            return ReplicaPendiente.objects.get(id=replica_id)
+    return None
+
+
+def _espera_reintento(intentos):
+    """Backoff exponencial con jitter entre reintentos de una réplica"""
+    base = getattr(settings, 'CV_REPLICAS_BACKOFF', 30)
+    maximo = getattr(settings, 'CV_REPLICAS_BACKOFF_MAX', 3600)
+    return timedelta(seconds=random.uniform(0.5, 1) * min(maximo, base * 2 ** (intentos - 1)))
+
+
+def procesar_replica(replica):
+    """Sube la copia de un certificado y actualiza la bandeja de salida y la fila dueña"""
+    modelo = apps.get_model('tasks', replica.modelo)
+    filas = modelo.objects.filter(pk=replica.objetoid, certificado=replica.certificado)
+    instancia = filas.select_related('datospersonales__user').first()
+    replica.intentos += 1
+
+    if instancia is None:
+        # La fila se eliminó o su certificado cambió: la copia ya no hace falta
+        replica.estado = 'descartado'
+    else:
+        try:
+            nombre = nombre_replica(instancia)
+            # Una entrada reutilizada ya tiene URL: si la copia sigue en Azure no se vuelve a subir
+            if not (replica.url and azure_storage.document_exists(nombre)):
+                with instancia.certificado.open('rb') as archivo:
+                    # El nombre del blob es determinista: repetir la subida sobrescribe la misma copia
+                    replica.url = azure_storage.upload_document(archivo, nombre)
+            if not replica.url:
+                raise RuntimeError("No se pudo subir la réplica a Azure")
+            replica.estado = 'completado'
+            replica.mensajeerror = None
+        except Exception as e:
+            print(f"Error replicando certificado {replica.modelo} {replica.objetoid}: {e}")
+            replica.mensajeerror = str(e)
+            if replica.intentos >= getattr(settings, 'CV_REPLICAS_MAX_INTENTOS', 5):
+                replica.estado = 'error'
+            else:
+                replica.estado = 'pendiente'
+                replica.fechaproximointento = timezone.now() + _espera_reintento(replica.intentos)
+
+    with transaction.atomic():
+        if replica.estado == 'completado':
+            filas.update(certificadoreplica=replica.url, estadoreplica='completado')
+        elif replica.estado == 'error':
+            filas.update(estadoreplica='error')
+        replica.fechafin = timezone.now()
+        replica.save(update_fields=[
+            'estado', 'intentos', 'url', 'mensajeerror', 'fechaproximointento', 'fechafin'
+        ])
+    return replica
+
+
+def liberar_replicas_abandonadas(minutos=30):
+    """Devuelve a 'pendiente' las réplicas que quedaron en 'procesando' por un worker caído"""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ReplicaPendiente.objects.filter(estado='procesando', fechainicio__lt=limite).update(
+        estado='pendiente',
+        fechainicio=None,
+    )
@@ -0,0 +1,176 @@
+"""
+Almacenamiento direccionado por contenido para certificados y fotos de perfil
+Cada archivo se guarda con el nombre de su hash (sha256): si varios registros suben el
+mismo contenido, se guarda y se transfiere una sola vez. BlobContenido lleva cuántos
+registros usan cada archivo y este se elimina del storage cuando nadie lo usa.
+Los archivos derivados que se calculan por nombre (p. ej. miniaturas) también se comparten.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import hashlib
+import os
+
+
+def _modelo_blob():
+    # Import diferido: models.py usa storage_archivos de este módulo
+    return apps.get_model('tasks', 'BlobContenido')
+
+
+class ContentAddressedStorage(Storage):
+    """
+    Envuelve el storage configurado (local o Azure) guardando por hash de contenido.
+    Los nombres que no son de contenido (archivos anteriores) se delegan tal cual.
+    """
+
+    def __init__(self, prefijo=None):
+        self.prefijo = prefijo or getattr(settings, 'CV_CAS_PREFIX', 'contenido')
+
+    @property
+    def backend(self):
+        return default_storage
+
+    def es_nombre_contenido(self, name):
+        return str(name).startswith(f"{self.prefijo}/")
+
+    def nombre_contenido(self, huella, extension):
+        """Nombre determinista del archivo (ej: 'contenido/ab/ab12...ef.pdf')"""
+        return f"{self.prefijo}/{huella[:2]}/{huella}{extension.lower()}"
+
+    @staticmethod
+    def calcular_huella(content):
+        """Hash sha256 del archivo leyéndolo por bloques, sin cargarlo completo en memoria"""
+        huella = hashlib.sha256()
+        tamano = 0
+        for bloque in content.chunks():
+            huella.update(bloque)
+            tamano += len(bloque)
+        return huella.hexdigest(), tamano
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide el contenido; no hace falta consultar si existe
+        return name
+
+    def _save(self, name, content):
+        huella, tamano = self.calcular_huella(content)
+        BlobContenido = _modelo_blob()
+
+        # Contenido ya guardado: solo se suma una referencia, no se sube de nuevo
+        existente = self._sumar_referencia(huella)
+        if existente:
+            return existente
+
+        # La subida se hace fuera de la transacción, así no se bloquea la fila mientras dura la
+        # transferencia. Si el proceso muere antes de registrar el archivo, queda un huérfano
+        # que elimina limpiar_huerfanos. Un archivo sin registro con el mismo nombre (huérfano de
+        # una subida anterior) se reemplaza en lugar de adoptarse: la subida renueva su fecha
+        # de modificación y el recolector no lo toma por viejo mientras se registra
+        nombre = self.nombre_contenido(huella, os.path.splitext(name)[1])
+        if self.backend.exists(nombre):
+            self.backend.delete(nombre)
+        content.seek(0)
+        nombre = self.backend.save(nombre, content)
+
+        with transaction.atomic():
+            blob, creado = BlobContenido.objects.select_for_update().get_or_create(
+                huella=huella,
+                defaults={'nombre': nombre, 'tamano': tamano, 'referencias': 1},
+            )
+            if not creado:
+                # Otro proceso subió el mismo contenido al mismo tiempo y lo registró primero
+                BlobContenido.objects.filter(pk=blob.pk).update(
+                    referencias=F('referencias') + 1, fechamodificacion=timezone.now()
+                )
+        if blob.nombre != nombre:
+            # Nuestra copia quedó con otro nombre (el storage evitó sobrescribir la del otro proceso)
+            self.backend.delete(nombre)
+        return blob.nombre
+
+    def _sumar_referencia(self, huella):
+        """Suma una referencia si el contenido ya está guardado y retorna su nombre, o None"""
+        BlobContenido = _modelo_blob()
+        with transaction.atomic():
+            actualizadas = BlobContenido.objects.filter(huella=huella).update(
+                referencias=F('referencias') + 1, fechamodificacion=timezone.now()
+            )
+            if not actualizadas:
+                return None
+            return BlobContenido.objects.filter(huella=huella).values_list('nombre', flat=True).first()
+
+    def delete(self, name):
+        """Quita una referencia; el archivo se elimina del storage cuando ya no tiene referencias"""
+        if not self.es_nombre_contenido(name):
+            self.backend.delete(name)
+            return
+
+        BlobContenido = _modelo_blob()
+        with transaction.atomic():
+            blob = BlobContenido.objects.select_for_update().filter(nombre=name).first()
+            if blob is None:
+                return
+            if blob.referencias > 1:
+                BlobContenido.objects.filter(pk=blob.pk).update(
+                    referencias=F('referencias') - 1, fechamodificacion=timezone.now()
+                )
+                return
+            blob.delete()
+            self.backend.delete(name)
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+_storage_contenido = ContentAddressedStorage()
+
+
+def storage_archivos():
+    """
+    Storage de los campos de certificados y fotos de perfil (se usa como `storage=` callable,
+    así CV_DEDUPLICAR_ARCHIVOS se puede cambiar sin migraciones)
+    """
+    if getattr(settings, 'CV_DEDUPLICAR_ARCHIVOS', True):
+        return _storage_contenido
+    return default_storage
+
+
+def campos_contenido(modelo):
+    """Nombres de los campos de archivo del modelo que usan storage_archivos"""
+    return [
+        field.name for field in modelo._meta.fields
+        if getattr(field, '_storage_callable', None) is storage_archivos
+    ]
+
+
+def liberar_archivo(nombre):
+    """
+    Quita la referencia de un archivo que dejó de usar un registro (borrado o reemplazado).
+    Solo aplica a archivos guardados por contenido; los demás los limpia el recolector de huérfanos.
+    """
+    if not nombre or not _storage_contenido.es_nombre_contenido(nombre):
+        return
+    try:
+        _storage_contenido.delete(nombre)
+    except Exception as e:
+        print(f"Error liberando archivo {nombre}: {e}")
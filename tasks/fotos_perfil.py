@@ -0,0 +1,134 @@
+"""
+Variantes precalculadas de la foto de perfil
+Al subir una foto se generan versiones reducidas junto al original, con nombres deterministas
+(ej: 'contenido/ab/ab12...ef.png' -> 'contenido/ab/ab12...ef_pdf.jpg'). El PDF y las páginas
+HTML descargan la variante pequeña en lugar de la foto a resolución completa.
+Si una variante aún no existe (fotos anteriores) se usa la foto original.
+"""
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+import io
+import os
+
+
+# Variante -> lado en píxeles (recorte cuadrado), formato de Pillow y calidad
+VARIANTES = {
+    # 1.2 pulgadas en el PDF a 300 dpi
+    'pdf': {'lado': 360, 'formato': 'JPEG', 'calidad': 85},
+    'avatar': {'lado': 160, 'formato': 'JPEG', 'calidad': 80},
+    'avatar_webp': {'lado': 160, 'formato': 'WEBP', 'calidad': 80},
+}
+
+_EXTENSIONES = {'JPEG': '.jpg', 'WEBP': '.webp', 'PNG': '.png'}
+
+
+def variantes():
+    """Variantes configuradas (CV_FOTO_VARIANTES reemplaza a las de por defecto)"""
+    return getattr(settings, 'CV_FOTO_VARIANTES', VARIANTES)
+
+
+def nombre_variante(nombre, variante):
+    """Nombre de la variante junto al original (ej: 'profile_pics/ana_avatar.jpg')"""
+    raiz = os.path.splitext(str(nombre))[0]
+    return f"{raiz}_{variante}{_EXTENSIONES[variantes()[variante]['formato']]}"
+
+
+def nombres_variantes(nombre):
+    """Nombres de todas las variantes de una foto"""
+    return [nombre_variante(nombre, variante) for variante in variantes()]
+
+
+def _reducir(imagen, config):
+    """Recorta al centro en cuadrado, reduce y codifica la imagen en el formato de la variante"""
+    lado = config['lado']
+    reducida = ImageOps.fit(imagen, (lado, lado), Image.Resampling.LANCZOS)
+    if config['formato'] == 'JPEG' and reducida.mode != 'RGB':
+        # JPEG no tiene canal alfa: las zonas transparentes quedan en blanco
+        fondo = Image.new('RGB', reducida.size, 'white')
+        fondo.paste(reducida, mask=reducida.getchannel('A') if 'A' in reducida.getbands() else None)
+        reducida = fondo
+    buffer = io.BytesIO()
+    reducida.save(buffer, config['formato'], quality=config['calidad'], optimize=True)
+    return buffer.getvalue()
+
+
+def generar_variantes(foto, sobrescribir=True):
+    """
+    Genera y guarda las variantes de una foto de perfil
+
+    Args:
+        foto: FieldFile de la foto (p. ej. datos.fotoperfil)
+        sobrescribir: Reemplazar las variantes existentes. Con nombres por contenido
+            no hace falta: el mismo nombre siempre corresponde a la misma foto
+
+    Returns:
+        list: Nombres de las variantes guardadas
+    """
+    if not foto or not foto.name:
+        return []
+    storage = foto.storage
+    por_contenido = getattr(storage, 'es_nombre_contenido', lambda nombre: False)(foto.name)
+    pendientes = {
+        variante: nombre_variante(foto.name, variante)
+        for variante in variantes()
+    }
+    if por_contenido or not sobrescribir:
+        pendientes = {variante: nombre for variante, nombre in pendientes.items() if not storage.exists(nombre)}
+    if not pendientes:
+        return []
+
+    # Las variantes se guardan en el storage de respaldo: no son archivos con referencias
+    destino = getattr(storage, 'backend', storage)
+    with foto.open('rb') as archivo:
+        imagen = Image.open(archivo)
+        imagen.load()
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or imagen.mode in ('LA', 'PA') else 'RGB')
+
+    guardadas = []
+    for variante, nombre in pendientes.items():
+        contenido = _reducir(imagen, variantes()[variante])
+        if destino.exists(nombre):
+            destino.delete(nombre)
+        guardadas.append(destino.save(nombre, ContentFile(contenido)))
+    return guardadas
+
+
+def generar_variantes_seguro(foto):
+    """generar_variantes sin propagar errores (la foto original sigue sirviendo)"""
+    try:
+        return generar_variantes(foto)
+    except Exception as e:
+        print(f"Error generando variantes de la foto {foto.name}: {e}")
+        return []
+
+
+def archivo_variante(foto, variante):
+    """
+    FieldFile de la variante si ya existe en el storage, o None
+
+    Args:
+        foto: FieldFile de la foto original
+        variante: Nombre de la variante ('pdf', 'avatar', 'avatar_webp')
+    """
+    if not foto or not foto.name:
+        return None
+    nombre = nombre_variante(foto.name, variante)
+    try:
+        if not foto.storage.exists(nombre):
+            return None
+    except Exception as e:
+        print(f"Error consultando variante {nombre}: {e}")
+        return None
+    return type(foto)(foto.instance, foto.field, nombre)
+
+
+def url_variante(foto, variante):
+    """URL de la variante, o de la foto original si la variante no existe"""
+    if not foto or not foto.name:
+        return ''
+    archivo = archivo_variante(foto, variante)
+    return (archivo or foto).url
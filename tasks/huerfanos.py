@@ -0,0 +1,282 @@
+"""
+Recolección de archivos huérfanos en el storage
+Un archivo es huérfano si ningún registro lo referencia: filas eliminadas, archivos
+reemplazados al editar o réplicas antiguas. El listado del storage se recorre por páginas
+y se compara contra los nombres referenciados, guardados en un conjunto o en un filtro
+de Bloom (memoria fija aunque haya millones de archivos)
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from datetime import timedelta
+from urllib.parse import unquote, urlparse
+import hashlib
+import math
+import posixpath
+
+from .content_storage import campos_contenido
+from .fotos_perfil import nombres_variantes, variantes
+from .models import BlobContenido, ResolucionArchivo
+from .storage_names import campos_archivo, candidatos_nombre
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray.
+    Puede dar falsos positivos (un huérfano se toma por referenciado y no se borra),
+    nunca falsos negativos, así que no se borra ningún archivo en uso.
+    """
+
+    def __init__(self, capacidad, tasa_error=0.001):
+        capacidad = max(capacidad, 1)
+        self.num_bits = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _posiciones(self, valor):
+        # Doble hashing: k posiciones a partir de dos hashes de 64 bits
+        digest = hashlib.sha256(valor.encode()).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, valor):
+        for posicion in self._posiciones(valor):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __contains__(self, valor):
+        return all(self.bits[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+
+def iterar_nombres_referenciados():
+    """
+    Recorre desde la base de datos todos los nombres de archivo en uso:
+    valores de FileField (con sus candidatos para rutas antiguas), variantes de las
+    fotos de perfil, resoluciones registradas y archivos guardados por contenido
+    """
+    for modelo, campo in campos_archivo():
+        filas = (
+            modelo.objects.exclude(**{campo: ""})
+            .exclude(**{f"{campo}__isnull": True})
+            .values_list(campo, flat=True)
+            .iterator()
+        )
+        for nombre in filas:
+            yield from candidatos_nombre(nombre)
+            if campo == 'fotoperfil':
+                yield from nombres_variantes(nombre)
+    yield from ResolucionArchivo.objects.values_list('nombreresuelto', flat=True).iterator()
+    yield from BlobContenido.objects.values_list('nombre', flat=True).iterator()
+
+
+def _campos_contenido():
+    """Tuplas (modelo, campo) de los campos que guardan archivos por contenido"""
+    return [(modelo, campo) for modelo, campo in campos_archivo() if campo in campos_contenido(modelo)]
+
+
+def _usos_por_nombre(nombres):
+    """
+    Cuántos registros usan cada archivo guardado por contenido de un lote de nombres.
+    Una consulta agrupada por campo, no una por archivo
+    """
+    usos = dict.fromkeys(nombres, 0)
+    for modelo, campo in _campos_contenido():
+        filas = modelo.objects.filter(**{f"{campo}__in": nombres}).values(campo).annotate(usos=Count('pk'))
+        for fila in filas:
+            usos[fila[campo]] += fila['usos']
+    return usos
+
+
+def recalcular_referencias(min_edad_minutos=60, aplicar=True, tamano_lote=500, al_liberar=None):
+    """
+    Corrige el conteo de referencias de BlobContenido con los registros que realmente usan
+    cada archivo. Un conteo puede quedar alto, p. ej. si se vuelve a subir el mismo contenido
+    con FieldFile.save(): la subida suma una referencia antes de guardar el modelo y las
+    señales no pueden distinguirla de un guardado sin cambios. Los archivos que ya no usa
+    nadie pierden su registro y el recorrido de huérfanos los elimina del storage.
+    Se omiten los modificados hace menos de min_edad_minutos (subidas en curso).
+    BlobContenido se recorre en lotes por pk, así la memoria no depende del número de archivos.
+
+    Args:
+        aplicar: False solo cuenta (dry-run)
+        al_liberar: Función llamada con (nombre, tamaño) por cada archivo que queda sin uso
+
+    Returns:
+        tuple: (conteos corregidos, archivos sin referencias)
+    """
+    limite = timezone.now() - timedelta(minutes=min_edad_minutos)
+    candidatos = BlobContenido.objects.filter(fechamodificacion__lte=limite).order_by('pk')
+    campos = ('pk', 'nombre', 'referencias', 'tamano')
+    corregidos = liberados = 0
+    ultimo_pk = 0
+    while True:
+        lote = list(candidatos.filter(pk__gt=ultimo_pk).values_list(*campos)[:tamano_lote])
+        if not lote:
+            break
+        ultimo_pk = lote[-1][0]
+        usos = _usos_por_nombre([fila[1] for fila in lote])
+        desfasados = [fila for fila in lote if usos[fila[1]] != fila[2]]
+        if not desfasados:
+            continue
+
+        with transaction.atomic():
+            if aplicar:
+                # Se vuelve a contar con las filas bloqueadas por si cambiaron desde el conteo anterior
+                desfasados = list(
+                    candidatos.select_for_update().filter(pk__in=[fila[0] for fila in desfasados])
+                    .values_list(*campos)
+                )
+                usos = _usos_por_nombre([fila[1] for fila in desfasados])
+            sin_uso = []
+            for pk, nombre, referencias, tamano in desfasados:
+                reales = usos[nombre]
+                if reales == referencias:
+                    continue
+                corregidos += 1
+                if reales == 0:
+                    sin_uso.append(pk)
+                    if al_liberar:
+                        al_liberar(nombre, tamano)
+                elif aplicar:
+                    BlobContenido.objects.filter(pk=pk).update(referencias=reales)
+            liberados += len(sin_uso)
+            if aplicar and sin_uso:
+                BlobContenido.objects.filter(pk__in=sin_uso).delete()
+    return corregidos, liberados
+
+
+def contar_referencias():
+    """Cota superior de los nombres referenciados, para dimensionar el filtro de Bloom"""
+    total = ResolucionArchivo.objects.count() + BlobContenido.objects.count()
+    for modelo, campo in campos_archivo():
+        nombres_por_fila = 4 + (len(variantes()) if campo == 'fotoperfil' else 0)
+        total += nombres_por_fila * modelo.objects.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True}).count()
+    return total
+
+
+def construir_referenciados(nombres, capacidad=None, exacto=False, tasa_error=0.001):
+    """Guarda los nombres referenciados en un set (exacto) o en un filtro de Bloom"""
+    referenciados = set() if exacto else FiltroBloom(capacidad or 0, tasa_error)
+    for nombre in nombres:
+        referenciados.add(nombre)
+    return referenciados
+
+
+def nombres_replica_referenciados():
+    """Nombres de blob de las réplicas registradas en certificadoreplica"""
+    contenedor = getattr(settings, 'AZURE_STORAGE_CONTAINER_NAME', 'certificados')
+    modelos = {modelo for modelo, _ in campos_archivo()}
+    for modelo in modelos:
+        if 'certificadoreplica' not in [field.name for field in modelo._meta.fields]:
+            continue
+        for url in modelo.objects.exclude(certificadoreplica__isnull=True).values_list(
+            'certificadoreplica', flat=True
+        ).iterator():
+            ruta = unquote(urlparse(url).path).lstrip('/')
+            # La ruta de la URL empieza por el contenedor (y antes puede haber un prefijo del endpoint)
+            _, separador, nombre = ruta.partition(f"{contenedor}/")
+            if separador:
+                yield nombre
+
+
+def iterar_archivos_storage(storage, prefijo=''):
+    """
+    Recorre todos los archivos de un storage bajo un prefijo.
+
+    Yields:
+        tuple: (nombre, fecha de modificación o None, tamaño)
+    """
+    if hasattr(storage, 'iterar_blobs'):
+        # Azure: listado plano por páginas
+        for blob in storage.iterar_blobs(prefijo):
+            yield blob.name, blob.last_modified, blob.size
+        return
+
+    # Storage con directorios (FileSystemStorage): recorrido en profundidad, un directorio a la vez
+    pendientes = [prefijo.strip('/')]
+    while pendientes:
+        directorio = pendientes.pop()
+        try:
+            subdirectorios, archivos = storage.listdir(directorio)
+        except FileNotFoundError:
+            continue
+        for subdirectorio in subdirectorios:
+            pendientes.append(f"{directorio}/{subdirectorio}" if directorio else subdirectorio)
+        for archivo in archivos:
+            nombre = f"{directorio}/{archivo}" if directorio else archivo
+            try:
+                yield nombre, storage.get_modified_time(nombre), storage.size(nombre)
+            except (NotImplementedError, OSError):
+                yield nombre, None, 0
+
+
+def prefijos_excluidos():
+    """Prefijos que nunca se consideran huérfanos (no los referencia ningún FileField)"""
+    return (f"{getattr(settings, 'CV_PDF_CACHE_PREFIX', 'cv_pdf_cache')}/",)
+
+
+def iterar_huerfanos(archivos, referenciados, min_edad_minutos=60, excluidos=()):
+    """
+    Filtra los archivos no referenciados.
+    Se omiten los modificados hace menos de min_edad_minutos: pueden ser subidas en curso
+    cuyo registro aún no se confirmó.
+    """
+    limite = timezone.now() - timedelta(minutes=min_edad_minutos)
+    for nombre, modificado, tamano in archivos:
+        if excluidos and nombre.startswith(excluidos):
+            continue
+        if nombre in referenciados:
+            continue
+        if modificado is not None and modificado > limite:
+            continue
+        yield nombre, tamano
+
+
+def filtrar_referenciados_ahora(nombres):
+    """
+    Quita de un lote los archivos guardados por contenido que pasaron a estar en uso después
+    de construir el conjunto de referenciados (p. ej. ContentAddressedStorage._save registró
+    un archivo ya subido). Los nombres se comparan por huella (el archivo y sus variantes)
+    y contra los FileField, con una consulta por tabla para todo el lote
+
+    Returns:
+        list: Nombres del lote que siguen sin usarse
+    """
+    prefijo = f"{getattr(settings, 'CV_CAS_PREFIX', 'contenido')}/"
+    contenido = [nombre for nombre in nombres if nombre.startswith(prefijo)]
+    if not contenido:
+        return list(nombres)
+
+    # 'contenido/ab/<sha256>.pdf' y 'contenido/ab/<sha256>_pdf.jpg' -> '<sha256>'
+    huellas = {nombre: posixpath.basename(nombre)[:64] for nombre in contenido}
+    registradas = set(
+        BlobContenido.objects.filter(huella__in=set(huellas.values())).values_list('huella', flat=True)
+    )
+    en_uso = {nombre for nombre, huella in huellas.items() if huella in registradas}
+    for modelo, campo in campos_archivo():
+        en_uso.update(modelo.objects.filter(**{f"{campo}__in": contenido}).values_list(campo, flat=True))
+    return [nombre for nombre in nombres if nombre not in en_uso]
+
+
+def eliminar_lote(storage, nombres):
+    """
+    Elimina un lote de archivos. Si el storage lo permite (Azure) se usa una sola petición
+    por lote; si no, se eliminan uno a uno
+
+    Returns:
+        dict: nombre -> True si se eliminó, o el mensaje de error
+    """
+    if hasattr(storage, 'delete_many'):
+        return storage.delete_many(nombres)
+
+    resultados = {}
+    for nombre in nombres:
+        try:
+            storage.delete(nombre)
+            resultados[nombre] = True
+        except Exception as e:
+            resultados[nombre] = str(e)
+    return resultados
@@ -0,0 +1,72 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.models import DatosPersonales
+from tasks.pdf_generator import CVPDFGenerator, _construir_estilos, obtener_estilos
+from tasks.storage_resilience import politica_almacenamiento
+
+
+class Command(BaseCommand):
+    help = "Mide el costo de preparación por render (estilos) y, opcionalmente, el render completo de un CV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=200,
+                            help="Repeticiones para medir la preparación de estilos")
+        parser.add_argument("--usuario", help="Username cuyo CV se genera completo (sin caché)")
+        parser.add_argument("--renders", type=int, default=10,
+                            help="Número de renders completos a medir con --usuario")
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return tiempos
+
+    def _reportar(self, titulo, tiempos):
+        ordenados = sorted(tiempos)
+        p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+        self.stdout.write(
+            f"{titulo}: media {statistics.mean(tiempos) * 1000:.3f} ms, "
+            f"p95 {p95 * 1000:.3f} ms ({len(tiempos)} repeticiones)"
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = options["repeticiones"]
+
+        # Antes: cada render construía su propia hoja de estilos
+        self._reportar("Estilos por render (sin compartir)", self._medir(_construir_estilos, repeticiones))
+        # Después: la hoja de estilos se construye una vez y se comparte
+        obtener_estilos()
+        self._reportar("Estilos por render (compartidos)", self._medir(obtener_estilos, repeticiones))
+
+        if not options["usuario"]:
+            return
+
+        try:
+            datos = DatosPersonales.objects.get(user__username=options["usuario"])
+        except DatosPersonales.DoesNotExist:
+            raise CommandError(f"El usuario {options['usuario']} no tiene hoja de vida")
+
+        descargas = []
+
+        def render():
+            generator = CVPDFGenerator(DatosPersonales.objects.get(pk=datos.pk))
+            pdf = generator.generate()
+            if pdf is None:
+                raise CommandError("Error generando el PDF")
+            pdf.close()
+            descargas.extend(d["segundos"] for d in generator.tiempos_descarga)
+
+        self._reportar("Render completo", self._medir(render, options["renders"]))
+        if descargas:
+            self._reportar("Descarga por archivo", descargas)
+        metricas = politica_almacenamiento.metricas()
+        if metricas.get("llamadas"):
+            self.stdout.write(
+                f"Azure Storage: {metricas['llamadas']} llamadas, {metricas.get('reintentos', 0)} reintentos, "
+                f"{metricas.get('circuito_abierto', 0)} aperturas del circuito, "
+                f"{metricas.get('rechazadas', 0)} rechazadas (circuito {metricas['estado_circuito']})"
+            )
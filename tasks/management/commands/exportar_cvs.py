@@ -0,0 +1,123 @@
+import os
+import shutil
+import time
+import zipfile
+from multiprocessing import Pool
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tasks.models import DatosPersonales
+
+
+def _inicializar_worker():
+    """Prepara Django en cada proceso del pool (necesario con el método 'spawn')"""
+    django.setup()
+    # Cada proceso abre su propia conexión; no se reutiliza la heredada del proceso padre
+    connections.close_all()
+
+
+def _exportar_cv(tarea):
+    """Genera el PDF de una hoja de vida y lo escribe de forma atómica en la ruta indicada"""
+    from tasks.pdf_cache import obtener_pdf_cv
+
+    datos_id, ruta = tarea
+    inicio = time.perf_counter()
+    try:
+        datos = DatosPersonales.objects.select_related("user").get(pk=datos_id)
+        pdf = obtener_pdf_cv(datos)
+        if pdf is None:
+            raise RuntimeError("no se pudo generar el PDF")
+        temp_path = f"{ruta}.tmp"
+        with pdf, open(temp_path, "wb") as destino:
+            shutil.copyfileobj(pdf, destino, 64 * 1024)
+        os.replace(temp_path, ruta)
+        return datos_id, ruta, None, time.perf_counter() - inicio
+    except Exception as e:
+        return datos_id, ruta, str(e), time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta en PDF las hojas de vida (todas o filtradas) usando varios procesos. "
+        "Si se interrumpe, al volver a ejecutarlo continúa con las que faltan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("destino",
+                            help="Directorio de salida, o archivo .zip para un solo archivo comprimido")
+        parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                            help="Número de procesos en paralelo")
+        parser.add_argument("--usuarios", nargs="+", help="Exportar solo estos usernames")
+        parser.add_argument("--solo-activos", action="store_true",
+                            help="Exportar solo perfiles con perfilactivo=True")
+        parser.add_argument("--reiniciar", action="store_true",
+                            help="Vuelve a generar los PDFs ya exportados")
+
+    def handle(self, *args, **options):
+        destino = options["destino"]
+        como_zip = destino.lower().endswith(".zip")
+        # En modo ZIP los PDFs se escriben primero en un directorio de trabajo, que permite reanudar
+        directorio = f"{destino}.partes" if como_zip else destino
+        os.makedirs(directorio, exist_ok=True)
+
+        hojas_vida = DatosPersonales.objects.all()
+        if options["usuarios"]:
+            hojas_vida = hojas_vida.filter(user__username__in=options["usuarios"])
+        if options["solo_activos"]:
+            hojas_vida = hojas_vida.filter(perfilactivo=True)
+
+        tareas = []
+        omitidas = 0
+        for datos_id, username in hojas_vida.order_by("pk").values_list("pk", "user__username"):
+            ruta = os.path.join(directorio, f"CV_{username}.pdf")
+            if os.path.exists(ruta) and not options["reiniciar"]:
+                omitidas += 1
+                continue
+            tareas.append((datos_id, ruta))
+
+        self.stdout.write(f"{len(tareas)} hojas de vida por exportar ({omitidas} ya exportadas)")
+
+        exitos = 0
+        fallos = []
+        inicio = time.perf_counter()
+        if tareas:
+            # Cerrar las conexiones antes de crear los procesos para no compartir sockets
+            connections.close_all()
+            procesos = max(1, min(options["procesos"], len(tareas)))
+            with Pool(processes=procesos, initializer=_inicializar_worker) as pool:
+                for datos_id, ruta, error, segundos in pool.imap_unordered(_exportar_cv, tareas):
+                    if error:
+                        fallos.append((datos_id, error))
+                        self.stdout.write(self.style.ERROR(f"Hoja de vida {datos_id}: {error}"))
+                    else:
+                        exitos += 1
+                        self.stdout.write(f"{os.path.basename(ruta)} ({segundos:.2f}s)")
+        transcurrido = time.perf_counter() - inicio
+
+        if como_zip:
+            self._crear_zip(directorio, destino, limpiar=not fallos)
+
+        velocidad = exitos / transcurrido if transcurrido > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{exitos} exportadas, {omitidas} omitidas, {len(fallos)} fallidas "
+            f"en {transcurrido:.1f}s ({velocidad:.2f} CVs/s)"
+        ))
+        if fallos:
+            raise CommandError(
+                f"{len(fallos)} hojas de vida fallaron; vuelva a ejecutar el comando para reintentarlas"
+            )
+
+    def _crear_zip(self, directorio, destino, limpiar):
+        """Empaqueta los PDFs exportados en un solo archivo ZIP"""
+        temp_path = f"{destino}.tmp"
+        # Los PDF ya están comprimidos, así que se guardan sin volver a comprimir
+        with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_STORED) as archivo_zip:
+            for nombre in sorted(os.listdir(directorio)):
+                if nombre.endswith(".pdf"):
+                    archivo_zip.write(os.path.join(directorio, nombre), arcname=nombre)
+        os.replace(temp_path, destino)
+        if limpiar:
+            shutil.rmtree(directorio)
+        self.stdout.write(f"ZIP creado: {destino}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from tasks.fotos_perfil import generar_variantes
+from tasks.models import DatosPersonales
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las variantes reducidas (PDF, avatar, WebP) de las fotos de perfil "
+        "subidas antes de que existieran"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sobrescribir", action="store_true",
+                            help="Vuelve a generar también las variantes que ya existen")
+
+    def handle(self, *args, **options):
+        generadas = errores = 0
+        filas = DatosPersonales.objects.exclude(fotoperfil="").exclude(fotoperfil__isnull=True).iterator()
+        for datos in filas:
+            try:
+                generadas += len(generar_variantes(datos.fotoperfil, sobrescribir=options["sobrescribir"]))
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.ERROR(f"{datos.fotoperfil.name}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"{generadas} variantes generadas, {errores} errores"))
@@ -0,0 +1,112 @@
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from tasks.azure_storage import azure_storage
+from tasks.huerfanos import (
+    construir_referenciados, contar_referencias, eliminar_lote, filtrar_referenciados_ahora, iterar_archivos_storage,
+    iterar_huerfanos, iterar_nombres_referenciados, nombres_replica_referenciados, prefijos_excluidos,
+    recalcular_referencias,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina del storage los archivos que ya no referencia ningún registro "
+        "(certificados y fotos de filas borradas o reemplazadas, réplicas antiguas)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Solo muestra los huérfanos, sin eliminar nada")
+        parser.add_argument("--prefijo", default="",
+                            help="Revisar solo los archivos bajo este prefijo")
+        parser.add_argument("--lote", type=int, default=256,
+                            help="Archivos eliminados por lote")
+        parser.add_argument("--min-edad", type=int, default=60,
+                            help="Minutos: no se eliminan archivos más recientes (subidas en curso)")
+        parser.add_argument("--exacto", action="store_true",
+                            help="Guardar los nombres referenciados en un conjunto en lugar de un filtro de Bloom")
+        parser.add_argument("--replicas", action="store_true",
+                            help="Revisar también el contenedor de réplicas de certificados")
+
+    def _limpiar(self, titulo, archivos, referenciados, eliminar, options, excluidos=(), verificar=None):
+        huerfanos = iterar_huerfanos(archivos, referenciados, options["min_edad"], excluidos)
+        encontrados = eliminados = errores = bytes_huerfanos = 0
+        while True:
+            lote = list(islice(huerfanos, options["lote"]))
+            if not lote:
+                break
+            if verificar:
+                # Los referenciados se calcularon al empezar: se descartan los que pasaron a usarse
+                vigentes = set(verificar([nombre for nombre, _ in lote]))
+                lote = [(nombre, tamano) for nombre, tamano in lote if nombre in vigentes]
+            encontrados += len(lote)
+            bytes_huerfanos += sum(tamano or 0 for _, tamano in lote)
+            if options["dry_run"]:
+                for nombre, tamano in lote:
+                    self.stdout.write(f"{titulo}: {nombre} ({tamano or 0} bytes)")
+                continue
+
+            for nombre, resultado in eliminar([nombre for nombre, _ in lote]).items():
+                if resultado is True:
+                    eliminados += 1
+                else:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(f"{titulo}: no se pudo eliminar {nombre}: {resultado}"))
+
+        resumen = f"{titulo}: {encontrados} huérfanos ({bytes_huerfanos / 1024 / 1024:.1f} MB)"
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(resumen + " (dry-run, sin cambios)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{resumen}, {eliminados} eliminados, {errores} errores"))
+
+    def handle(self, *args, **options):
+        # Primero se corrigen los conteos de los archivos guardados por contenido: los que ya
+        # no usa nadie dejan de estar referenciados y el recorrido los elimina
+        bytes_liberados = 0
+
+        def al_liberar(nombre, tamano):
+            nonlocal bytes_liberados
+            bytes_liberados += tamano or 0
+            # En dry-run el registro no se elimina y el recorrido no los vería como huérfanos
+            if options["dry_run"]:
+                self.stdout.write(f"media: {nombre} ({tamano or 0} bytes, sin referencias)")
+
+        corregidos, liberados = recalcular_referencias(
+            options["min_edad"], aplicar=not options["dry_run"], al_liberar=al_liberar
+        )
+        self.stdout.write(
+            f"Referencias: {corregidos} conteos corregidos, {liberados} archivos sin uso "
+            f"({bytes_liberados / 1024 / 1024:.1f} MB)"
+        )
+
+        capacidad = None if options["exacto"] else contar_referencias()
+        referenciados = construir_referenciados(
+            iterar_nombres_referenciados(), capacidad, exacto=options["exacto"]
+        )
+        self._limpiar(
+            "media",
+            iterar_archivos_storage(default_storage, options["prefijo"]),
+            referenciados,
+            lambda nombres: eliminar_lote(default_storage, nombres),
+            options,
+            excluidos=prefijos_excluidos(),
+            verificar=filtrar_referenciados_ahora,
+        )
+
+        if options["replicas"]:
+            replicas = construir_referenciados(nombres_replica_referenciados(), capacidad, exacto=options["exacto"])
+            self._limpiar(
+                "réplicas",
+                (
+                    (blob.name, blob.last_modified, blob.size)
+                    for blob in azure_storage.iterar_documentos(options["prefijo"])
+                ),
+                replicas,
+                lambda nombres: {
+                    nombre: eliminado or "error" for nombre, eliminado in azure_storage.delete_documents(nombres).items()
+                },
+                options,
+            )
@@ -0,0 +1,58 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from tasks.storage_names import campos_archivo, candidatos_nombre, registrar_resolucion
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca el nombre real en el storage de los archivos con rutas antiguas, "
+        "lo registra y reescribe el nombre guardado en el FileField"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Solo muestra los cambios, sin guardar nada")
+        parser.add_argument("--solo-registrar", action="store_true",
+                            help="Registra la resolución pero no reescribe el FileField")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        correctos = resueltos = no_encontrados = 0
+
+        for modelo, campo in campos_archivo():
+            filas = (
+                modelo.objects.exclude(**{campo: ""})
+                .exclude(**{f"{campo}__isnull": True})
+                .values_list("pk", campo)
+                .iterator()
+            )
+            for pk, nombre in filas:
+                candidatos = candidatos_nombre(nombre)
+                if candidatos[0] == nombre and default_storage.exists(nombre):
+                    correctos += 1
+                    continue
+
+                # Probar los candidatos restantes hasta encontrar el archivo
+                resuelto = next((c for c in candidatos if default_storage.exists(c)), None)
+                if resuelto is None:
+                    no_encontrados += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"{modelo.__name__} {pk}.{campo}: no se encontró '{nombre}'"
+                    ))
+                    continue
+
+                resueltos += 1
+                self.stdout.write(f"{modelo.__name__} {pk}.{campo}: '{nombre}' -> '{resuelto}'")
+                if dry_run:
+                    continue
+
+                registrar_resolucion(nombre, resuelto)
+                if not options["solo_registrar"]:
+                    # update() no modifica fechamodificacion ni dispara señales
+                    modelo.objects.filter(pk=pk).update(**{campo: resuelto})
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{correctos} correctos, {resueltos} resueltos, {no_encontrados} no encontrados"
+            + (" (dry-run, sin cambios)" if dry_run else "")
+        ))
@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.certificados import liberar_replicas_abandonadas, procesar_replica, reservar_siguiente_replica
+from tasks.models import ReplicaPendiente
+
+
+class Command(BaseCommand):
+    help = "Sube al contenedor de réplica los certificados pendientes de la bandeja de salida"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Procesa las réplicas pendientes y termina")
+        parser.add_argument("--intervalo", type=float, default=2.0,
+                            help="Segundos de espera cuando no hay réplicas pendientes")
+        parser.add_argument("--max-replicas", type=int, default=0,
+                            help="Termina después de procesar N réplicas (0 = sin límite)")
+        parser.add_argument("--reintentar-errores", action="store_true",
+                            help="Devuelve a la cola las réplicas que agotaron sus intentos")
+
+    def handle(self, *args, **options):
+        liberadas = liberar_replicas_abandonadas()
+        if liberadas:
+            self.stdout.write(self.style.WARNING(f"{liberadas} réplicas abandonadas devueltas a la cola."))
+        if options["reintentar_errores"]:
+            reintentadas = ReplicaPendiente.objects.filter(estado="error").update(estado="pendiente", intentos=0)
+            self.stdout.write(f"{reintentadas} réplicas con error devueltas a la cola.")
+
+        procesadas = 0
+        while True:
+            close_old_connections()
+            replica = reservar_siguiente_replica()
+            if replica is None:
+                if options["una_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+                continue
+
+            procesar_replica(replica)
+            procesadas += 1
+            if replica.estado == "completado":
+                self.stdout.write(self.style.SUCCESS(f"Réplica {replica.id} subida: {replica.url}"))
+            elif replica.estado == "descartado":
+                self.stdout.write(f"Réplica {replica.id} descartada: el certificado ya no existe o cambió")
+            elif replica.estado == "pendiente":
+                self.stdout.write(self.style.WARNING(
+                    f"Réplica {replica.id} falló (intento {replica.intentos}), "
+                    f"se reintentará desde {replica.fechaproximointento:%H:%M:%S}: {replica.mensajeerror}"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"Réplica {replica.id} falló definitivamente: {replica.mensajeerror}"))
+
+            if options["max_replicas"] and procesadas >= options["max_replicas"]:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"{procesadas} réplicas procesadas."))
@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.pdf_jobs import liberar_trabajos_abandonados, procesar_trabajo, reservar_siguiente_trabajo
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos de generación de PDF de hojas de vida encolados en la base de datos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Procesa los trabajos pendientes y termina")
+        parser.add_argument("--intervalo", type=float, default=2.0,
+                            help="Segundos de espera cuando no hay trabajos pendientes")
+        parser.add_argument("--max-trabajos", type=int, default=0,
+                            help="Termina después de procesar N trabajos (0 = sin límite)")
+        parser.add_argument("--liberar-cada", type=float, default=60.0,
+                            help="Segundos entre revisiones de trabajos abandonados por workers caídos")
+
+    def _liberar_abandonados(self):
+        liberados = liberar_trabajos_abandonados()
+        if liberados:
+            self.stdout.write(self.style.WARNING(f"{liberados} trabajos abandonados devueltos a la cola."))
+
+    def handle(self, *args, **options):
+        self._liberar_abandonados()
+        ultima_liberacion = time.monotonic()
+
+        procesados = 0
+        while True:
+            close_old_connections()
+            # Un worker caído deja sus trabajos en 'procesando': los que siguen vivos los recuperan
+            if time.monotonic() - ultima_liberacion >= options["liberar_cada"]:
+                self._liberar_abandonados()
+                ultima_liberacion = time.monotonic()
+            trabajo = reservar_siguiente_trabajo()
+            if trabajo is None:
+                if options["una_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+                continue
+
+            procesar_trabajo(trabajo)
+            procesados += 1
+            if trabajo.estado == "completado":
+                self.stdout.write(self.style.SUCCESS(
+                    f"Trabajo {trabajo.id} completado en {trabajo.duracion:.2f}s"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"Trabajo {trabajo.id} falló: {trabajo.mensajeerror}"))
+
+            if options["max_trabajos"] and procesados >= options["max_trabajos"]:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"{procesados} trabajos procesados."))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 22:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0002_datospersonales_alter_task_datecompleted_ventagarage_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('huella', models.CharField(blank=True, max_length=64, null=True)),
+                ('duracion', models.FloatField(blank=True, null=True)),
+                ('mensajeerror', models.TextField(blank=True, null=True)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+                ('fechainicio', models.DateTimeField(blank=True, null=True)),
+                ('fechafin', models.DateTimeField(blank=True, null=True)),
+                ('datospersonales', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_pdf', to='tasks.datospersonales')),
+                ('solicitante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_pdf', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Trabajos PDF',
+                'ordering': ['fechacreacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_trabajopdf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolucionArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombreoriginal', models.CharField(max_length=255, unique=True)),
+                ('nombreresuelto', models.CharField(max_length=255)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Resoluciones de Archivos',
+            },
+        ),
+    ]
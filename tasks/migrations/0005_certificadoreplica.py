@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_resolucionarchivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='certificadoreplica',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificadoreplica',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='certificadoreplica',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-17 22:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_certificadoreplica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicaPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50)),
+                ('objetoid', models.PositiveIntegerField()),
+                ('certificado', models.CharField(max_length=255)),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('descartado', 'Descartado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('url', models.CharField(blank=True, max_length=500, null=True)),
+                ('mensajeerror', models.TextField(blank=True, null=True)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+                ('fechaproximointento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fechainicio', models.DateTimeField(blank=True, null=True)),
+                ('fechafin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Réplicas Pendientes',
+                'ordering': ['fechacreacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='estadoreplica',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('error', 'Error')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='estadoreplica',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('error', 'Error')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='estadoreplica',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('error', 'Error')], max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='replicapendiente',
+            index=models.Index(fields=['estado', 'fechaproximointento'], name='tasks_repli_estado_05cc96_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-17 22:59
+
+import django.core.validators
+from django.db import migrations, models
+import tasks.content_storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_replicapendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobContenido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(max_length=64, unique=True)),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.BigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Blobs de Contenido',
+            },
+        ),
+        migrations.AlterField(
+            model_name='cursorealizado',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, storage=tasks.content_storage.storage_archivos, upload_to='certificados/cursos/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='datospersonales',
+            name='fotoperfil',
+            field=models.ImageField(blank=True, null=True, storage=tasks.content_storage.storage_archivos, upload_to='profile_pics/'),
+        ),
+        migrations.AlterField(
+            model_name='experiencialaboral',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, storage=tasks.content_storage.storage_archivos, upload_to='certificados/experiencia/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+        migrations.AlterField(
+            model_name='reconocimiento',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, storage=tasks.content_storage.storage_archivos, upload_to='certificados/reconocimientos/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_blobcontenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blobcontenido',
+            name='fechamodificacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
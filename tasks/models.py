@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
 from datetime import date
 
+from .content_storage import storage_archivos
+
 class Task(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -43,7 +46,7 @@ class DatosPersonales(models.Model):
     direcciontrabajo = models.CharField(max_length=100, blank=True, null=True)
     direcciondomiciliaria = models.CharField(max_length=100, blank=True, null=True)
     sitioweb = models.CharField(max_length=60, blank=True, null=True)
-    fotoperfil = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    fotoperfil = models.ImageField(upload_to='profile_pics/', storage=storage_archivos, null=True, blank=True)
     fechacreacion = models.DateTimeField(auto_now_add=True)
     fechamodificacion = models.DateTimeField(auto_now=True)
 
@@ -55,6 +58,14 @@ class DatosPersonales(models.Model):
         return f"{self.nombres} {self.apellidos}"
 
 
+# Estado de la copia del certificado en el contenedor de réplica (ver tasks/certificados.py)
+ESTADO_REPLICA_CHOICES = [
+    ('pendiente', 'Pendiente'),
+    ('completado', 'Completado'),
+    ('error', 'Error'),
+]
+
+
 class ExperienciaLaboral(models.Model):
     """Modelo para experiencia laboral"""
     datospersonales = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE, related_name='experiencias_laborales')
@@ -69,8 +80,10 @@ class ExperienciaLaboral(models.Model):
     fechafingestion = models.DateField(blank=True, null=True)
     descripcionfunciones = models.TextField(blank=True, null=True)
     activo = models.BooleanField(default=True)
-    certificado = models.FileField(upload_to='certificados/experiencia/', null=True, blank=True,
+    certificado = models.FileField(upload_to='certificados/experiencia/', storage=storage_archivos, null=True, blank=True,
                                   validators=[FileExtensionValidator(allowed_extensions=['pdf'])])
+    certificadoreplica = models.CharField(max_length=500, null=True, blank=True)
+    estadoreplica = models.CharField(max_length=20, choices=ESTADO_REPLICA_CHOICES, null=True, blank=True)
     fechacreacion = models.DateTimeField(auto_now_add=True)
     fechamodificacion = models.DateTimeField(auto_now=True)
 
@@ -98,8 +111,10 @@ class Reconocimiento(models.Model):
     nombrecontactoauspicia = models.CharField(max_length=100, blank=True, null=True)
     telefonocontactoauspicia = models.CharField(max_length=60, blank=True, null=True)
     activo = models.BooleanField(default=True)
-    certificado = models.FileField(upload_to='certificados/reconocimientos/', null=True, blank=True,
+    certificado = models.FileField(upload_to='certificados/reconocimientos/', storage=storage_archivos, null=True, blank=True,
                                   validators=[FileExtensionValidator(allowed_extensions=['pdf'])])
+    certificadoreplica = models.CharField(max_length=500, null=True, blank=True)
+    estadoreplica = models.CharField(max_length=20, choices=ESTADO_REPLICA_CHOICES, null=True, blank=True)
     fechacreacion = models.DateTimeField(auto_now_add=True)
     fechamodificacion = models.DateTimeField(auto_now=True)
 
@@ -124,8 +139,10 @@ class CursoRealizado(models.Model):
     telefonocontactoauspicia = models.CharField(max_length=60, blank=True, null=True)
     emailempresapatrocinadora = models.EmailField(blank=True, null=True)
     activo = models.BooleanField(default=True)
-    certificado = models.FileField(upload_to='certificados/cursos/', null=True, blank=True,
+    certificado = models.FileField(upload_to='certificados/cursos/', storage=storage_archivos, null=True, blank=True,
                                   validators=[FileExtensionValidator(allowed_extensions=['pdf'])])
+    certificadoreplica = models.CharField(max_length=500, null=True, blank=True)
+    estadoreplica = models.CharField(max_length=20, choices=ESTADO_REPLICA_CHOICES, null=True, blank=True)
     fechacreacion = models.DateTimeField(auto_now_add=True)
     fechamodificacion = models.DateTimeField(auto_now=True)
 
@@ -194,3 +211,98 @@ class VentaGarage(models.Model):
 
     def __str__(self):
         return f"{self.nombreproducto} ({self.estadoproducto})"
+
+
+# ============================
+# TRABAJOS EN SEGUNDO PLANO
+# ============================
+
+class TrabajoPDF(models.Model):
+    """Trabajo de generación del PDF de una hoja de vida en segundo plano"""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    datospersonales = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE, related_name='trabajos_pdf')
+    solicitante = models.ForeignKey(User, on_delete=models.CASCADE, related_name='trabajos_pdf')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    huella = models.CharField(max_length=64, blank=True, null=True)
+    duracion = models.FloatField(blank=True, null=True)
+    mensajeerror = models.TextField(blank=True, null=True)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+    fechainicio = models.DateTimeField(blank=True, null=True)
+    fechafin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "Trabajos PDF"
+        ordering = ['fechacreacion']
+
+    def __str__(self):
+        return f"PDF {self.datospersonales} ({self.estado})"
+
+
+class ReplicaPendiente(models.Model):
+    """
+    Bandeja de salida de réplicas de certificados: se crea en la misma transacción que la fila
+    dueña del certificado y la procesa el comando `procesar_replicas`
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('descartado', 'Descartado'),
+        ('error', 'Error'),
+    ]
+
+    modelo = models.CharField(max_length=50)
+    objetoid = models.PositiveIntegerField()
+    certificado = models.CharField(max_length=255)
+    clave = models.CharField(max_length=64, unique=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    url = models.CharField(max_length=500, blank=True, null=True)
+    mensajeerror = models.TextField(blank=True, null=True)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+    fechaproximointento = models.DateTimeField(default=timezone.now)
+    fechainicio = models.DateTimeField(blank=True, null=True)
+    fechafin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "Réplicas Pendientes"
+        ordering = ['fechacreacion']
+        indexes = [models.Index(fields=['estado', 'fechaproximointento'])]
+
+    def __str__(self):
+        return f"Réplica {self.modelo} {self.objetoid} ({self.estado})"
+
+
+class BlobContenido(models.Model):
+    """Archivo guardado por hash de contenido y cuántos registros lo usan (ver tasks/content_storage.py)"""
+    huella = models.CharField(max_length=64, unique=True)
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.BigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+    fechamodificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Blobs de Contenido"
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+
+class ResolucionArchivo(models.Model):
+    """Nombre real en el storage de un archivo cuyo nombre guardado no coincide (rutas antiguas)"""
+    nombreoriginal = models.CharField(max_length=255, unique=True)
+    nombreresuelto = models.CharField(max_length=255)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Resoluciones de Archivos"
+
+    def __str__(self):
+        return f"{self.nombreoriginal} -> {self.nombreresuelto}"
@@ -0,0 +1,361 @@
+"""
+Caché de PDFs generados de hojas de vida
+Los PDFs se guardan por huella de contenido: si la hoja de vida no cambió,
+se sirve el PDF guardado sin volver a ejecutar ReportLab ni descargar archivos
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from collections import OrderedDict
+from datetime import date
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+# Incrementar cuando cambie el diseño del PDF para invalidar la caché existente
+VERSION_PLANTILLA = 1
+
+# Relaciones que se muestran en el PDF y los campos que afectan su contenido
+RELACIONES_CV = {
+    'experiencias_laborales': ('pk', 'activo', 'fechamodificacion', 'certificado'),
+    'reconocimientos': ('pk', 'activo', 'fechamodificacion', 'certificado'),
+    'cursos_realizados': ('pk', 'activo', 'fechamodificacion', 'certificado'),
+    'productos_academicos': ('pk', 'activo', 'fechamodificacion'),
+}
+
+
+def calcular_huella_cv(datos_personales):
+    """
+    Calcula la huella de contenido de una hoja de vida.
+
+    La huella combina los campos de DatosPersonales, el email del usuario,
+    la fechamodificacion de cada fila hija y los nombres de sus certificados.
+    También incluye la fecha del día, ya que el pie de página la muestra.
+
+    Args:
+        datos_personales: Instancia de DatosPersonales
+
+    Returns:
+        str: Huella hexadecimal (sha256)
+    """
+    huella = hashlib.sha256()
+    huella.update(f"v{VERSION_PLANTILLA}|{date.today().isoformat()}".encode())
+
+    for field in datos_personales._meta.concrete_fields:
+        valor = getattr(datos_personales, field.attname)
+        huella.update(f"|{field.attname}={valor}".encode())
+    huella.update(f"|email={datos_personales.user.email}".encode())
+
+    for relacion, campos in RELACIONES_CV.items():
+        filas = getattr(datos_personales, relacion).order_by('pk').values_list(*campos)
+        huella.update(f"|{relacion}".encode())
+        for fila in filas:
+            huella.update(repr(fila).encode())
+
+    return huella.hexdigest()
+
+
+class LocalFileSystemCacheBackend:
+    """Backend de caché que guarda los PDFs en un directorio local"""
+
+    # La fecha de modificación de cada archivo es su último acceso (ver tocar), compartido por todos los workers
+    registra_accesos = True
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or getattr(
+            settings, 'CV_PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cv_pdf_cache')
+        )
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def abrir(self, clave):
+        """Abre el PDF guardado o retorna None si no existe"""
+        try:
+            return open(self._ruta(clave), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, clave, archivo):
+        """Guarda el PDF de forma atómica y retorna su tamaño en bytes"""
+        os.makedirs(self.directorio, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as destino:
+                shutil.copyfileobj(archivo, destino)
+            os.replace(temp_path, self._ruta(clave))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return os.path.getsize(self._ruta(clave))
+
+    def eliminar(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    def tocar(self, clave):
+        """Actualiza la fecha de último acceso usada por la política LRU"""
+        try:
+            os.utime(self._ruta(clave))
+        except OSError:
+            pass
+
+    def listar(self):
+        """Retorna tuplas (clave, tamaño, último acceso) de las entradas guardadas"""
+        if not os.path.isdir(self.directorio):
+            return []
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.pdf'):
+                continue
+            stat = os.stat(os.path.join(self.directorio, nombre))
+            entradas.append((nombre[:-4], stat.st_size, stat.st_mtime))
+        return entradas
+
+
+class DjangoStorageCacheBackend:
+    """Backend de caché que guarda los PDFs en el storage de Django configurado (local o Azure)"""
+
+    registra_accesos = False
+
+    def __init__(self, storage=None, prefijo=None):
+        self.storage = storage or default_storage
+        self.prefijo = prefijo or getattr(settings, 'CV_PDF_CACHE_PREFIX', 'cv_pdf_cache')
+
+    def _nombre(self, clave):
+        return f"{self.prefijo}/{clave}.pdf"
+
+    def abrir(self, clave):
+        try:
+            return self.storage.open(self._nombre(clave), 'rb')
+        except Exception:
+            return None
+
+    def guardar(self, clave, archivo):
+        nombre = self._nombre(clave)
+        if self.storage.exists(nombre):
+            self.storage.delete(nombre)
+        self.storage.save(nombre, File(archivo))
+        return self.storage.size(nombre)
+
+    def eliminar(self, clave):
+        try:
+            self.storage.delete(self._nombre(clave))
+        except Exception as e:
+            print(f"Error eliminando PDF de caché: {e}")
+
+    def tocar(self, clave):
+        # El storage no permite actualizar fechas de acceso; el orden LRU se mantiene en memoria
+        pass
+
+    def listar(self):
+        if hasattr(self.storage, 'iterar_blobs'):
+            # Azure: el listado por páginas ya trae el tamaño, sin una consulta por archivo
+            try:
+                return [
+                    (os.path.basename(blob.name)[:-4], blob.size, blob.last_modified.timestamp())
+                    for blob in self.storage.iterar_blobs(f"{self.prefijo}/")
+                    if blob.name.endswith('.pdf')
+                ]
+            except Exception:
+                return []
+        try:
+            _, archivos = self.storage.listdir(self.prefijo)
+        except Exception:
+            return []
+        entradas = []
+        for nombre in archivos:
+            nombre = os.path.basename(nombre)
+            if not nombre.endswith('.pdf'):
+                continue
+            try:
+                tamano = self.storage.size(f"{self.prefijo}/{nombre}")
+            except Exception:
+                tamano = 0
+            entradas.append((nombre[:-4], tamano, 0))
+        return entradas
+
+
+class CVPDFCache:
+    """
+    Caché LRU limitada por tamaño para los PDFs de hojas de vida.
+    Lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, backend=None, max_bytes=None):
+        self.backend = backend or self._crear_backend()
+        self.max_bytes = max_bytes if max_bytes is not None else getattr(
+            settings, 'CV_PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024
+        )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._indice = None  # OrderedDict clave -> tamaño, del menos al más reciente
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _crear_backend():
+        tipo = getattr(settings, 'CV_PDF_CACHE_BACKEND', 'local')
+        if tipo == 'storage':
+            return DjangoStorageCacheBackend()
+        return LocalFileSystemCacheBackend()
+
+    def _cargar_indice(self):
+        if self._indice is None:
+            entradas = sorted(self.backend.listar(), key=lambda entrada: entrada[2])
+            self._indice = OrderedDict((clave, tamano) for clave, tamano, _ in entradas)
+        return self._indice
+
+    def _sincronizar_indice(self, entradas):
+        """
+        Rehace el índice con el listado del backend, que incluye las entradas guardadas o
+        expulsadas por otros workers. Si el backend no registra accesos, las entradas que
+        conoce este proceso conservan su orden LRU y quedan como las más recientes.
+        """
+        # Posición en el orden LRU de este proceso; las entradas que no conoce van primero
+        posiciones = {clave: i for i, clave in enumerate(self._indice or ())}
+        if getattr(self.backend, 'registra_accesos', False):
+            # Las fechas de archivo tienen poca resolución: a igual fecha decide el orden local
+            orden = lambda entrada: (entrada[2], posiciones.get(entrada[0], -1))
+        else:
+            orden = lambda entrada: (entrada[0] in posiciones, posiciones.get(entrada[0], -1), entrada[2])
+        self._indice = OrderedDict((clave, tamano) for clave, tamano, _ in sorted(entradas, key=orden))
+        return self._indice
+
+    def obtener(self, clave):
+        """
+        Busca un PDF en la caché
+
+        Returns:
+            Archivo abierto en modo binario o None si no está en caché
+        """
+        archivo = self.backend.abrir(clave)
+        with self._lock:
+            indice = self._cargar_indice()
+            if archivo is None:
+                self.misses += 1
+                indice.pop(clave, None)
+                return None
+            self.hits += 1
+            if clave in indice:
+                indice.move_to_end(clave)
+        self.backend.tocar(clave)
+        return archivo
+
+    def guardar(self, clave, archivo):
+        """Guarda un PDF en la caché y expulsa las entradas menos usadas si se excede el límite"""
+        try:
+            tamano = self.backend.guardar(clave, archivo)
+        except Exception as e:
+            print(f"Error guardando PDF en caché: {e}")
+            return
+
+        # El límite es para toda la caché: se cuentan también las entradas de los demás workers
+        entradas = self.backend.listar()
+        with self._lock:
+            indice = self._sincronizar_indice(entradas)
+            indice[clave] = tamano
+            indice.move_to_end(clave)
+            expulsadas = []
+            total = sum(indice.values())
+            while total > self.max_bytes and len(indice) > 1:
+                antigua, tamano_antiguo = indice.popitem(last=False)
+                total -= tamano_antiguo
+                expulsadas.append(antigua)
+            self.evictions += len(expulsadas)
+
+        for antigua in expulsadas:
+            self.backend.eliminar(antigua)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._cargar_indice().pop(clave, None)
+        self.backend.eliminar(clave)
+
+    def estadisticas(self):
+        """Retorna los contadores de la caché"""
+        with self._lock:
+            indice = self._cargar_indice()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entradas': len(indice),
+                'bytes': sum(indice.values()),
+                'max_bytes': self.max_bytes,
+            }
+
+
+def registrar_duracion_render(datos_personales, segundos):
+    """Guarda la duración del último render de una hoja de vida"""
+    cache.set(f"cv_pdf_duracion_{datos_personales.pk}", segundos, None)
+
+
+def duracion_render(datos_personales):
+    """Retorna la duración del último render conocido en segundos, o None"""
+    return cache.get(f"cv_pdf_duracion_{datos_personales.pk}")
+
+
+def generar_pdf_cv(datos_personales, clave=None):
+    """
+    Genera el PDF de una hoja de vida y lo guarda en la caché.
+
+    Args:
+        datos_personales: Instancia de DatosPersonales
+        clave: Huella ya calculada (opcional)
+
+    Returns:
+        Archivo binario posicionado al inicio, o None si falla la generación
+    """
+    from .pdf_generator import CVPDFGenerator
+
+    inicio = time.monotonic()
+    pdf_buffer = CVPDFGenerator(datos_personales).generate()
+    registrar_duracion_render(datos_personales, time.monotonic() - inicio)
+    if pdf_buffer is None:
+        return None
+
+    if getattr(settings, 'CV_PDF_CACHE_BACKEND', 'local') != 'none':
+        pdf_cache.guardar(clave or calcular_huella_cv(datos_personales), pdf_buffer)
+        pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+def obtener_pdf_cacheado(datos_personales, clave=None):
+    """Retorna el PDF en caché de una hoja de vida o None si no está guardado"""
+    if getattr(settings, 'CV_PDF_CACHE_BACKEND', 'local') == 'none':
+        return None
+    return pdf_cache.obtener(clave or calcular_huella_cv(datos_personales))
+
+
+def obtener_pdf_cv(datos_personales):
+    """
+    Retorna el PDF de una hoja de vida, usando la caché cuando el contenido no cambió.
+
+    Args:
+        datos_personales: Instancia de DatosPersonales
+
+    Returns:
+        Archivo binario posicionado al inicio, o None si falla la generación
+    """
+    if getattr(settings, 'CV_PDF_CACHE_BACKEND', 'local') == 'none':
+        return generar_pdf_cv(datos_personales)
+
+    clave = calcular_huella_cv(datos_personales)
+    archivo = pdf_cache.obtener(clave)
+    if archivo is not None:
+        return archivo
+    return generar_pdf_cv(datos_personales, clave)
+
+
+# Instancia global de la caché
+pdf_cache = CVPDFCache()
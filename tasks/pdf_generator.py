@@ -9,13 +9,85 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from io import BytesIO
 import os
+import time
 from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+import shutil
 import tempfile
+import threading
+from types import MappingProxyType
 from django.core.files.storage import default_storage
 from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .fotos_perfil import nombre_variante
+from .models import CursoRealizado, ExperienciaLaboral, ProductoAcademico, Reconocimiento
+from .storage_names import cargar_resoluciones, nombres_a_probar, registrar_resolucion, resolver_nombre
+
+
+def _construir_estilos():
+    """Construye la hoja de estilos del PDF: estilos de ReportLab más los personalizados"""
+    styles = getSampleStyleSheet()
+    
+    # Estilo para títulos de secciones
+    styles.add(ParagraphStyle(
+        name='SectionTitle',
+        parent=styles['Heading1'],
+        fontSize=14,
+        textColor=colors.HexColor('#1a5490'),
+        spaceAfter=12,
+        spaceBefore=12,
+        borderBottom=1,
+        borderColor=colors.HexColor('#1a5490'),
+        paddingBottom=6
+    ))
+    
+    # Estilo para subtítulos
+    styles.add(ParagraphStyle(
+        name='SubTitle',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#333333'),
+        spaceAfter=6,
+        bold=True
+    ))
+    
+    # Estilo para texto normal
+    styles.add(ParagraphStyle(
+        name='NormalText',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#555555'),
+        alignment=TA_JUSTIFY
+    ))
+    
+    # Estilo para el pie de página
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=TA_CENTER
+    ))
+    
+    # Mapeo de solo lectura: los renders comparten los estilos pero no pueden modificarlos
+    return MappingProxyType({**styles.byAlias, **styles.byName})
+
+
+_estilos = None
+_estilos_lock = threading.Lock()
+
+
+def obtener_estilos():
+    """Retorna la hoja de estilos compartida; se construye una sola vez por proceso"""
+    global _estilos
+    if _estilos is None:
+        with _estilos_lock:
+            if _estilos is None:
+                _estilos = _construir_estilos()
+    return _estilos
 
 
 class CVPDFGenerator:
@@ -25,119 +97,207 @@ class CVPDFGenerator:
         self.datos = datos_personales
         self.user = datos_personales.user
         self.story = []
-        self.styles = getSampleStyleSheet()
+        self.styles = obtener_estilos()  # Hoja de estilos compartida, de solo lectura
         self.certificados_para_incrustar = []  # Lista de PDFs a incrustar
-        self.temp_files = []  # Lista de archivos temporales para limpiar
-        self._create_custom_styles()
+        self.archivos_descargados = []  # Buffers de archivos descargados, se cierran al terminar
+        self.nombres_resueltos = {}  # Nombre guardado -> nombre real encontrado en el storage
+        self.nombres_descargados = {}  # Nombre guardado -> nombre descargado (p. ej. una variante)
+        self.tiempos_descarga = []  # Duración de cada descarga (archivo, segundos, ok)
+        self.memoria_descargas = 0  # Bytes de descargas retenidos en memoria (o reservados)
+        self._memoria_lock = threading.Lock()
+        self._executor = None  # Pool de hilos para descargas concurrentes
+        self._foto_futura = None
     
-    def _create_custom_styles(self):
-        """Crea estilos personalizados para el PDF"""
-        # Estilo para títulos de secciones
-        self.styles.add(ParagraphStyle(
-            name='SectionTitle',
-            parent=self.styles['Heading1'],
-            fontSize=14,
-            textColor=colors.HexColor('#1a5490'),
-            spaceAfter=12,
-            spaceBefore=12,
-            borderBottom=1,
-            borderColor=colors.HexColor('#1a5490'),
-            paddingBottom=6
-        ))
-        
-        # Estilo para subtítulos
-        self.styles.add(ParagraphStyle(
-            name='SubTitle',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#333333'),
-            spaceAfter=6,
-            bold=True
-        ))
-        
-        # Estilo para texto normal
-        self.styles.add(ParagraphStyle(
-            name='NormalText',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#555555'),
-            alignment=TA_JUSTIFY
-        ))
+    def _cargar_hoja_vida(self):
+        """
+        Carga el usuario y las filas activas de cada sección con un número fijo de consultas
+        (una por relación), sin importar cuántas filas tenga la hoja de vida.
+        También carga en una sola consulta los nombres resueltos de sus archivos.
+        """
+        prefetch_related_objects(
+            [self.datos],
+            'user',
+            Prefetch('experiencias_laborales',
+                     queryset=ExperienciaLaboral.objects.filter(activo=True),
+                     to_attr='experiencias_activas'),
+            Prefetch('reconocimientos',
+                     queryset=Reconocimiento.objects.filter(activo=True),
+                     to_attr='reconocimientos_activos'),
+            Prefetch('cursos_realizados',
+                     queryset=CursoRealizado.objects.filter(activo=True),
+                     to_attr='cursos_activos'),
+            Prefetch('productos_academicos',
+                     queryset=ProductoAcademico.objects.filter(activo=True),
+                     to_attr='productos_activos'),
+        )
+        self.user = self.datos.user
+        
+        archivos = [self.datos.fotoperfil.name] + [
+            fila.certificado.name
+            for fila in self.datos.reconocimientos_activos + self.datos.cursos_activos
+            if fila.certificado
+        ]
+        cargar_resoluciones(archivos)
     
-    def _download_file_from_storage(self, file_field):
+    def _download_file_from_storage(self, file_field, resuelto=None, preferidos=()):
         """
-        Descarga un archivo desde el storage (local o Azure) y retorna una ruta temporal.
+        Descarga un archivo desde el storage (local o Azure) a un buffer en memoria.
         Funciona tanto con archivos locales como con Azure Storage.
+        Los archivos mayores a CV_PDF_DESCARGA_MAX_MEMORY bytes pasan a un archivo temporal en disco,
+        igual que todos una vez que las descargas del render suman CV_PDF_DESCARGA_MAX_MEMORY_TOTAL.
         
         Args:
             file_field: Campo de archivo de Django (ImageField, FileField, etc.)
+            resuelto: Nombre real en el storage, si ya se conoce (ver storage_names)
+            preferidos: Nombres a probar antes que el archivo (p. ej. su variante reducida)
             
         Returns:
-            tuple: (ruta_temporal, content_bytes) - la ruta y los bytes del archivo
+            Archivo binario posicionado al inicio, o None si no se pudo descargar.
+            Se cierra automáticamente al terminar generate().
         """
         try:
             # Si el archivo está vacío
             if not file_field or not file_field.name:
-                return None, None
-            
-            content = None
+                return None
 
-            # Normalizar el nombre para evitar rutas absolutas (Windows/Linux)
+            # Candidatos a probar con default_storage (primero los preferidos y el nombre real ya conocido)
             original_name = str(file_field.name)
-            norm_name = original_name.replace('\\', '/').lstrip('/')
-
-            # Candidatos a probar con default_storage
-            candidates = []
-            candidates.append(norm_name)
-
-            # Si incluye unidad (p. ej. C:/...) o es absoluta, intentar recortar
-            if ':' in norm_name:
-                after_drive = norm_name.split(':', 1)[1].lstrip('/')
-                candidates.append(after_drive)
-
-            # Si contiene 'media/', probar desde ahí hacia delante
-            if 'media/' in norm_name:
-                after_media = norm_name.split('media/', 1)[1]
-                candidates.append(after_media)
-
-            # Fallback al nombre base
-            candidates.append(os.path.basename(norm_name))
+            candidates = list(dict.fromkeys([*preferidos, *nombres_a_probar(original_name, resuelto)]))
 
             # Intentar abrir con default_storage usando los candidatos
-            opened = False
             last_err = None
             for name in candidates:
+                buffer, reserva = None, 0
                 try:
                     with default_storage.open(name, 'rb') as f:
-                        content = f.read()
-                        opened = True
-                        break
+                        buffer, reserva = self._nuevo_buffer_descarga()
+                        # Registrar antes de copiar para garantizar su cierre
+                        self.archivos_descargados.append(buffer)
+                        shutil.copyfileobj(f, buffer, 64 * 1024)
                 except Exception as e:
+                    if buffer is not None:
+                        buffer.close()
+                    self._ajustar_memoria_descarga(reserva, buffer)
                     last_err = e
                     continue
 
-            if not opened:
-                print(f"Error leyendo archivo desde storage: {last_err}")
-                return None, None
-            
-            # Crear archivo temporal
-            if content:
-                # Obtener extensión del archivo
-                _, ext = os.path.splitext(os.path.basename(norm_name))
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-                temp_path = temp_file.name
-                temp_file.write(content)
-                temp_file.close()
-                
-                # Guardar path temporal para limpieza posterior
-                self.temp_files.append(temp_path)
-                
-                return temp_path, content
+                self._ajustar_memoria_descarga(reserva, buffer)
+                self.nombres_descargados[original_name] = name
+                # Recordar qué nombre funcionó para no volver a probar candidatos
+                # (un nombre preferido no es la resolución del archivo original)
+                if name not in preferidos:
+                    self.nombres_resueltos[original_name] = name
+                if buffer.tell() == 0:
+                    return None
+                buffer.seek(0)
+                return buffer
+
+            print(f"Error leyendo archivo desde storage: {last_err}")
         
         except Exception as e:
             print(f"Error descargando archivo desde storage: {e}")
         
-        return None, None
+        return None
+    
+    def _nuevo_buffer_descarga(self):
+        """
+        Buffer para una descarga dentro del presupuesto de memoria del render.
+        Reserva hasta CV_PDF_DESCARGA_MAX_MEMORY bytes de lo que queda de
+        CV_PDF_DESCARGA_MAX_MEMORY_TOTAL; sin presupuesto, la descarga va directo a disco.
+
+        Returns:
+            tuple: (buffer, bytes reservados)
+        """
+        max_archivo = getattr(settings, 'CV_PDF_DESCARGA_MAX_MEMORY', 10 * 1024 * 1024)
+        max_total = getattr(settings, 'CV_PDF_DESCARGA_MAX_MEMORY_TOTAL', 32 * 1024 * 1024)
+        with self._memoria_lock:
+            reserva = max(0, min(max_archivo, max_total - self.memoria_descargas))
+            self.memoria_descargas += reserva
+        if not reserva:
+            return tempfile.TemporaryFile(), 0
+        return tempfile.SpooledTemporaryFile(max_size=reserva), reserva
+    
+    def _ajustar_memoria_descarga(self, reserva, buffer):
+        """Devuelve al presupuesto la parte de la reserva que el buffer no ocupa en memoria"""
+        en_memoria = 0
+        if buffer is not None and not buffer.closed and not getattr(buffer, '_rolled', True):
+            en_memoria = buffer.tell()
+        with self._memoria_lock:
+            self.memoria_descargas -= reserva - en_memoria
+    
+    def _guardar_resoluciones(self):
+        """Persiste los nombres reales encontrados para archivos con rutas antiguas"""
+        for original, resuelto in self.nombres_resueltos.items():
+            try:
+                registrar_resolucion(original, resuelto)
+            except Exception as e:
+                print(f"Error guardando resolución de {original}: {e}")
+    
+    def _cerrar_descargas(self):
+        """Cierra los buffers de archivos descargados (memoria o disco)"""
+        for buffer in self.archivos_descargados:
+            try:
+                buffer.close()
+            except Exception:
+                pass
+        self.archivos_descargados = []
+        self.memoria_descargas = 0
+    
+    def _iniciar_descarga(self, file_field, preferidos=()):
+        """
+        Programa la descarga de un archivo en el pool de hilos.
+        El número de descargas simultáneas se limita con CV_PDF_DESCARGAS_PARALELAS.
+        Los nombres preferidos se prueban primero, dentro del hilo de la descarga.
+        
+        Returns:
+            Future con el resultado de _download_file_from_storage, o None si no hay archivo
+        """
+        if not file_field or not file_field.name:
+            return None
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CV_PDF_DESCARGAS_PARALELAS', 4),
+                thread_name_prefix='cv-pdf-descarga'
+            )
+        # La consulta de la resolución se hace aquí, en el hilo principal
+        resuelto = resolver_nombre(file_field.name)
+        return self._executor.submit(self._descargar_con_tiempo, file_field, resuelto, tuple(preferidos))
+    
+    def _descargar_con_tiempo(self, file_field, resuelto=None, preferidos=()):
+        """Descarga un archivo y registra cuánto tardó"""
+        inicio = time.perf_counter()
+        resultado = None
+        try:
+            resultado = self._download_file_from_storage(file_field, resuelto, preferidos)
+            return resultado
+        finally:
+            self.tiempos_descarga.append({
+                'archivo': self.nombres_descargados.get(str(file_field.name), file_field.name),
+                'segundos': time.perf_counter() - inicio,
+                'ok': resultado is not None,
+            })
+    
+    def _esperar_descarga(self, futuro):
+        """Espera el resultado de una descarga programada"""
+        if futuro is None:
+            return None
+        try:
+            return futuro.result()
+        except Exception as e:
+            print(f"Error en descarga concurrente: {e}")
+            return None
+    
+    def _iniciar_descarga_foto(self):
+        """
+        Programa la descarga de la foto de perfil a incrustar: la variante reducida para el PDF
+        si existe, si no la foto original (fotos subidas antes de generar variantes).
+        No se consulta antes si la variante existe: el hilo de la descarga la prueba primero
+        """
+        foto = self.datos.fotoperfil
+        if not foto or not foto.name:
+            return None
+        return self._iniciar_descarga(foto, preferidos=[nombre_variante(foto.name, 'pdf')])
     
     def _add_header(self):
         """Añade encabezado con datos personales e imagen de perfil"""
@@ -147,12 +307,15 @@ class CVPDFGenerator:
         # Agregar imagen de perfil si existe
         if self.datos.fotoperfil:
             try:
-                # Descargar imagen desde storage (local o Azure)
-                temp_path, _ = self._download_file_from_storage(self.datos.fotoperfil)
+                # Descargar imagen desde storage (local o Azure), si no se inició antes
+                if self._foto_futura is None:
+                    self._foto_futura = self._iniciar_descarga_foto()
+                foto = self._esperar_descarga(self._foto_futura)
                 
-                if temp_path and os.path.exists(temp_path):
+                if foto is not None:
                     try:
-                        img = Image(temp_path, width=1.2*inch, height=1.2*inch)
+                        # ReportLab lee la imagen directamente desde el buffer
+                        img = Image(foto, width=1.2*inch, height=1.2*inch)
                         left_col.append(img)
                     except Exception as e:
                         print(f"Error creando imagen para PDF: {e}")
@@ -237,9 +400,9 @@ class CVPDFGenerator:
     
     def _add_experiencia_laboral(self):
         """Añade sección de experiencia laboral"""
-        experiencias = self.datos.experiencias_laborales.filter(activo=True)
+        experiencias = self.datos.experiencias_activas
         
-        if not experiencias.exists():
+        if not experiencias:
             return
         
         self.story.append(Paragraph("EXPERIENCIA LABORAL", self.styles['SectionTitle']))
@@ -272,9 +435,9 @@ class CVPDFGenerator:
     
     def _add_reconocimientos(self):
         """Añade sección de reconocimientos con imágenes de certificados"""
-        reconocimientos = self.datos.reconocimientos.filter(activo=True)
+        reconocimientos = self.datos.reconocimientos_activos
         
-        if not reconocimientos.exists():
+        if not reconocimientos:
             return
         
         self.story.append(Paragraph("RECONOCIMIENTOS", self.styles['SectionTitle']))
@@ -302,9 +465,11 @@ class CVPDFGenerator:
                 
                 # Verificar que sea un PDF
                 if cert_name.lower().endswith('.pdf'):
+                    # La descarga empieza ahora y avanza mientras se construye el resto del PDF
                     self.certificados_para_incrustar.append({
                         'file_field': reco.certificado,
-                        'titulo': f"{reco.get_tiporeconocimiento_display()} - {reco.entidadpatrocinadora}"
+                        'titulo': f"{reco.get_tiporeconocimiento_display()} - {reco.entidadpatrocinadora}",
+                        'futuro': self._iniciar_descarga(reco.certificado)
                     })
                     self.story.append(Paragraph(
                         f"<b>📎 Certificado:</b> {cert_name} (Incrustado abajo)",
@@ -322,9 +487,9 @@ class CVPDFGenerator:
     
     def _add_cursos(self):
         """Añade sección de cursos realizados con imágenes de certificados"""
-        cursos = self.datos.cursos_realizados.filter(activo=True)
+        cursos = self.datos.cursos_activos
         
-        if not cursos.exists():
+        if not cursos:
             return
         
         self.story.append(Paragraph("CURSOS Y CAPACITACIONES", self.styles['SectionTitle']))
@@ -360,9 +525,11 @@ class CVPDFGenerator:
                 
                 # Verificar que sea un PDF
                 if cert_name.lower().endswith('.pdf'):
+                    # La descarga empieza ahora y avanza mientras se construye el resto del PDF
                     self.certificados_para_incrustar.append({
                         'file_field': curso.certificado,
-                        'titulo': f"Curso: {curso.nombrecurso}"
+                        'titulo': f"Curso: {curso.nombrecurso}",
+                        'futuro': self._iniciar_descarga(curso.certificado)
                     })
                     self.story.append(Paragraph(
                         f"<b>📎 Certificado:</b> {cert_name} (Incrustado abajo)",
@@ -381,9 +548,9 @@ class CVPDFGenerator:
     
     def _add_productos_academicos(self):
         """Añade sección de productos académicos"""
-        productos = self.datos.productos_academicos.filter(activo=True)
+        productos = self.datos.productos_activos
         
-        if not productos.exists():
+        if not productos:
             return
         
         self.story.append(Paragraph("PRODUCTOS ACADÉMICOS", self.styles['SectionTitle']))
@@ -405,27 +572,31 @@ class CVPDFGenerator:
         fecha_generacion = datetime.now().strftime('%d de %B de %Y')
         footer = Paragraph(
             f"<i>Generado el: {fecha_generacion}</i>",
-            ParagraphStyle(
-                'Footer',
-                parent=self.styles['Normal'],
-                fontSize=8,
-                textColor=colors.grey,
-                alignment=TA_CENTER
-            )
+            self.styles['Footer']
         )
         self.story.append(footer)
     
+    @staticmethod
+    def _crear_buffer():
+        """
+        Crea un buffer temporal que se mantiene en memoria hasta CV_PDF_SPOOL_MAX_MEMORY
+        bytes y luego pasa a disco, para acotar la memoria usada por render
+        """
+        max_size = getattr(settings, 'CV_PDF_SPOOL_MAX_MEMORY', 5 * 1024 * 1024)
+        return tempfile.SpooledTemporaryFile(max_size=max_size, suffix='.pdf')
+    
     def generate(self):
         """
-        Genera el PDF y lo retorna como BytesIO
+        Genera el PDF y lo retorna como archivo temporal (SpooledTemporaryFile)
         Incluye certificados incrustados al final
         
         Returns:
-            BytesIO con el contenido del PDF
+            Archivo binario con el contenido del PDF, posicionado al inicio
         """
+        pdf_buffer = None
         try:
-            # Crear documento en memoria
-            pdf_buffer = BytesIO()
+            # Crear documento en un archivo temporal (memoria o disco según el tamaño)
+            pdf_buffer = self._crear_buffer()
             doc = SimpleDocTemplate(
                 pdf_buffer,
                 pagesize=letter,
@@ -435,41 +606,39 @@ class CVPDFGenerator:
                 bottomMargin=0.75*inch
             )
             
-            # Construir el documento con secciones dinámicas
-            self._add_header()
-            self._add_datos_personales()
-            
-            # Solo agregar secciones que tengan datos
-            if self.datos.experiencias_laborales.filter(activo=True).exists():
-                self._add_experiencia_laboral()
+            # Cargar toda la hoja de vida con un número fijo de consultas
+            self._cargar_hoja_vida()
             
-            if self.datos.reconocimientos.filter(activo=True).exists():
-                self._add_reconocimientos()
+            # Iniciar la descarga de la foto de perfil mientras se construyen las demás secciones
+            self._foto_futura = self._iniciar_descarga_foto()
             
-            if self.datos.cursos_realizados.filter(activo=True).exists():
-                self._add_cursos()
+            # Construir el documento con secciones dinámicas
+            self._add_datos_personales()
             
-            if self.datos.productos_academicos.filter(activo=True).exists():
-                self._add_productos_academicos()
+            # Cada sección se omite si no tiene filas activas
+            self._add_experiencia_laboral()
+            self._add_reconocimientos()
+            self._add_cursos()
+            self._add_productos_academicos()
             
             self._add_footer()
             
+            # El encabezado se construye al final, cuando la foto ya se descargó, y se coloca al inicio
+            cuerpo = self.story
+            self.story = []
+            self._add_header()
+            self.story.extend(cuerpo)
+            
             # Generar el PDF principal
             doc.build(self.story)
             
             # Si hay certificados, incrustarlos
             if self.certificados_para_incrustar:
                 pdf_buffer.seek(0)
-                pdf_buffer = self._incrustar_certificados(pdf_buffer)
-            
-            # Limpiar archivos temporales (imágenes descargadas de Azure)
-            if hasattr(self, 'temp_files'):
-                for temp_file in self.temp_files:
-                    try:
-                        if os.path.exists(temp_file):
-                            os.remove(temp_file)
-                    except:
-                        pass
+                pdf_combinado = self._incrustar_certificados(pdf_buffer)
+                if pdf_combinado is not pdf_buffer:
+                    pdf_buffer.close()
+                    pdf_buffer = pdf_combinado
             
             # Retornar al inicio del buffer
             pdf_buffer.seek(0)
@@ -477,15 +646,17 @@ class CVPDFGenerator:
         
         except Exception as e:
             print(f"Error generando PDF: {e}")
-            # Limpiar temporales en caso de error
-            if hasattr(self, 'temp_files'):
-                for temp_file in self.temp_files:
-                    try:
-                        if os.path.exists(temp_file):
-                            os.remove(temp_file)
-                    except:
-                        pass
+            if pdf_buffer is not None:
+                pdf_buffer.close()
             return None
+        
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+            # Cerrar los archivos descargados en cualquier caso (éxito o error)
+            self._cerrar_descargas()
+            self._guardar_resoluciones()
     
     def _incrustar_certificados(self, pdf_principal_buffer):
         """
@@ -511,18 +682,17 @@ class CVPDFGenerator:
                     continue
                 
                 try:
-                    # Descargar el certificado desde storage (local o Azure)
-                    temp_path, content = self._download_file_from_storage(cert_field)
+                    # Esperar la descarga del certificado (iniciada al recolectar las secciones)
+                    futuro = cert_info.get('futuro') or self._iniciar_descarga(cert_field)
+                    contenido = self._esperar_descarga(futuro)
                     
-                    if not temp_path or not content:
+                    if contenido is None:
                         print(f"No se pudo descargar certificado: {cert_titulo}")
                         continue
                     
-                    # Leer el PDF descargado
+                    # Leer el PDF descargado directamente desde el buffer
                     try:
-                        cert_buffer = BytesIO(content)
-                        cert_buffer.seek(0)
-                        cert_reader = PdfReader(cert_buffer)
+                        cert_reader = PdfReader(contenido)
                         
                         # Agregar todas las páginas del certificado
                         for page_num in range(len(cert_reader.pages)):
@@ -538,8 +708,8 @@ class CVPDFGenerator:
                     print(f"Error procesando certificado {cert_titulo}: {e}")
                     continue
             
-            # Crear un nuevo buffer con el PDF combinado
-            output_buffer = BytesIO()
+            # Crear un nuevo archivo temporal con el PDF combinado
+            output_buffer = self._crear_buffer()
             writer.write(output_buffer)
             
             return output_buffer
@@ -0,0 +1,162 @@
+"""
+Generación de PDFs de hojas de vida en segundo plano
+Los trabajos se guardan en la base de datos (TrabajoPDF) y los procesa el
+comando `procesar_trabajos_pdf`, sin necesidad de un broker externo
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import time
+
+from .models import TrabajoPDF
+from .pdf_cache import (
+    calcular_huella_cv, duracion_render, generar_pdf_cv, obtener_pdf_cacheado, pdf_cache
+)
+
+
+def render_asincrono_activo():
+    """Indica si está activado el modo asíncrono para los PDFs"""
+    return getattr(settings, 'CV_PDF_ASYNC_ENABLED', False)
+
+
+def estimar_duracion(datos_personales):
+    """
+    Estima cuánto tardará el render de una hoja de vida.
+    Usa la duración del último render conocido y, si no existe,
+    una estimación por número de certificados a incrustar.
+    """
+    duracion = duracion_render(datos_personales)
+    if duracion is not None:
+        return duracion
+
+    certificados = 0
+    for relacion in (datos_personales.reconocimientos, datos_personales.cursos_realizados):
+        certificados += relacion.filter(activo=True, certificado__isnull=False).exclude(certificado='').count()
+    return certificados * getattr(settings, 'CV_PDF_ASYNC_SEGUNDOS_POR_CERTIFICADO', 0.5)
+
+
+def supera_presupuesto(datos_personales):
+    """Indica si el render de la hoja de vida superaría el presupuesto de latencia"""
+    presupuesto = getattr(settings, 'CV_PDF_ASYNC_LATENCY_BUDGET', 2.0)
+    return estimar_duracion(datos_personales) > presupuesto
+
+
+def encolar_trabajo_pdf(datos_personales, solicitante):
+    """
+    Crea un trabajo de generación de PDF, reutilizando uno pendiente si ya existe
+
+    Returns:
+        TrabajoPDF
+    """
+    with transaction.atomic():
+        trabajo = TrabajoPDF.objects.filter(
+            datospersonales=datos_personales,
+            solicitante=solicitante,
+            estado__in=['pendiente', 'procesando'],
+        ).first()
+        if trabajo is None:
+            trabajo = TrabajoPDF.objects.create(
+                datospersonales=datos_personales,
+                solicitante=solicitante,
+            )
+    return trabajo
+
+
+def obtener_pdf_o_trabajo(datos_personales, solicitante):
+    """
+    Retorna el PDF de la hoja de vida o, si el render superaría el presupuesto
+    de latencia y el modo asíncrono está activo, un trabajo encolado.
+
+    Returns:
+        tuple: (archivo, None) o (None, TrabajoPDF)
+    """
+    clave = calcular_huella_cv(datos_personales)
+    archivo = obtener_pdf_cacheado(datos_personales, clave)
+    if archivo is not None:
+        return archivo, None
+
+    if render_asincrono_activo() and supera_presupuesto(datos_personales):
+        return None, encolar_trabajo_pdf(datos_personales, solicitante)
+
+    return generar_pdf_cv(datos_personales, clave), None
+
+
+def reservar_siguiente_trabajo():
+    """
+    Marca como 'procesando' el trabajo pendiente más antiguo.
+    La reserva es una actualización condicional, así varios workers no toman el mismo trabajo.
+
+    Returns:
+        TrabajoPDF o None si no hay trabajos pendientes
+    """
+    for trabajo_id in TrabajoPDF.objects.filter(estado='pendiente').values_list('id', flat=True)[:10]:
+        reservado = TrabajoPDF.objects.filter(id=trabajo_id, estado='pendiente').update(
+            estado='procesando',
+            fechainicio=timezone.now(),
+        )
+        if reservado:
+            return TrabajoPDF.objects.select_related('datospersonales__user').get(id=trabajo_id)
+    return None
+
+
+def procesar_trabajo(trabajo):
+    """Genera el PDF de un trabajo y lo deja en la caché"""
+    inicio = time.monotonic()
+    try:
+        datos = trabajo.datospersonales
+        clave = calcular_huella_cv(datos)
+        archivo = obtener_pdf_cacheado(datos, clave) or generar_pdf_cv(datos, clave)
+        if archivo is None:
+            raise RuntimeError("No se pudo generar el PDF")
+        archivo.close()
+        trabajo.huella = clave
+        trabajo.estado = 'completado'
+        trabajo.mensajeerror = None
+    except Exception as e:
+        print(f"Error procesando trabajo PDF {trabajo.id}: {e}")
+        trabajo.estado = 'error'
+        trabajo.mensajeerror = str(e)
+    trabajo.duracion = time.monotonic() - inicio
+    trabajo.fechafin = timezone.now()
+    trabajo.save(update_fields=['huella', 'estado', 'mensajeerror', 'duracion', 'fechafin'])
+    return trabajo
+
+
+def liberar_trabajos_abandonados(minutos=30):
+    """Devuelve a 'pendiente' los trabajos que quedaron en 'procesando' por un worker caído"""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return TrabajoPDF.objects.filter(estado='procesando', fechainicio__lt=limite).update(
+        estado='pendiente',
+        fechainicio=None,
+    )
+
+
+def reencolar_trabajo(trabajo):
+    """
+    Devuelve a 'pendiente' un trabajo completado cuyo PDF ya no está en la caché.
+    La actualización es condicional: si otra petición ya lo reencoló no se toca.
+    """
+    TrabajoPDF.objects.filter(id=trabajo.id, estado='completado').update(
+        estado='pendiente',
+        huella=None,
+        fechainicio=None,
+        fechafin=None,
+    )
+    trabajo.refresh_from_db()
+    return trabajo
+
+
+def abrir_pdf_trabajo(trabajo):
+    """
+    Abre el PDF de un trabajo completado.
+    Si la entrada fue expulsada de la caché, el trabajo vuelve a la cola y retorna None:
+    el render queda a cargo del worker, no de la petición.
+    """
+    if trabajo.huella:
+        archivo = pdf_cache.obtener(trabajo.huella)
+        if archivo is not None:
+            return archivo
+    reencolar_trabajo(trabajo)
+    return None
@@ -0,0 +1,88 @@
+"""
+Señales que mantienen las referencias de los archivos guardados por contenido:
+al reemplazar o borrar un certificado o foto se libera la referencia del archivo anterior.
+Al borrar un usuario también se eliminan las réplicas de sus certificados.
+Al subir una foto de perfil se generan sus variantes reducidas (ver fotos_perfil)
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .certificados import eliminar_replicas_usuario, replica_activa
+from .content_storage import campos_contenido, liberar_archivo
+from .fotos_perfil import generar_variantes_seguro
+
+
+def _nombres(instancia, campos):
+    return {campo: getattr(instancia, campo).name for campo in campos}
+
+
+def recordar_archivos_anteriores(sender, instance, raw=False, **kwargs):
+    campos = campos_contenido(sender)
+    if raw or not campos:
+        return
+    # Archivos nuevos que se suben en este save (cada subida suma una referencia).
+    # FieldFile.save() sube antes del save del modelo: si repite el mismo contenido, aquí no se
+    # distingue de un guardado sin cambios y la referencia extra queda hasta que
+    # limpiar_huerfanos recalcula los conteos (huerfanos.recalcular_referencias)
+    instance._archivos_subidos = {
+        campo for campo in campos
+        if getattr(instance, campo) and not getattr(instance, campo)._committed
+    }
+    if instance.pk is None:
+        return
+    anteriores = sender.objects.filter(pk=instance.pk).values(*campos).first()
+    instance._archivos_anteriores = anteriores or {}
+
+
+def generar_variantes_foto(sender, instance, created=False, raw=False, **kwargs):
+    foto = instance.fotoperfil
+    if raw or not foto:
+        return
+    anteriores = getattr(instance, '_archivos_anteriores', None) or {}
+    nueva = (
+        created
+        or 'fotoperfil' in getattr(instance, '_archivos_subidos', ())
+        or anteriores.get('fotoperfil', foto.name) != foto.name
+    )
+    if nueva:
+        transaction.on_commit(lambda foto=foto: generar_variantes_seguro(foto))
+
+
+def liberar_archivos_reemplazados(sender, instance, raw=False, **kwargs):
+    anteriores = getattr(instance, '_archivos_anteriores', None)
+    if raw or not anteriores:
+        return
+    subidos = instance._archivos_subidos
+    actuales = _nombres(instance, anteriores)
+    instance._archivos_anteriores = None
+    for campo, nombre in anteriores.items():
+        # Volver a subir el mismo contenido da el mismo nombre, pero igual suma una referencia
+        if nombre and (nombre != actuales[campo] or campo in subidos):
+            # Solo cuando la transacción se confirme: si se revierte, el archivo sigue en uso
+            transaction.on_commit(lambda nombre=nombre: liberar_archivo(nombre))
+
+
+def liberar_archivos_borrados(sender, instance, **kwargs):
+    for nombre in _nombres(instance, campos_contenido(sender)).values():
+        if nombre:
+            transaction.on_commit(lambda nombre=nombre: liberar_archivo(nombre))
+
+
+def eliminar_replicas_de_usuario(sender, instance, **kwargs):
+    if replica_activa():
+        transaction.on_commit(lambda username=instance.username: eliminar_replicas_usuario(username))
+
+
+def conectar():
+    from django.contrib.auth.models import User
+    from .models import CursoRealizado, DatosPersonales, ExperienciaLaboral, Reconocimiento
+
+    for modelo in (DatosPersonales, ExperienciaLaboral, Reconocimiento, CursoRealizado):
+        pre_save.connect(recordar_archivos_anteriores, sender=modelo)
+        if modelo is DatosPersonales:
+            # Antes de liberar_archivos_reemplazados, que descarta los archivos anteriores
+            post_save.connect(generar_variantes_foto, sender=modelo)
+        post_save.connect(liberar_archivos_reemplazados, sender=modelo)
+        post_delete.connect(liberar_archivos_borrados, sender=modelo)
+    post_delete.connect(eliminar_replicas_de_usuario, sender=User)
@@ -0,0 +1,150 @@
+"""
+Resolución de nombres de archivos en el storage
+Algunos FileField antiguos guardan rutas absolutas o con 'media/' (p. ej. C:\\...\\media\\...).
+Aquí se calculan los nombres candidatos y se recuerda cuál funcionó, para no volver a probarlos
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+from .models import ResolucionArchivo
+
+
+# Memoria por proceso (LRU): nombre guardado -> (nombre real o None, vencimiento)
+# Las resoluciones encontradas no vencen; la ausencia de resolución se recuerda solo
+# CV_RESOLUCIONES_TTL_NEGATIVO segundos, porque otro proceso puede registrarla después
+_resoluciones = OrderedDict()
+_lock = threading.Lock()
+
+
+def _obtener_en_memoria(nombre, ahora):
+    """Retorna (encontrado, nombre real) desde la memoria del proceso. Llamar con _lock tomado"""
+    entrada = _resoluciones.get(nombre)
+    if entrada is None:
+        return False, None
+    resuelto, vence = entrada
+    if vence is not None and vence <= ahora:
+        del _resoluciones[nombre]
+        return False, None
+    _resoluciones.move_to_end(nombre)
+    return True, resuelto
+
+
+def _guardar_en_memoria(nombre, resuelto, ahora):
+    """Recuerda una resolución y expulsa las menos usadas. Llamar con _lock tomado"""
+    vence = None if resuelto else ahora + getattr(settings, 'CV_RESOLUCIONES_TTL_NEGATIVO', 60)
+    _resoluciones[nombre] = (resuelto, vence)
+    _resoluciones.move_to_end(nombre)
+    max_entradas = getattr(settings, 'CV_RESOLUCIONES_MAX_ENTRADAS', 10000)
+    while len(_resoluciones) > max_entradas:
+        _resoluciones.popitem(last=False)
+
+
+def limpiar_resoluciones():
+    """Olvida las resoluciones en memoria del proceso"""
+    with _lock:
+        _resoluciones.clear()
+
+
+def campos_archivo():
+    """Retorna tuplas (modelo, nombre_campo) de todos los FileField/ImageField de la app"""
+    return [
+        (modelo, field.name)
+        for modelo in apps.get_app_config('tasks').get_models()
+        for field in modelo._meta.fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def candidatos_nombre(nombre):
+    """
+    Retorna los nombres a probar en el storage para un valor de FileField, en orden
+
+    Args:
+        nombre: Valor guardado en el FileField
+
+    Returns:
+        list: Nombres candidatos sin repetir
+    """
+    # Normalizar el nombre para evitar rutas absolutas (Windows/Linux)
+    norm_name = str(nombre).replace('\\', '/').lstrip('/')
+    candidatos = [norm_name]
+
+    # Si incluye unidad (p. ej. C:/...) o es absoluta, intentar recortar
+    if ':' in norm_name:
+        candidatos.append(norm_name.split(':', 1)[1].lstrip('/'))
+
+    # Si contiene 'media/', probar desde ahí hacia delante
+    if 'media/' in norm_name:
+        candidatos.append(norm_name.split('media/', 1)[1])
+
+    # Fallback al nombre base
+    candidatos.append(os.path.basename(norm_name))
+
+    return list(dict.fromkeys(candidatos))
+
+
+def cargar_resoluciones(nombres):
+    """
+    Carga en memoria las resoluciones registradas para varios nombres con una sola consulta
+
+    Returns:
+        dict: nombre guardado -> nombre real (solo los que tienen resolución)
+    """
+    nombres = {str(nombre) for nombre in nombres if nombre}
+    resultado = {}
+    faltantes = []
+    with _lock:
+        ahora = time.monotonic()
+        for nombre in nombres:
+            encontrado, resuelto = _obtener_en_memoria(nombre, ahora)
+            if not encontrado:
+                faltantes.append(nombre)
+            elif resuelto:
+                resultado[nombre] = resuelto
+    if faltantes:
+        encontradas = dict(
+            ResolucionArchivo.objects.filter(nombreoriginal__in=faltantes)
+            .values_list('nombreoriginal', 'nombreresuelto')
+        )
+        with _lock:
+            ahora = time.monotonic()
+            for nombre in faltantes:
+                _guardar_en_memoria(nombre, encontradas.get(nombre), ahora)
+        resultado.update((nombre, resuelto) for nombre, resuelto in encontradas.items() if resuelto)
+    return resultado
+
+
+def resolver_nombre(nombre):
+    """Retorna el nombre real registrado para un valor de FileField, o None"""
+    return cargar_resoluciones([nombre]).get(str(nombre))
+
+
+def nombres_a_probar(nombre, resuelto=None):
+    """Nombres a probar en orden: primero la resolución conocida y luego los candidatos"""
+    candidatos = candidatos_nombre(nombre)
+    if resuelto:
+        candidatos = [resuelto] + [c for c in candidatos if c != resuelto]
+    return candidatos
+
+
+def registrar_resolucion(nombre, resuelto):
+    """Guarda el nombre real de un archivo si difiere del nombre guardado"""
+    nombre = str(nombre)
+    if not resuelto or resuelto == nombre:
+        return
+    with _lock:
+        ahora = time.monotonic()
+        if _obtener_en_memoria(nombre, ahora) == (True, resuelto):
+            return
+        _guardar_en_memoria(nombre, resuelto, ahora)
+    ResolucionArchivo.objects.update_or_create(
+        nombreoriginal=nombre,
+        defaults={'nombreresuelto': resuelto},
+    )
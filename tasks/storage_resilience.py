@@ -0,0 +1,196 @@
+"""
+Política de resiliencia para las llamadas a Azure Storage
+Timeouts por tipo de operación, reintentos con backoff exponencial y jitter para
+errores transitorios, y un circuit breaker que falla rápido cuando el almacenamiento
+está degradado. Lleva contadores de llamadas, reintentos y aperturas del circuito.
+"""
+
+from django.conf import settings
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from collections import Counter
+import random
+import threading
+import time
+
+
+# Timeouts por defecto (segundos) por tipo de operación
+TIMEOUTS_POR_DEFECTO = {
+    'metadatos': 5,
+    'lectura': 30,
+    'escritura': 60,
+    'listado': 30,
+    'eliminacion': 10,
+}
+
+# Códigos HTTP que indican un error transitorio del servicio
+ESTADOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+class AlmacenamientoNoDisponible(Exception):
+    """El circuito está abierto: no se intenta la llamada a Azure Storage"""
+
+
+def es_error_transitorio(error):
+    """Indica si vale la pena reintentar una operación que falló con este error"""
+    if isinstance(error, (ServiceRequestError, ServiceResponseError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, HttpResponseError):
+        return error.status_code in ESTADOS_TRANSITORIOS
+    return False
+
+
+def _retry_after(error):
+    """Segundos indicados por el servicio en la cabecera Retry-After, si existe"""
+    respuesta = getattr(error, 'response', None)
+    try:
+        return float(respuesta.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados.
+    - cerrado: las llamadas pasan; tras `umbral` fallos transitorios seguidos se abre.
+    - abierto: las llamadas fallan de inmediato durante `espera` segundos.
+    - semiabierto: se deja pasar una llamada de prueba; si funciona se cierra, si no se reabre.
+    """
+
+    def __init__(self, umbral=None, espera=None):
+        self.umbral = umbral if umbral is not None else getattr(settings, 'AZURE_STORAGE_CIRCUIT_FAILURES', 5)
+        self.espera = espera if espera is not None else getattr(settings, 'AZURE_STORAGE_CIRCUIT_RESET', 30)
+        self.estado = 'cerrado'
+        self.fallos_seguidos = 0
+        self._abierto_desde = 0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """Indica si se puede intentar una llamada ahora"""
+        with self._lock:
+            if self.estado == 'cerrado':
+                return True
+            if self.estado == 'abierto' and time.monotonic() - self._abierto_desde >= self.espera:
+                self.estado = 'semiabierto'
+                self._prueba_en_curso = False
+            if self.estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = 'cerrado'
+            self.fallos_seguidos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        """Registra un fallo transitorio; retorna True si el circuito se acaba de abrir"""
+        with self._lock:
+            self.fallos_seguidos += 1
+            if self.estado == 'semiabierto' or self.fallos_seguidos >= self.umbral:
+                abierto_antes = self.estado == 'abierto'
+                self.estado = 'abierto'
+                self._abierto_desde = time.monotonic()
+                self._prueba_en_curso = False
+                return not abierto_antes
+            return False
+
+
+class PoliticaAlmacenamiento:
+    """Ejecuta operaciones de almacenamiento con timeouts, reintentos y circuit breaker"""
+
+    def __init__(self, reintentos=None, backoff=None, backoff_max=None, circuito=None):
+        self.reintentos = reintentos if reintentos is not None else getattr(settings, 'AZURE_STORAGE_RETRY_TOTAL', 3)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'AZURE_STORAGE_RETRY_BACKOFF', 0.5)
+        self.backoff_max = backoff_max if backoff_max is not None else getattr(
+            settings, 'AZURE_STORAGE_RETRY_BACKOFF_MAX', 8
+        )
+        self.circuito = circuito or CircuitBreaker()
+        self.contadores = Counter()
+        self._lock = threading.Lock()
+
+    def _contar(self, metrica, operacion):
+        with self._lock:
+            self.contadores[metrica] += 1
+            self.contadores[f"{metrica}.{operacion}"] += 1
+
+    def timeout(self, operacion):
+        """Timeout en segundos para un tipo de operación"""
+        timeouts = {**TIMEOUTS_POR_DEFECTO, **getattr(settings, 'AZURE_STORAGE_TIMEOUTS', {})}
+        return timeouts[operacion]
+
+    def opciones(self, operacion):
+        """
+        Argumentos de timeout para una llamada del SDK:
+        `timeout` es el límite del lado del servidor y `read_timeout` el del socket
+        """
+        segundos = self.timeout(operacion)
+        return {'timeout': int(segundos), 'read_timeout': segundos}
+
+    def _pausa(self, intento, error):
+        """Backoff exponencial con jitter completo, respetando Retry-After si el servicio lo envía"""
+        limite = min(self.backoff_max, self.backoff * (2 ** intento))
+        pausa = random.uniform(0, limite)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            pausa = max(pausa, min(retry_after, self.backoff_max))
+        return pausa
+
+    def ejecutar(self, operacion, funcion, *args, **kwargs):
+        """
+        Ejecuta `funcion(*args, **kwargs, **opciones(operacion))` aplicando la política.
+
+        Args:
+            operacion: Tipo de operación ('metadatos', 'lectura', 'escritura', 'listado', 'eliminacion')
+            funcion: Llamada del SDK (debe aceptar timeout y read_timeout)
+
+        Raises:
+            AlmacenamientoNoDisponible: si el circuito está abierto
+            La excepción original si no es transitoria o se agotan los reintentos
+        """
+        kwargs.update(self.opciones(operacion))
+        intento = 0
+        while True:
+            if not self.circuito.permitir():
+                self._contar('rechazadas', operacion)
+                raise AlmacenamientoNoDisponible(
+                    f"Azure Storage no disponible (circuito abierto), operación: {operacion}"
+                )
+            self._contar('llamadas', operacion)
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception as error:
+                if not es_error_transitorio(error):
+                    # Errores como blob inexistente no indican que el servicio esté degradado
+                    self.circuito.registrar_exito()
+                    raise
+                self._contar('fallos', operacion)
+                if self.circuito.registrar_fallo():
+                    self._contar('circuito_abierto', operacion)
+                    print(f"Circuito de Azure Storage abierto tras {self.circuito.fallos_seguidos} fallos: {error}")
+                if intento >= self.reintentos or self.circuito.estado == 'abierto':
+                    raise
+                self._contar('reintentos', operacion)
+                time.sleep(self._pausa(intento, error))
+                intento += 1
+                continue
+            self.circuito.registrar_exito()
+            return resultado
+
+    def metricas(self):
+        """Retorna los contadores y el estado del circuito"""
+        with self._lock:
+            contadores = dict(self.contadores)
+        contadores['estado_circuito'] = self.circuito.estado
+        return contadores
+
+    def reiniciar(self):
+        """Vuelve a cerrar el circuito y pone los contadores en cero"""
+        with self._lock:
+            self.contadores.clear()
+        self.circuito.registrar_exito()
+
+
+# Instancia global de la política, compartida por todos los gestores de almacenamiento
+politica_almacenamiento = PoliticaAlmacenamiento()
@@ -0,0 +1,24 @@
+"""
+Filtros para mostrar la foto de perfil con sus variantes reducidas
+Uso: {% load fotos %} ... <img src="{{ datos.fotoperfil|foto_variante:'avatar' }}">
+"""
+
+from django import template
+
+from ..fotos_perfil import archivo_variante, url_variante
+
+
+register = template.Library()
+
+
+@register.filter
+def foto_variante(foto, variante='avatar'):
+    """URL de la variante de la foto, o de la foto original si la variante no existe"""
+    return url_variante(foto, variante)
+
+
+@register.filter
+def url_variante_existente(foto, variante):
+    """URL de la variante solo si ya existe (p. ej. para el <source> WebP de un <picture>), o ''"""
+    archivo = archivo_variante(foto, variante)
+    return archivo.url if archivo else ''
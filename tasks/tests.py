@@ -1,3 +1,934 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from multiprocessing.dummy import Pool as PoolHilos
+from unittest import mock
+import zipfile
 
-# Create your tests here.
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ServiceResponseError
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    BlobContenido, DatosPersonales, ExperienciaLaboral, Reconocimiento, CursoRealizado, ProductoAcademico,
+    ReplicaPendiente, ResolucionArchivo, TrabajoPDF
+)
+from .azure_blob_storage import AzureBlobStorage
+from .azure_client import get_blob_service_client, reiniciar_clientes
+from .azure_metadata_cache import metadatos_blobs
+from .azure_storage import AzureStorageManager
+from .certificados import procesar_replica, programar_replica, reservar_siguiente_replica
+from .fotos_perfil import nombre_variante
+from .huerfanos import FiltroBloom, construir_referenciados, recalcular_referencias
+from .templatetags.fotos import foto_variante
+from .zip_stream import iterar_zip
+from .pdf_cache import CVPDFCache, LocalFileSystemCacheBackend, calcular_huella_cv
+from .pdf_generator import CVPDFGenerator
+from .pdf_jobs import (
+    encolar_trabajo_pdf, liberar_trabajos_abandonados, obtener_pdf_o_trabajo, procesar_trabajo,
+    reservar_siguiente_trabajo
+)
+from .storage_names import _resoluciones, limpiar_resoluciones, resolver_nombre
+from .storage_resilience import AlmacenamientoNoDisponible, CircuitBreaker, PoliticaAlmacenamiento, politica_almacenamiento
+
+
+class CVPDFGeneratorQueriesTest(TestCase):
+    """El número de consultas de generate() no depende de cuántas filas tenga la hoja de vida"""
+
+    def crear_hoja_vida(self, username, filas):
+        user = User.objects.create_user(username, f"{username}@example.com", "clave")
+        datos = DatosPersonales.objects.create(
+            user=user, nombres="Ana", apellidos="Pérez", numerocedula=username[:10]
+        )
+        for i in range(filas):
+            ExperienciaLaboral.objects.create(
+                datospersonales=datos, cargodesempenado=f"Cargo {i}", nombreempresa="Empresa",
+                lugarempresa="Quito", fechainiciogestion=date(2020, 1, 1)
+            )
+            Reconocimiento.objects.create(
+                datospersonales=datos, tiporeconocimiento="Público",
+                fechareconocimiento=date(2021, 1, 1), entidadpatrocinadora="Entidad"
+            )
+            CursoRealizado.objects.create(
+                datospersonales=datos, nombrecurso=f"Curso {i}", fechainicio=date(2022, 1, 1),
+                entidadpatrocinadora="Entidad"
+            )
+            ProductoAcademico.objects.create(
+                datospersonales=datos, nombrerecurso=f"Recurso {i}", clasificador="Artículo"
+            )
+        # Filas inactivas que no deben aparecer en el PDF
+        ExperienciaLaboral.objects.create(
+            datospersonales=datos, cargodesempenado="Inactivo", nombreempresa="Empresa",
+            lugarempresa="Quito", fechainiciogestion=date(2019, 1, 1), activo=False
+        )
+        return DatosPersonales.objects.get(pk=datos.pk)
+
+    def contar_consultas(self, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            pdf = CVPDFGenerator(datos).generate()
+        self.assertIsNotNone(pdf)
+        pdf.close()
+        return len(consultas)
+
+    def test_consultas_constantes(self):
+        pocas = self.contar_consultas(self.crear_hoja_vida("pocas", 1))
+        muchas = self.contar_consultas(self.crear_hoja_vida("muchas", 15))
+        self.assertEqual(pocas, muchas)
+        # usuario + una consulta por cada sección
+        self.assertEqual(muchas, 5)
+
+    def test_solo_filas_activas(self):
+        datos = self.crear_hoja_vida("activas", 2)
+        generator = CVPDFGenerator(datos)
+        generator.generate().close()
+        self.assertEqual(len(datos.experiencias_activas), 2)
+        self.assertTrue(all(exp.activo for exp in datos.experiencias_activas))
+
+
+@override_settings(CV_PDF_DESCARGA_MAX_MEMORY=64 * 1024, CV_PDF_DESCARGA_MAX_MEMORY_TOTAL=200 * 1024)
+class DescargasPDFTest(TestCase):
+    """Las descargas de un render no retienen en memoria más de CV_PDF_DESCARGA_MAX_MEMORY_TOTAL"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        configuracion = override_settings(MEDIA_ROOT=media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        self.datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+        for i in range(12):
+            Reconocimiento.objects.create(
+                datospersonales=self.datos, tiporeconocimiento="Público", fechareconocimiento=date(2021, 1, 1),
+                entidadpatrocinadora="Entidad", certificado=ContentFile(os.urandom(50 * 1024), name=f"c{i}.pdf"),
+            )
+
+    def test_presupuesto_de_memoria_por_render(self):
+        generator = CVPDFGenerator(self.datos)
+        self.addCleanup(generator._cerrar_descargas)
+        futuros = [generator._iniciar_descarga(r.certificado) for r in self.datos.reconocimientos.all()]
+        buffers = [generator._esperar_descarga(futuro) for futuro in futuros]
+        generator._executor.shutdown()
+
+        self.assertEqual([len(buffer.read()) for buffer in buffers], [50 * 1024] * 12)
+        en_memoria = [b for b in buffers if isinstance(b, tempfile.SpooledTemporaryFile) and not b._rolled]
+        # Como mucho 4 x 50 KB caben en 200 KB; el resto pasó a disco
+        self.assertTrue(1 <= len(en_memoria) <= 4)
+        self.assertEqual(generator.memoria_descargas, len(en_memoria) * 50 * 1024)
+        generator._cerrar_descargas()
+        self.assertEqual(generator.memoria_descargas, 0)
+
+
+@override_settings(CV_RESOLUCIONES_MAX_ENTRADAS=2, CV_RESOLUCIONES_TTL_NEGATIVO=60)
+class ResolucionesNombresTest(TestCase):
+    """La memoria de resoluciones está acotada y olvida pronto los nombres sin resolución"""
+
+    def setUp(self):
+        limpiar_resoluciones()
+        self.addCleanup(limpiar_resoluciones)
+        parche = mock.patch("tasks.storage_names.time")
+        self.reloj = parche.start().monotonic
+        self.reloj.return_value = 1000.0
+        self.addCleanup(parche.stop)
+
+    def test_negativos_vencen(self):
+        self.assertIsNone(resolver_nombre("C:/media/a.pdf"))
+        ResolucionArchivo.objects.create(nombreoriginal="C:/media/a.pdf", nombreresuelto="a.pdf")
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolver_nombre("C:/media/a.pdf"))
+        self.reloj.return_value += 61
+        self.assertEqual(resolver_nombre("C:/media/a.pdf"), "a.pdf")
+        # Las resoluciones encontradas no vencen
+        self.reloj.return_value += 3600
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver_nombre("C:/media/a.pdf"), "a.pdf")
+
+    def test_lru_acotada(self):
+        ResolucionArchivo.objects.create(nombreoriginal="C:/media/a.pdf", nombreresuelto="a.pdf")
+        resolver_nombre("C:/media/a.pdf")
+        resolver_nombre("b.pdf")
+        resolver_nombre("C:/media/a.pdf")  # "a" pasa a ser la más reciente
+        resolver_nombre("c.pdf")
+        self.assertEqual(list(_resoluciones), ["C:/media/a.pdf", "c.pdf"])
+
+
+class CVPDFCacheTest(TestCase):
+    """La caché de PDFs expulsa por tamaño (LRU) y la huella cambia cuando cambia la hoja de vida"""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, True)
+        self.cache = CVPDFCache(LocalFileSystemCacheBackend(directorio), max_bytes=250)
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        self.datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+        self.curso = CursoRealizado.objects.create(
+            datospersonales=self.datos, nombrecurso="Curso", fechainicio=date(2022, 1, 1),
+            entidadpatrocinadora="Entidad"
+        )
+
+    def leer(self, clave):
+        archivo = self.cache.obtener(clave)
+        if archivo is None:
+            return None
+        with archivo:
+            return archivo.read()
+
+    def test_lru_por_tamano_y_contadores(self):
+        for clave in ("a", "b"):
+            self.cache.guardar(clave, BytesIO(clave.encode() * 100))
+        self.assertEqual(self.leer("a"), b"a" * 100)  # "a" pasa a ser la más reciente
+        self.cache.guardar("c", BytesIO(b"c" * 100))  # 300 bytes > 250: se expulsa "b"
+
+        self.assertIsNone(self.leer("b"))
+        self.assertEqual(self.leer("c"), b"c" * 100)
+        self.assertEqual(self.cache.estadisticas(), {
+            'hits': 2, 'misses': 1, 'evictions': 1, 'entradas': 2, 'bytes': 200, 'max_bytes': 250,
+        })
+
+    def test_limite_compartido_entre_workers(self):
+        # Dos instancias sobre el mismo directorio, como dos workers de gunicorn
+        directorio = self.cache.backend.directorio
+        otro = CVPDFCache(LocalFileSystemCacheBackend(directorio), max_bytes=250)
+        self.cache.guardar("a", BytesIO(b"a" * 100))
+        os.utime(os.path.join(directorio, "a.pdf"), (1, 1))
+        otro.guardar("b", BytesIO(b"b" * 100))
+        otro.guardar("c", BytesIO(b"c" * 100))  # cuenta "a" aunque la guardó el otro worker
+
+        self.assertEqual(sorted(os.listdir(directorio)), ["b.pdf", "c.pdf"])
+        self.assertEqual(otro.estadisticas()['bytes'], 200)
+
+    def huella(self):
+        return calcular_huella_cv(DatosPersonales.objects.get(pk=self.datos.pk))
+
+    def test_huella_estable_sin_cambios(self):
+        self.assertEqual(self.huella(), self.huella())
+
+    def test_huella_cambia_al_editar_una_fila(self):
+        anterior = self.huella()
+        self.curso.nombrecurso = "Curso avanzado"
+        self.curso.save()
+        self.assertNotEqual(self.huella(), anterior)
+
+    def test_huella_cambia_al_desactivar_una_fila(self):
+        anterior = self.huella()
+        # update() no toca fechamodificacion: la huella debe depender de `activo`
+        CursoRealizado.objects.filter(pk=self.curso.pk).update(activo=False)
+        self.assertNotEqual(self.huella(), anterior)
+
+    def test_huella_cambia_con_el_certificado(self):
+        anterior = self.huella()
+        CursoRealizado.objects.filter(pk=self.curso.pk).update(certificado="certificados/cursos/nuevo.pdf")
+        self.assertNotEqual(self.huella(), anterior)
+
+    def test_huella_cambia_con_la_fecha(self):
+        anterior = self.huella()
+        with mock.patch("tasks.pdf_cache.date") as fecha:
+            fecha.today.return_value = date(2099, 1, 1)
+            self.assertNotEqual(self.huella(), anterior)
+
+
+@override_settings(CV_PDF_ASYNC_ENABLED=True, CV_PDF_ASYNC_LATENCY_BUDGET=-1)
+class TrabajosPDFTest(TestCase):
+    """Cola de trabajos PDF en segundo plano y sus vistas de estado y descarga"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        cache = CVPDFCache(LocalFileSystemCacheBackend(self.cache_dir))
+        for modulo in ("tasks.pdf_cache", "tasks.pdf_jobs"):
+            parche = mock.patch(f"{modulo}.pdf_cache", cache)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+        self.user = User.objects.create_user("ana", "ana@example.com", "clave")
+        self.datos = DatosPersonales.objects.create(
+            user=self.user, nombres="Ana", apellidos="Pérez", numerocedula="123"
+        )
+        self.client.force_login(self.user)
+
+    def test_encolar_reutiliza_el_trabajo_pendiente(self):
+        primero = encolar_trabajo_pdf(self.datos, self.user)
+        self.assertEqual(encolar_trabajo_pdf(self.datos, self.user), primero)
+        TrabajoPDF.objects.filter(pk=primero.pk).update(estado='completado')
+        self.assertNotEqual(encolar_trabajo_pdf(self.datos, self.user), primero)
+
+    def test_un_trabajo_se_reserva_una_sola_vez(self):
+        trabajo = encolar_trabajo_pdf(self.datos, self.user)
+        self.assertEqual(reservar_siguiente_trabajo(), trabajo)
+        self.assertIsNone(reservar_siguiente_trabajo())
+        self.assertEqual(TrabajoPDF.objects.get().estado, 'procesando')
+
+    def test_liberar_trabajos_abandonados(self):
+        trabajo = encolar_trabajo_pdf(self.datos, self.user)
+        reservar_siguiente_trabajo()
+        self.assertEqual(liberar_trabajos_abandonados(), 0)
+        TrabajoPDF.objects.filter(pk=trabajo.pk).update(fechainicio=timezone.now() - timedelta(hours=1))
+        self.assertEqual(liberar_trabajos_abandonados(), 1)
+        self.assertEqual(reservar_siguiente_trabajo(), trabajo)
+
+    def test_error_al_generar(self):
+        encolar_trabajo_pdf(self.datos, self.user)
+        with mock.patch("tasks.pdf_jobs.generar_pdf_cv", return_value=None):
+            trabajo = procesar_trabajo(reservar_siguiente_trabajo())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertEqual(trabajo.mensajeerror, "No se pudo generar el PDF")
+
+    def test_pdf_en_cache_no_pasa_por_la_cola(self):
+        archivo, trabajo = obtener_pdf_o_trabajo(self.datos, self.user)
+        self.assertIsNone(archivo)
+        procesar_trabajo(reservar_siguiente_trabajo())
+
+        archivo, trabajo = obtener_pdf_o_trabajo(self.datos, self.user)
+        self.assertIsNone(trabajo)
+        with archivo:
+            self.assertTrue(archivo.read(5).startswith(b"%PDF"))
+        self.assertEqual(TrabajoPDF.objects.count(), 1)
+
+    def test_vistas_de_estado_y_descarga(self):
+        json = {'HTTP_ACCEPT': 'application/json'}
+        respuesta = self.client.get(reverse('descargar_cv_pdf'))
+        trabajo = TrabajoPDF.objects.get()
+        url_estado = reverse('estado_trabajo_pdf', args=[trabajo.id])
+        url_descarga = reverse('descargar_trabajo_pdf', args=[trabajo.id])
+        # Un enlace del navegador lleva a la página de espera, no a JSON
+        self.assertRedirects(respuesta, url_estado)
+        self.assertTemplateUsed(self.client.get(url_estado), 'cv/generando_pdf.html')
+
+        respuesta = self.client.get(url_estado, **json)
+        self.assertEqual((respuesta.status_code, respuesta.json()['estado']), (202, 'pendiente'))
+        self.assertEqual(self.client.get(url_descarga, **json).status_code, 202)
+
+        procesar_trabajo(reservar_siguiente_trabajo())
+        respuesta = self.client.get(url_estado, **json)
+        self.assertEqual((respuesta.status_code, respuesta.json()['url_descarga']), (200, url_descarga))
+        respuesta = self.client.get(url_descarga)
+        self.assertEqual((respuesta.status_code, respuesta['Content-Type']), (200, 'application/pdf'))
+        respuesta.close()
+
+        otro = User.objects.create_user("luis", "luis@example.com", "clave")
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(url_estado, **json).status_code, 403)
+        self.assertEqual(self.client.get(url_descarga).status_code, 403)
+
+    def test_pdf_expulsado_vuelve_a_la_cola(self):
+        encolar_trabajo_pdf(self.datos, self.user)
+        trabajo = procesar_trabajo(reservar_siguiente_trabajo())
+        url_estado = reverse('estado_trabajo_pdf', args=[trabajo.id])
+        url_descarga = reverse('descargar_trabajo_pdf', args=[trabajo.id])
+        for nombre in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, nombre))
+
+        # La descarga no genera el PDF en la petición: reencola el trabajo y lleva a la página de espera
+        with mock.patch("tasks.pdf_jobs.generar_pdf_cv") as generar:
+            respuesta = self.client.get(url_descarga)
+        generar.assert_not_called()
+        self.assertRedirects(respuesta, url_estado)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.huella), ('pendiente', None))
+        respuesta = self.client.get(url_descarga, HTTP_ACCEPT='application/json')
+        self.assertEqual((respuesta.status_code, respuesta.json()['estado']), (202, 'pendiente'))
+
+        procesar_trabajo(reservar_siguiente_trabajo())
+        respuesta = self.client.get(url_descarga)
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta.close()
+
+    def test_worker_libera_abandonados_periodicamente(self):
+        encolar_trabajo_pdf(self.datos, self.user)
+        with mock.patch(
+            "tasks.management.commands.procesar_trabajos_pdf.liberar_trabajos_abandonados", return_value=0
+        ) as liberar:
+            call_command("procesar_trabajos_pdf", "--una-vez", "--liberar-cada", "0", stdout=StringIO())
+        # Al arrancar y en cada vuelta del bucle (una con trabajo y otra sin)
+        self.assertEqual(liberar.call_count, 3)
+
+
+class AzureFakeStorageTest(SimpleTestCase):
+    """Los gestores de Azure funcionan contra el sustituto local (AZURE_STORAGE_FAKE_ROOT)"""
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raiz, True)
+        configuracion = override_settings(
+            AZURE_STORAGE_FAKE_ROOT=self.raiz,
+            AZURE_STORAGE_CONNECTION_STRING='AccountName=local;AccountKey=bG9jYWw=;BlobEndpoint=/azure-local/',
+            AZURE_STORAGE_BLOCK_SIZE=1024,
+        )
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        reiniciar_clientes()
+        self.addCleanup(reiniciar_clientes)
+        metadatos_blobs.limpiar()
+        self.addCleanup(metadatos_blobs.limpiar)
+        politica_almacenamiento.reiniciar()
+        self.addCleanup(politica_almacenamiento.reiniciar)
+
+    def test_guardar_leer_y_eliminar(self):
+        storage = AzureBlobStorage()
+        contenido = bytes(range(256)) * 20  # varios bloques
+        nombre = storage.save('certificados/prueba.pdf', ContentFile(contenido))
+
+        self.assertTrue(storage.exists(nombre))
+        self.assertEqual(storage.size(nombre), len(contenido))
+        with storage.open(nombre) as archivo:
+            archivo.seek(1000)
+            self.assertEqual(archivo.read(100), contenido[1000:1100])
+        self.assertEqual(storage.url(nombre), '/azure-local/media/certificados/prueba.pdf')
+
+        peticiones = get_blob_service_client().red.peticiones
+        self.assertEqual(peticiones['upload_blob'], 0)
+        self.assertEqual(peticiones['stage_block'], 5)
+        self.assertEqual(peticiones['commit_block_list'], 1)
+
+        storage.delete(nombre)
+        self.assertFalse(storage.exists(nombre))
+
+    def test_cache_metadatos(self):
+        storage = AzureBlobStorage()
+        nombre = storage.save('fotos/perfil.png', ContentFile(b'x' * 100))
+        peticiones = get_blob_service_client().red.peticiones
+        consultas = peticiones['get_blob_properties']
+
+        # Los metadatos quedan en caché al guardar
+        self.assertTrue(storage.exists(nombre))
+        self.assertEqual(storage.size(nombre), 100)
+        self.assertIsNotNone(storage.get_modified_time(nombre))
+        self.assertEqual(peticiones['get_blob_properties'], consultas)
+
+        # Al eliminar se registra que el blob ya no existe
+        storage.delete(nombre)
+        self.assertFalse(storage.exists(nombre))
+        self.assertEqual(storage.size(nombre), 0)
+        self.assertEqual(peticiones['get_blob_properties'], consultas)
+
+    def test_contenedor_sin_permisos_se_asume_existente(self):
+        os.makedirs(os.path.join(self.raiz, 'media'))
+        prohibido = HttpResponseError("This request is not authorized to perform this operation.")
+        prohibido.status_code = 403
+        with mock.patch("tasks.azure_fake.FakeContainerClient.get_container_properties", side_effect=prohibido) as consulta, \
+                mock.patch("tasks.azure_fake.FakeBlobServiceClient.create_container") as crear:
+            storage = AzureBlobStorage()
+            storage.save('certificados/a.pdf', ContentFile(b'a'))
+            storage.save('certificados/b.pdf', ContentFile(b'b'))
+
+        # Se consulta una sola vez por proceso, no se intenta crear y no cuenta como fallo del circuito
+        self.assertEqual(consulta.call_count, 1)
+        crear.assert_not_called()
+        self.assertEqual((politica_almacenamiento.circuito.estado, politica_almacenamiento.circuito.fallos_seguidos),
+                         ('cerrado', 0))
+        self.assertTrue(storage.exists('certificados/b.pdf'))
+
+    def test_listdir_jerarquico(self):
+        storage = AzureBlobStorage()
+        for nombre in ['certificados/a.pdf', 'certificados/b.pdf', 'certificados/user_1/c.pdf',
+                       'certificados/user_2/d.pdf', 'fotos/e.png']:
+            storage.save(nombre, ContentFile(b'x'))
+
+        self.assertEqual(storage.listdir(''), (['certificados', 'fotos'], []))
+        self.assertEqual(storage.listdir('certificados'), (['user_1', 'user_2'], ['a.pdf', 'b.pdf']))
+
+        # Recorrido por páginas de dos elementos
+        directorios, archivos, token = storage.listdir_pagina('certificados/', tamano_pagina=2)
+        paginas = 1
+        while token:
+            mas_directorios, mas_archivos, token = storage.listdir_pagina('certificados/', token, 2)
+            directorios += mas_directorios
+            archivos += mas_archivos
+            paginas += 1
+        self.assertEqual(paginas, 2)
+        self.assertEqual((directorios, archivos), storage.listdir('certificados'))
+
+        self.assertEqual(len(list(storage.iterar_blobs('certificados/'))), 4)
+
+    def test_url_sas_en_cache(self):
+        with override_settings(AZURE_STORAGE_USE_SAS=True, AZURE_STORAGE_SAS_TTL=600,
+                               AZURE_STORAGE_SAS_REFRESH_MARGIN=60):
+            storage = AzureBlobStorage()
+            url = storage.url('fotos/perfil.png')
+            self.assertTrue(url.startswith('/azure-local/media/fotos/perfil.png?'))
+            self.assertIn('sig=', url)
+            self.assertEqual(storage.url('fotos/perfil.png'), url)
+
+            # Cerca de la expiración se firma un token nuevo
+            with mock.patch('tasks.azure_blob_storage.time.time', return_value=time.time() + 590):
+                self.assertNotEqual(storage.url('fotos/perfil.png'), url)
+        self.assertEqual(get_blob_service_client().red.peticiones['get_blob_properties'], 0)
+
+    def test_gestor_documentos(self):
+        manager = AzureStorageManager()
+        url = manager.upload_document(ContentFile(b'%PDF-1.4 prueba'), 'reconocimientos/user_1/cert.pdf')
+        self.assertEqual(url, '/azure-local/certificados/reconocimientos/user_1/cert.pdf')
+        self.assertEqual(manager.download_document('reconocimientos/user_1/cert.pdf'), b'%PDF-1.4 prueba')
+        self.assertTrue(manager.delete_document('reconocimientos/user_1/cert.pdf'))
+        self.assertIsNone(manager.download_document('reconocimientos/user_1/cert.pdf'))
+
+    @override_settings(AZURE_STORAGE_DELETE_BATCH_SIZE=2)
+    def test_eliminacion_en_lotes(self):
+        manager = AzureStorageManager()
+        nombres = [f'cursos/ana/{i}_cert.pdf' for i in range(5)]
+        for nombre in nombres:
+            manager.upload_document(ContentFile(b'%PDF-1.4'), nombre)
+        red = get_blob_service_client().red
+        red.peticiones.clear()
+
+        resultados = manager.delete_prefix('cursos/ana/')
+        self.assertEqual(resultados, {nombre: True for nombre in nombres})
+        self.assertEqual(red.peticiones['delete_blobs'], 3)
+        self.assertEqual(red.peticiones['delete_blob'], 0)
+        self.assertEqual(list(manager.iterar_documentos('cursos/')), [])
+
+        # Los blobs que ya no existen se informan por separado, sin fallar el lote
+        storage = AzureBlobStorage()
+        nombre = storage.save('fotos/a.jpg', ContentFile(b'jpg'))
+        self.assertEqual(storage.delete_many([nombre, 'fotos/no_existe.jpg']), {
+            nombre: True, 'fotos/no_existe.jpg': True
+        })
+        self.assertFalse(storage.exists(nombre))
+
+
+class PoliticaAlmacenamientoTest(SimpleTestCase):
+    """Reintentos, timeouts y circuit breaker de las llamadas a Azure Storage"""
+
+    def crear_politica(self, reintentos=3, umbral=5):
+        return PoliticaAlmacenamiento(
+            reintentos=reintentos, backoff=0, backoff_max=0, circuito=CircuitBreaker(umbral=umbral, espera=60)
+        )
+
+    def test_reintenta_errores_transitorios(self):
+        politica = self.crear_politica()
+        llamada = mock.Mock(side_effect=[ServiceResponseError("timeout"), ServiceResponseError("timeout"), 'ok'])
+        self.assertEqual(politica.ejecutar('lectura', llamada, 'blob'), 'ok')
+        self.assertEqual(politica.metricas()['reintentos'], 2)
+        # Cada intento recibe el timeout de su tipo de operación
+        llamada.assert_called_with('blob', timeout=30, read_timeout=30)
+
+    def test_no_reintenta_errores_permanentes(self):
+        politica = self.crear_politica()
+        llamada = mock.Mock(side_effect=ResourceNotFoundError("no existe"))
+        with self.assertRaises(ResourceNotFoundError):
+            politica.ejecutar('metadatos', llamada)
+        self.assertEqual(llamada.call_count, 1)
+        self.assertEqual(politica.metricas()['estado_circuito'], 'cerrado')
+
+    def test_circuito_abierto_falla_rapido(self):
+        politica = self.crear_politica(reintentos=5, umbral=2)
+        llamada = mock.Mock(side_effect=ServiceResponseError("caído"))
+        with self.assertRaises(ServiceResponseError):
+            politica.ejecutar('escritura', llamada)
+        self.assertEqual(llamada.call_count, 2)
+
+        with self.assertRaises(AlmacenamientoNoDisponible):
+            politica.ejecutar('escritura', llamada)
+        self.assertEqual(llamada.call_count, 2)
+
+        metricas = politica.metricas()
+        self.assertEqual(metricas['circuito_abierto'], 1)
+        self.assertEqual(metricas['rechazadas'], 1)
+        self.assertEqual(metricas['estado_circuito'], 'abierto')
+
+        # Pasada la espera se deja pasar una llamada de prueba que cierra el circuito
+        politica.circuito.espera = 0
+        self.assertEqual(politica.ejecutar('escritura', mock.Mock(return_value='ok')), 'ok')
+        self.assertEqual(politica.metricas()['estado_circuito'], 'cerrado')
+
+
+class ReplicaCertificadosTest(TestCase):
+    """Las réplicas de certificados pasan por la bandeja de salida y las sube el worker"""
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, True)
+        self.addCleanup(shutil.rmtree, media, True)
+        configuracion = override_settings(
+            AZURE_STORAGE_FAKE_ROOT=raiz,
+            AZURE_STORAGE_CONNECTION_STRING='AccountName=local;AccountKey=bG9jYWw=;BlobEndpoint=/azure-local/',
+            MEDIA_ROOT=media,
+            CV_CERTIFICADOS_REPLICA=True,
+        )
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        reiniciar_clientes()
+        self.addCleanup(reiniciar_clientes)
+        politica_almacenamiento.reiniciar()
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+        self.curso = CursoRealizado(
+            datospersonales=datos, nombrecurso="Curso", fechainicio=date(2022, 1, 1), entidadpatrocinadora="Entidad"
+        )
+        self.curso.certificado.save("cert.pdf", ContentFile(b"%PDF-1.4 certificado"))
+
+    def test_replica_idempotente(self):
+        primera = programar_replica(self.curso)
+        self.assertEqual(programar_replica(self.curso), primera)
+        self.assertEqual(ReplicaPendiente.objects.count(), 1)
+        self.curso.refresh_from_db()
+        self.assertEqual(self.curso.estadoreplica, 'pendiente')
+
+        replica = procesar_replica(reservar_siguiente_replica())
+        self.assertEqual(replica.estado, 'completado')
+        self.assertIsNone(reservar_siguiente_replica())
+        self.curso.refresh_from_db()
+        self.assertEqual(self.curso.estadoreplica, 'completado')
+        blob_name = f"cursos/ana/{self.curso.pk}_{os.path.basename(self.curso.certificado.name)}"
+        self.assertEqual(self.curso.certificadoreplica, f"/azure-local/certificados/{blob_name}")
+        self.assertEqual(AzureStorageManager().download_document(blob_name), b"%PDF-1.4 certificado")
+
+    def test_reintento_y_descarte(self):
+        programar_replica(self.curso)
+        with mock.patch('tasks.certificados.azure_storage.upload_document', return_value=None):
+            replica = procesar_replica(reservar_siguiente_replica())
+        self.assertEqual(replica.estado, 'pendiente')
+        self.assertEqual(replica.intentos, 1)
+        self.assertGreater(replica.fechaproximointento, replica.fechafin)
+
+        # Si el certificado cambia antes del reintento, la copia vieja se descarta
+        self.curso.certificado.save("otro.pdf", ContentFile(b"%PDF-1.4 otro"))
+        ReplicaPendiente.objects.filter(pk=replica.pk).update(fechaproximointento=replica.fechafin)
+        self.assertEqual(procesar_replica(reservar_siguiente_replica()).estado, 'descartado')
+
+    def test_reutilizar_entrada_descartada_o_sin_copia(self):
+        original = self.curso.certificado.name
+        programar_replica(self.curso)
+        # Se reemplaza el certificado antes de que el worker procese la primera copia
+        self.curso.certificado.save("otro.pdf", ContentFile(b"%PDF-1.4 otro"))
+        programar_replica(self.curso)
+        self.assertEqual(procesar_replica(reservar_siguiente_replica()).estado, 'descartado')
+        procesar_replica(reservar_siguiente_replica())
+
+        # Volver al archivo original (mismo nombre por contenido) reencola su entrada descartada
+        self.curso.certificado.save("cert.pdf", ContentFile(b"%PDF-1.4 certificado"))
+        self.assertEqual(self.curso.certificado.name, original)
+        replica = programar_replica(self.curso)
+        self.assertEqual((replica.estado, replica.intentos), ('pendiente', 0))
+        self.assertEqual(procesar_replica(reservar_siguiente_replica()).estado, 'completado')
+        self.curso.refresh_from_db()
+        self.assertEqual(self.curso.estadoreplica, 'completado')
+
+        # Una entrada completada también se reencola, sin consultar Azure en la vista;
+        # el worker no vuelve a subir la copia si sigue existiendo
+        peticiones = get_blob_service_client().red.peticiones
+        subidas = peticiones['upload_blob'] + peticiones['commit_block_list']
+        with mock.patch("tasks.certificados.azure_storage.document_exists") as existe:
+            replica = programar_replica(self.curso)
+        existe.assert_not_called()
+        self.assertEqual((replica.estado, replica.intentos), ('pendiente', 0))
+        self.assertEqual(procesar_replica(reservar_siguiente_replica()).estado, 'completado')
+        self.assertEqual(peticiones['upload_blob'] + peticiones['commit_block_list'], subidas)
+        self.curso.refresh_from_db()
+        self.assertEqual((self.curso.estadoreplica, self.curso.certificadoreplica), ('completado', replica.url))
+
+        # Si la copia se eliminó después de completarse, el worker la vuelve a subir
+        manager = AzureStorageManager()
+        blob_name = f"cursos/ana/{self.curso.pk}_{os.path.basename(original)}"
+        self.assertTrue(manager.delete_document(blob_name))
+        programar_replica(self.curso)
+        self.assertEqual(procesar_replica(reservar_siguiente_replica()).estado, 'completado')
+        self.assertTrue(manager.document_exists(blob_name))
+
+
+class ContentAddressedStorageTest(TestCase):
+    """Los certificados con el mismo contenido se guardan una sola vez, con conteo de referencias"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        configuracion = override_settings(MEDIA_ROOT=media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        self.datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+
+    def crear_curso(self, contenido, nombre="cert.pdf"):
+        curso = CursoRealizado(
+            datospersonales=self.datos, nombrecurso="Curso", fechainicio=date(2022, 1, 1),
+            entidadpatrocinadora="Entidad"
+        )
+        curso.certificado.save(nombre, ContentFile(contenido))
+        return curso
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        primero = self.crear_curso(b"%PDF-1.4 igual", "a.pdf")
+        segundo = self.crear_curso(b"%PDF-1.4 igual", "b.pdf")
+        self.assertEqual(primero.certificado.name, segundo.certificado.name)
+        blob = BlobContenido.objects.get()
+        self.assertEqual(blob.referencias, 2)
+        self.assertEqual(blob.tamano, len(b"%PDF-1.4 igual"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertEqual(BlobContenido.objects.get().referencias, 1)
+        self.assertTrue(segundo.certificado.storage.exists(segundo.certificado.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(BlobContenido.objects.exists())
+        self.assertFalse(segundo.certificado.storage.exists(segundo.certificado.name))
+
+    def test_limpiar_huerfanos_corrige_referencias(self):
+        # Repetir el mismo contenido con FieldFile.save() deja una referencia de más
+        curso = self.crear_curso(b"%PDF-1.4 igual")
+        curso.certificado.save("cert.pdf", ContentFile(b"%PDF-1.4 igual"))
+        self.assertEqual(BlobContenido.objects.get().referencias, 2)
+        nombre = curso.certificado.name
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.delete()
+        self.assertEqual(BlobContenido.objects.get().referencias, 1)
+
+        # El dry-run informa el archivo que el recuento dejaría sin uso, sin tocar nada
+        salida = StringIO()
+        call_command("limpiar_huerfanos", "--min-edad", "0", "--dry-run", stdout=salida)
+        self.assertIn(f"media: {nombre} (14 bytes, sin referencias)", salida.getvalue())
+        self.assertIn("1 archivos sin uso", salida.getvalue())
+        self.assertEqual(BlobContenido.objects.get().referencias, 1)
+
+        # Con lotes de una fila cada una: la consulta agrupada por campo es por lote, no por archivo
+        otro = self.crear_curso(b"%PDF-1.4 otro")
+        BlobContenido.objects.filter(nombre=otro.certificado.name).update(referencias=3)
+        self.assertEqual(recalcular_referencias(0, tamano_lote=1), (2, 1))
+        self.assertEqual(BlobContenido.objects.get().referencias, 1)
+        self.assertTrue(default_storage.exists(nombre))
+
+        call_command("limpiar_huerfanos", "--min-edad", "0", stdout=StringIO())
+        self.assertEqual(BlobContenido.objects.get().nombre, otro.certificado.name)
+        self.assertFalse(default_storage.exists(nombre))
+
+    def test_subida_antes_de_registrar(self):
+        # La fila de BlobContenido se crea después de subir el archivo, no durante la subida
+        guardar = default_storage.save
+
+        def guardar_sin_fila(nombre, contenido, *args, **kwargs):
+            self.assertFalse(BlobContenido.objects.exists())
+            return guardar(nombre, contenido, *args, **kwargs)
+
+        with mock.patch.object(default_storage, "save", side_effect=guardar_sin_fila) as subida:
+            curso = self.crear_curso(b"%PDF-1.4 nuevo")
+        self.assertEqual(subida.call_count, 1)
+        self.assertEqual(BlobContenido.objects.get().nombre, curso.certificado.name)
+
+    def test_huerfano_con_el_mismo_nombre_se_reemplaza(self):
+        # Un archivo sin registro (subida interrumpida) no se adopta: se vuelve a subir y renueva su fecha
+        contenido = b"%PDF-1.4 interrumpido"
+        nombre = default_storage.save(
+            f"contenido/{hashlib.sha256(contenido).hexdigest()[:2]}/{hashlib.sha256(contenido).hexdigest()}.pdf",
+            ContentFile(contenido),
+        )
+        os.utime(default_storage.path(nombre), (0, 0))
+        curso = self.crear_curso(contenido)
+        self.assertEqual(curso.certificado.name, nombre)
+        self.assertGreater(default_storage.get_modified_time(nombre), timezone.now() - timedelta(minutes=1))
+
+    def test_reemplazo_libera_el_anterior(self):
+        curso = self.crear_curso(b"%PDF-1.4 viejo")
+        anterior = curso.certificado.name
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.certificado.save("nuevo.pdf", ContentFile(b"%PDF-1.4 nuevo"))
+        self.assertNotEqual(curso.certificado.name, anterior)
+        self.assertEqual(list(BlobContenido.objects.values_list('nombre', flat=True)), [curso.certificado.name])
+
+        # Volver a subir el mismo contenido (como lo hace un formulario) no acumula referencias
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.certificado = ContentFile(b"%PDF-1.4 nuevo", name="nuevo.pdf")
+            curso.save()
+        self.assertEqual(BlobContenido.objects.get().referencias, 1)
+
+
+class LimpiarHuerfanosTest(TestCase):
+    """El recolector elimina solo los archivos que ningún registro referencia"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        configuracion = override_settings(MEDIA_ROOT=media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+        self.curso = CursoRealizado(
+            datospersonales=datos, nombrecurso="Curso", fechainicio=date(2022, 1, 1),
+            entidadpatrocinadora="Entidad"
+        )
+        self.curso.certificado.save("cert.pdf", ContentFile(b"%PDF-1.4 en uso"))
+        self.huerfano = default_storage.save("certificados/cursos/viejo.pdf", ContentFile(b"%PDF-1.4 viejo"))
+        self.cache = default_storage.save("cv_pdf_cache/ana.pdf", ContentFile(b"%PDF-1.4 cache"))
+
+    def test_filtro_bloom_sin_falsos_negativos(self):
+        filtro = FiltroBloom(1000)
+        nombres = [f"contenido/{i}.pdf" for i in range(1000)]
+        for nombre in nombres:
+            filtro.add(nombre)
+        self.assertTrue(all(nombre in filtro for nombre in nombres))
+        falsos_positivos = sum(f"otro/{i}.pdf" in filtro for i in range(1000))
+        self.assertLess(falsos_positivos, 20)
+
+    def test_elimina_solo_huerfanos(self):
+        call_command("limpiar_huerfanos", "--min-edad", "0", "--dry-run", stdout=StringIO())
+        self.assertTrue(default_storage.exists(self.huerfano))
+
+        call_command("limpiar_huerfanos", "--min-edad", "0", stdout=StringIO())
+        self.assertFalse(default_storage.exists(self.huerfano))
+        self.assertTrue(default_storage.exists(self.curso.certificado.name))
+        self.assertTrue(default_storage.exists(self.cache))
+
+    def test_no_elimina_archivos_registrados_durante_el_recorrido(self):
+        contenido = b"%PDF-1.4 registrado"
+        huella = hashlib.sha256(contenido).hexdigest()
+        nombre = default_storage.save(f"contenido/{huella[:2]}/{huella}.pdf", ContentFile(contenido))
+        variante = default_storage.save(nombre_variante(nombre, 'pdf'), ContentFile(b"jpg"))
+        construir = construir_referenciados
+
+        def construir_y_registrar(*args, **kwargs):
+            referenciados = construir(*args, **kwargs)
+            # Otro proceso registra el archivo después de calcular los referenciados
+            BlobContenido.objects.create(huella=huella, nombre=nombre, tamano=len(contenido), referencias=1)
+            return referenciados
+
+        with mock.patch("tasks.management.commands.limpiar_huerfanos.construir_referenciados",
+                        side_effect=construir_y_registrar):
+            call_command("limpiar_huerfanos", "--min-edad", "0", "--exacto", stdout=StringIO())
+        self.assertTrue(default_storage.exists(nombre))
+        self.assertTrue(default_storage.exists(variante))
+        self.assertFalse(default_storage.exists(self.huerfano))
+
+    def test_respeta_archivos_recientes(self):
+        call_command("limpiar_huerfanos", "--exacto", stdout=StringIO())
+        self.assertTrue(default_storage.exists(self.huerfano))
+
+
+class VariantesFotoPerfilTest(TestCase):
+    """Al subir la foto de perfil se generan sus variantes y el PDF usa la reducida"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        configuracion = override_settings(MEDIA_ROOT=media)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        user = User.objects.create_user("ana", "ana@example.com", "clave")
+        self.datos = DatosPersonales.objects.create(user=user, nombres="Ana", apellidos="Pérez", numerocedula="123")
+
+    def subir_foto(self, modo="RGBA", tamano=(1200, 900)):
+        buffer = BytesIO()
+        Image.new(modo, tamano, "red").save(buffer, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.datos.fotoperfil = ContentFile(buffer.getvalue(), name="foto.png")
+            self.datos.save()
+        return self.datos.fotoperfil
+
+    def test_variantes_generadas_al_subir(self):
+        foto = self.subir_foto()
+        with default_storage.open(nombre_variante(foto.name, 'pdf')) as archivo:
+            imagen = Image.open(archivo)
+            self.assertEqual((imagen.format, imagen.size), ("JPEG", (360, 360)))
+        with default_storage.open(nombre_variante(foto.name, 'avatar_webp')) as archivo:
+            self.assertEqual(Image.open(archivo).format, "WEBP")
+        self.assertTrue(foto_variante(foto, 'avatar').endswith('_avatar.jpg'))
+
+        # La variante se prueba en el hilo de la descarga, sin consultar antes si existe
+        generator = CVPDFGenerator(DatosPersonales.objects.get(pk=self.datos.pk))
+        with mock.patch("django.core.files.storage.FileSystemStorage.exists") as existe:
+            generator.generate().close()
+        existe.assert_not_called()
+        self.assertEqual([d['archivo'] for d in generator.tiempos_descarga], [nombre_variante(foto.name, 'pdf')])
+
+        # Las variantes de una foto en uso no son huérfanas
+        call_command("limpiar_huerfanos", "--min-edad", "0", stdout=StringIO())
+        self.assertTrue(default_storage.exists(nombre_variante(foto.name, 'avatar')))
+
+    def test_sin_variantes_usa_la_original(self):
+        foto = self.subir_foto(modo="RGB", tamano=(200, 200))
+        default_storage.delete(nombre_variante(foto.name, 'avatar'))
+        self.assertEqual(foto_variante(foto, 'avatar'), foto.url)
+
+        default_storage.delete(nombre_variante(foto.name, 'pdf'))
+        generator = CVPDFGenerator(DatosPersonales.objects.get(pk=self.datos.pk))
+        generator.generate().close()
+        self.assertEqual([(d['archivo'], d['ok']) for d in generator.tiempos_descarga], [(foto.name, True)])
+        self.assertFalse(ResolucionArchivo.objects.exists())
+
+
+class IterarZipTest(SimpleTestCase):
+    """El ZIP generado por partes (sin seek) es válido"""
+
+    def test_zip_por_partes(self):
+        grande = os.urandom(200 * 1024)
+        entradas = [
+            ("a.pdf", lambda: BytesIO(b"%PDF-1.4 a")),
+            ("omitido.pdf", lambda: None),
+            ("b.pdf", lambda: BytesIO(grande)),
+        ]
+        partes = list(iterar_zip(entradas, tamano_bloque=16 * 1024))
+        self.assertGreater(len(partes), 2)
+
+        with zipfile.ZipFile(BytesIO(b"".join(partes))) as archivo_zip:
+            self.assertIsNone(archivo_zip.testzip())
+            self.assertEqual(
+                [(info.filename, info.file_size) for info in archivo_zip.infolist()],
+                [("a.pdf", 10), ("b.pdf", len(grande))],
+            )
+            self.assertEqual(archivo_zip.read("b.pdf"), grande)
+
+
+@override_settings(CV_PDF_CACHE_BACKEND='none')
+class ExportarCVsTest(TransactionTestCase):
+    """exportar_cvs continúa una exportación interrumpida sin repetir los PDFs terminados"""
+
+    def setUp(self):
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino, True)
+        # Hilos en lugar de procesos: la base de datos de pruebas en memoria no se comparte entre procesos
+        # (y los hilos solo ven los datos confirmados, de ahí TransactionTestCase)
+        parche = mock.patch("tasks.management.commands.exportar_cvs.Pool", PoolHilos)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        for i, username in enumerate(("ana", "luis")):
+            user = User.objects.create_user(username, f"{username}@example.com", "clave")
+            DatosPersonales.objects.create(user=user, nombres=username, apellidos="Pérez", numerocedula=str(i))
+
+    def escribir(self, ruta, contenido):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as archivo:
+            archivo.write(contenido)
+
+    def test_reanuda_directorio(self):
+        self.escribir(os.path.join(self.destino, "CV_ana.pdf"), b"previo")
+        self.escribir(os.path.join(self.destino, "CV_luis.pdf.tmp"), b"incompleto")
+
+        call_command("exportar_cvs", self.destino, "--procesos", "2", stdout=StringIO())
+
+        with open(os.path.join(self.destino, "CV_ana.pdf"), "rb") as archivo:
+            self.assertEqual(archivo.read(), b"previo")
+        with open(os.path.join(self.destino, "CV_luis.pdf"), "rb") as archivo:
+            self.assertTrue(archivo.read().startswith(b"%PDF"))
+        self.assertEqual(sorted(os.listdir(self.destino)), ["CV_ana.pdf", "CV_luis.pdf"])
+
+    def test_reanuda_zip(self):
+        destino = os.path.join(self.destino, "cvs.zip")
+        self.escribir(os.path.join(f"{destino}.partes", "CV_ana.pdf"), b"previo")
+
+        call_command("exportar_cvs", destino, stdout=StringIO())
+
+        with zipfile.ZipFile(destino) as archivo_zip:
+            self.assertEqual(archivo_zip.namelist(), ["CV_ana.pdf", "CV_luis.pdf"])
+            self.assertEqual(archivo_zip.read("CV_ana.pdf"), b"previo")
+        self.assertFalse(os.path.exists(f"{destino}.partes"))
@@ -5,7 +5,9 @@ Vistas para la gestión de hojas de vida
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
-from django.http import HttpResponse, FileResponse
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.db import transaction
@@ -15,15 +17,17 @@ import os
 
 from .models import (
     DatosPersonales, ExperienciaLaboral, Reconocimiento,
-    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage
+    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage, TrabajoPDF
 )
 from .forms import (
     DatosPersonalesForm, ExperienciaLaboralForm, ReconocimientoForm,
     CursoRealizadoForm, ProductoAcademicoForm, ProductoLaboralForm,
     VentaGarageForm
 )
-from .pdf_generator import CVPDFGenerator
-from .azure_storage import azure_storage
+from .pdf_cache import obtener_pdf_cv
+from .pdf_jobs import obtener_pdf_o_trabajo, encolar_trabajo_pdf, abrir_pdf_trabajo
+from .zip_stream import iterar_zip
+from .certificados import programar_replica
 
 
 # ============================
@@ -121,15 +125,10 @@ def crear_experiencia_laboral(request):
         if form.is_valid():
             experiencia = form.save(commit=False)
             experiencia.datospersonales = datos
-            experiencia.save()
-            
-            # Subir certificado a Azure si existe
-            if experiencia.certificado:
-                blob_name = f"experiencia/{datos.user.username}/{experiencia.id}_{experiencia.certificado.name}"
-                azure_url = azure_storage.upload_document(
-                    experiencia.certificado.open('rb'),
-                    blob_name
-                )
+            # El certificado se guarda una sola vez (storage); la réplica opcional queda en la bandeja de salida
+            with transaction.atomic():
+                experiencia.save()
+                programar_replica(experiencia)
             
             messages.success(request, 'Experiencia laboral creada correctamente')
             return redirect('mi_hoja_vida')
@@ -157,7 +156,10 @@ def editar_experiencia_laboral(request, id):
     if request.method == 'POST':
         form = ExperienciaLaboralForm(request.POST, request.FILES, instance=experiencia)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                if 'certificado' in form.changed_data:
+                    programar_replica(experiencia)
             messages.success(request, 'Experiencia laboral actualizada correctamente')
             return redirect('mi_hoja_vida')
     else:
@@ -204,15 +206,10 @@ def crear_reconocimiento(request):
         if form.is_valid():
             reconocimiento = form.save(commit=False)
             reconocimiento.datospersonales = datos
-            reconocimiento.save()
-            
-            # Subir certificado a Azure si existe
-            if reconocimiento.certificado:
-                blob_name = f"reconocimientos/{datos.user.username}/{reconocimiento.id}_{reconocimiento.certificado.name}"
-                azure_url = azure_storage.upload_document(
-                    reconocimiento.certificado.open('rb'),
-                    blob_name
-                )
+            # El certificado se guarda una sola vez (storage); la réplica opcional queda en la bandeja de salida
+            with transaction.atomic():
+                reconocimiento.save()
+                programar_replica(reconocimiento)
             
             messages.success(request, 'Reconocimiento creado correctamente')
             return redirect('mi_hoja_vida')
@@ -240,7 +237,10 @@ def editar_reconocimiento(request, id):
     if request.method == 'POST':
         form = ReconocimientoForm(request.POST, request.FILES, instance=reconocimiento)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                if 'certificado' in form.changed_data:
+                    programar_replica(reconocimiento)
             messages.success(request, 'Reconocimiento actualizado correctamente')
             return redirect('mi_hoja_vida')
     else:
@@ -287,15 +287,10 @@ def crear_curso(request):
         if form.is_valid():
             curso = form.save(commit=False)
             curso.datospersonales = datos
-            curso.save()
-            
-            # Subir certificado a Azure si existe
-            if curso.certificado:
-                blob_name = f"cursos/{datos.user.username}/{curso.id}_{curso.certificado.name}"
-                azure_url = azure_storage.upload_document(
-                    curso.certificado.open('rb'),
-                    blob_name
-                )
+            # El certificado se guarda una sola vez (storage); la réplica opcional queda en la bandeja de salida
+            with transaction.atomic():
+                curso.save()
+                programar_replica(curso)
             
             messages.success(request, 'Curso creado correctamente')
             return redirect('mi_hoja_vida')
@@ -323,7 +318,10 @@ def editar_curso(request, id):
     if request.method == 'POST':
         form = CursoRealizadoForm(request.POST, request.FILES, instance=curso)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                if 'certificado' in form.changed_data:
+                    programar_replica(curso)
             messages.success(request, 'Curso actualizado correctamente')
             return redirect('mi_hoja_vida')
     else:
@@ -587,16 +585,14 @@ def descargar_cv_pdf(request):
         messages.error(request, 'Debes crear tu hoja de vida primero')
         return redirect('crear_datos_personales')
     
-    # Generar PDF
-    generator = CVPDFGenerator(datos)
-    pdf_buffer = generator.generate()
+    # Generar PDF (o reutilizar el PDF en caché si la hoja de vida no cambió)
+    pdf_buffer, trabajo = obtener_pdf_o_trabajo(datos, request.user)
+    if trabajo is not None:
+        return _respuesta_trabajo_pdf(request, trabajo)
     
-    # Retornar como respuesta HTTP
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
+    # Retornar como respuesta HTTP (se envía por bloques desde el archivo)
     filename = f"CV_{datos.user.username}_{datetime.now().strftime('%Y%m%d')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    return _respuesta_archivo_pdf(pdf_buffer, filename, as_attachment=True)
 
 
 @login_required
@@ -608,16 +604,142 @@ def visualizar_cv_pdf(request):
         messages.error(request, 'Debes crear tu hoja de vida primero')
         return redirect('crear_datos_personales')
     
-    # Generar PDF
-    generator = CVPDFGenerator(datos)
-    pdf_buffer = generator.generate()
+    # Generar PDF (o reutilizar el PDF en caché si la hoja de vida no cambió)
+    pdf_buffer, trabajo = obtener_pdf_o_trabajo(datos, request.user)
+    if trabajo is not None:
+        return _respuesta_trabajo_pdf(request, trabajo, ver=True)
     
-    # Retornar como respuesta HTTP
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
+    # Retornar como respuesta HTTP (se envía por bloques desde el archivo)
+    filename = f"CV_{datos.user.username}.pdf"
+    return _respuesta_archivo_pdf(pdf_buffer, filename, as_attachment=False)
+
+
+def _respuesta_archivo_pdf(pdf_buffer, filename, as_attachment):
+    """Respuesta que envía el PDF por bloques sin cargarlo completo en memoria"""
+    if pdf_buffer is None:
+        return HttpResponse('Error generando el PDF', status=500)
     
+    response = FileResponse(
+        pdf_buffer,
+        content_type='application/pdf',
+        as_attachment=as_attachment,
+        filename=filename
+    )
+    response.block_size = 64 * 1024
+    return response
+
+
+def _quiere_json(request):
+    """Indica si la petición viene de JavaScript (XHR/fetch) y espera JSON en lugar de HTML"""
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
+def _respuesta_trabajo_pdf(request, trabajo, status=202, ver=False):
+    """
+    Respuesta con el estado de un trabajo PDF.
+    Para peticiones JSON retorna el estado y la URL para consultarlo; para un enlace
+    del navegador redirige a la página de espera, que consulta el estado y descarga el PDF.
+    """
+    url_estado = reverse('estado_trabajo_pdf', args=[trabajo.id])
+    if not _quiere_json(request):
+        return redirect(f"{url_estado}?ver=1" if ver else url_estado)
+    
+    data = {
+        'trabajo': trabajo.id,
+        'estado': trabajo.estado,
+        'url_estado': url_estado,
+    }
+    if trabajo.estado == 'completado':
+        data['url_descarga'] = reverse('descargar_trabajo_pdf', args=[trabajo.id])
+    elif trabajo.estado == 'error':
+        data['error'] = trabajo.mensajeerror
+    response = JsonResponse(data, status=status)
+    if status == 202:
+        response['Location'] = url_estado
     return response
 
 
+def _obtener_trabajo_pdf(request, trabajo_id):
+    """Obtiene un trabajo PDF del usuario (o de cualquier usuario si es staff); 403 si es de otro"""
+    trabajo = get_object_or_404(TrabajoPDF, id=trabajo_id)
+    if not request.user.is_staff and trabajo.solicitante_id != request.user.id:
+        raise PermissionDenied('No tienes acceso a este trabajo')
+    return trabajo
+
+
+@login_required
+@require_http_methods(["POST"])
+def encolar_cv_pdf(request):
+    """Vista para encolar la generación del CV en PDF en segundo plano"""
+    try:
+        datos = DatosPersonales.objects.get(user=request.user)
+    except DatosPersonales.DoesNotExist:
+        return JsonResponse({'error': 'Debes crear tu hoja de vida primero'}, status=404)
+    
+    trabajo = encolar_trabajo_pdf(datos, request.user)
+    return _respuesta_trabajo_pdf(request, trabajo)
+
+
+@login_required
+def estado_trabajo_pdf(request, trabajo_id):
+    """
+    Vista para consultar el estado de un trabajo PDF.
+    En el navegador muestra una página de espera que consulta este mismo estado en JSON
+    y descarga el PDF cuando el trabajo termina.
+    """
+    trabajo = _obtener_trabajo_pdf(request, trabajo_id)
+    ver = request.GET.get('ver') == '1'
+    url_descarga = reverse('descargar_trabajo_pdf', args=[trabajo.id]) + ('?ver=1' if ver else '')
+    
+    if _quiere_json(request):
+        status = 202 if trabajo.estado in ('pendiente', 'procesando') else 200
+        return _respuesta_trabajo_pdf(request, trabajo, status=status)
+    
+    if trabajo.estado == 'completado':
+        return redirect(url_descarga)
+    context = {
+        'trabajo': trabajo,
+        'url_estado': reverse('estado_trabajo_pdf', args=[trabajo.id]),
+        'url_descarga': url_descarga,
+    }
+    return render(request, 'cv/generando_pdf.html', context)
+
+
+@login_required
+def descargar_trabajo_pdf(request, trabajo_id):
+    """Vista para descargar (o ver con ?ver=1) el PDF generado por un trabajo completado"""
+    trabajo = _obtener_trabajo_pdf(request, trabajo_id)
+    ver = request.GET.get('ver') == '1'
+    if trabajo.estado != 'completado':
+        return _respuesta_trabajo_pdf(request, trabajo, status=409 if trabajo.estado == 'error' else 202, ver=ver)
+    
+    pdf_buffer = abrir_pdf_trabajo(trabajo)
+    if pdf_buffer is None:
+        # El PDF fue expulsado de la caché: el trabajo volvió a la cola
+        return _respuesta_trabajo_pdf(request, trabajo, status=202, ver=ver)
+    
+    # Retornar como respuesta HTTP (se envía por bloques desde el archivo)
+    username = trabajo.datospersonales.user.username
+    if ver:
+        return _respuesta_archivo_pdf(pdf_buffer, f"CV_{username}.pdf", as_attachment=False)
+    filename = f"CV_{username}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    return _respuesta_archivo_pdf(pdf_buffer, filename, as_attachment=True)
+
+
+@staff_required
+@require_http_methods(["POST"])
+def admin_encolar_cv_pdf(request, user_id):
+    """Vista para que el administrador encole la generación del CV de un usuario"""
+    usuario = get_object_or_404(User, id=user_id)
+    datos = get_object_or_404(DatosPersonales, user=usuario)
+    
+    trabajo = encolar_trabajo_pdf(datos, request.user)
+    return _respuesta_trabajo_pdf(request, trabajo)
+
+
 # ============================
 # VISTAS ADMINISTRATIVAS
 # ============================
@@ -669,13 +791,35 @@ def admin_descargar_cv_pdf(request, user_id):
         messages.error(request, f'El usuario {usuario.username} aún no ha creado su hoja de vida')
         return redirect('admin_hojas_vida')
     
-    # Generar PDF
-    generator = CVPDFGenerator(datos)
-    pdf_buffer = generator.generate()
+    # Generar PDF (o reutilizar el PDF en caché si la hoja de vida no cambió)
+    pdf_buffer, trabajo = obtener_pdf_o_trabajo(datos, request.user)
+    if trabajo is not None:
+        return _respuesta_trabajo_pdf(request, trabajo)
     
-    # Retornar como respuesta HTTP
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
+    # Retornar como respuesta HTTP (se envía por bloques desde el archivo)
     filename = f"CV_{usuario.username}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    return _respuesta_archivo_pdf(pdf_buffer, filename, as_attachment=True)
+
+
+@staff_required
+@require_http_methods(["POST"])
+def admin_descargar_cvs_zip(request):
+    """Vista para que el administrador descargue en un ZIP los CV de los usuarios seleccionados"""
+    user_ids = [int(user_id) for user_id in request.POST.getlist('user_ids') if user_id.isdigit()]
+    hojas_vida = DatosPersonales.objects.filter(user_id__in=user_ids).select_related('user').order_by('user__username')
+    
+    if not hojas_vida.exists():
+        messages.error(request, 'Selecciona al menos una hoja de vida')
+        return redirect('admin_hojas_vida')
+    
+    # Cada PDF se genera (o se toma de la caché) solo cuando el ZIP llega a su entrada
+    entradas = (
+        (f"CV_{datos.user.username}.pdf", lambda datos=datos: obtener_pdf_cv(datos))
+        for datos in hojas_vida.iterator()
+    )
+    
+    response = StreamingHttpResponse(iterar_zip(entradas), content_type='application/zip')
+    filename = f"CVs_{datetime.now().strftime('%Y%m%d')}.zip"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     return response
@@ -0,0 +1,72 @@
+"""
+Generación de archivos ZIP por partes para respuestas en streaming
+El ZIP se escribe entrada por entrada y se entrega en bloques,
+así el servidor nunca mantiene el archivo completo en memoria
+"""
+
+import zipfile
+
+
+class _DestinoZip:
+    """
+    Destino de escritura para zipfile que acumula los bytes escritos hasta que se consumen.
+    No implementa seek(), por lo que zipfile usa descriptores de datos al final de cada entrada.
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        self._posicion += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        """Retorna y descarta los bytes acumulados"""
+        data = b''.join(self._partes)
+        self._partes = []
+        return data
+
+
+def iterar_zip(entradas, tamano_bloque=64 * 1024):
+    """
+    Genera un ZIP por partes
+
+    Args:
+        entradas: Iterable de tuplas (nombre_en_zip, abrir), donde abrir() retorna
+                  un archivo binario o None para omitir la entrada
+        tamano_bloque: Bytes leídos de cada archivo por iteración
+
+    Yields:
+        bytes: Bloques consecutivos del archivo ZIP
+    """
+    destino = _DestinoZip()
+    # Los PDF ya están comprimidos, así que se guardan sin volver a comprimir
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, abrir in entradas:
+            archivo = abrir()
+            if archivo is None:
+                continue
+            with archivo, archivo_zip.open(nombre, 'w') as entrada:
+                while True:
+                    bloque = archivo.read(tamano_bloque)
+                    if not bloque:
+                        break
+                    entrada.write(bloque)
+                    data = destino.vaciar()
+                    if data:
+                        yield data
+            data = destino.vaciar()
+            if data:
+                yield data
+    # Directorio central del ZIP
+    data = destino.vaciar()
+    if data:
+        yield data